@@ -0,0 +1,150 @@
+"""Last known upstream catalog of each theme, persisted to JSON snapshot files.
+
+Used to warm the theme cache at startup and as a fallback when an
+upstream API is slow or down.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directory of the <theme>.json snapshots; empty keeps catalogs in memory only
+THEME_CATALOG_DIR = os.getenv("THEME_CATALOG_DIR", "")
+THEME_CATALOG_REFRESH_SECONDS = float(os.getenv("THEME_CATALOG_REFRESH_SECONDS", "3600"))
+
+
+class CatalogStore:
+    """Items of each theme with the time they were fetched.
+
+    The fetch time is tracked per item, as items merged one by one age
+    separately. Updates are kept in memory and written to disk by `flush`.
+    """
+
+    def __init__(self, directory: str = THEME_CATALOG_DIR):
+        """Initialize an empty store backed by `directory` (if set)."""
+        self.directory = Path(directory) if directory else None
+        self._items: Dict[str, List[Dict[str, Any]]] = {}
+        self._updated_at: Dict[str, float] = {}
+        self._fetched_at: Dict[str, List[float]] = {}  # per item, in the order of _items
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def path(self, theme: str) -> Path:
+        """Snapshot file of a theme."""
+        return self.directory / f"{theme}.json"
+
+    def load(self) -> Dict[str, int]:
+        """Read every snapshot in the directory and return the item count per theme."""
+        loaded = {}
+        if self.directory is None or not self.directory.is_dir():
+            return loaded
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                snapshot = json.loads(path.read_text(encoding="utf-8"))
+                items = snapshot["items"]
+                saved_at = float(snapshot["saved_at"])
+                # Snapshots written before per-item times date every item from saved_at
+                fetched_at = [float(t) for t in snapshot.get("fetched_at") or [saved_at] * len(items)]
+                if len(fetched_at) != len(items):
+                    raise ValueError("fetched_at does not match items")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring theme catalog snapshot {path}: {e}")
+                continue
+            with self._lock:
+                self._items[path.stem] = items
+                self._updated_at[path.stem] = saved_at
+                self._fetched_at[path.stem] = fetched_at
+            loaded[path.stem] = len(items)
+        logger.info(f"Loaded theme catalog snapshots: {loaded}")
+        return loaded
+
+    def get(self, theme: str) -> Optional[List[Dict[str, Any]]]:
+        """Last known items of a theme."""
+        with self._lock:
+            return self._items.get(theme)
+
+    def age(self, theme: str) -> Optional[float]:
+        """Seconds since the theme was last updated."""
+        with self._lock:
+            updated_at = self._updated_at.get(theme)
+        return None if updated_at is None else max(time.time() - updated_at, 0.0)
+
+    def item_ages(self, theme: str) -> List[Tuple[Dict[str, Any], float]]:
+        """Last known items of a theme with the seconds since each was fetched."""
+        now = time.time()
+        with self._lock:
+            items = self._items.get(theme, ())
+            fetched_at = self._fetched_at.get(theme, ())
+            return [(item, max(now - t, 0.0)) for item, t in zip(items, fetched_at)]
+
+    def replace(self, theme: str, items: List[Dict[str, Any]]) -> None:
+        """Store a freshly fetched full catalog."""
+        now = time.time()
+        with self._lock:
+            self._items[theme] = list(items)
+            self._updated_at[theme] = now
+            self._fetched_at[theme] = [now] * len(items)
+            self._dirty.add(theme)
+
+    def merge(self, theme: str, items: Iterable[Dict[str, Any]], key: str = "id") -> None:
+        """Add or update individually fetched items (matched on `key`), dated now."""
+        now = time.time()
+        with self._lock:
+            known = {
+                item[key]: (item, t)
+                for item, t in zip(self._items.get(theme, ()), self._fetched_at.get(theme, ()))
+            }
+            merged = False
+            for item in items:
+                known[item[key]] = (item, now)
+                merged = True
+            if merged:
+                self._items[theme] = [item for item, _ in known.values()]
+                self._fetched_at[theme] = [t for _, t in known.values()]
+                self._updated_at[theme] = now
+                self._dirty.add(theme)
+
+    def flush(self) -> int:
+        """Write updated themes to their snapshot files; returns how many were written."""
+        if self.directory is None:
+            return 0
+        with self._lock:
+            dirty = {
+                theme: (self._items[theme], self._updated_at[theme], self._fetched_at[theme])
+                for theme in self._dirty
+            }
+            self._dirty = set()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for theme, (items, updated_at, fetched_at) in dirty.items():
+            path = self.path(theme)
+            partial = path.with_name(path.name + ".partial")
+            try:
+                snapshot = {"theme": theme, "saved_at": updated_at, "fetched_at": fetched_at, "items": items}
+                partial.write_text(
+                    json.dumps(snapshot, ensure_ascii=False),
+                    encoding="utf-8",
+                )
+                os.replace(partial, path)
+            except OSError as e:
+                logger.error(f"Error writing theme catalog snapshot {path}: {e}", exc_info=True)
+                with self._lock:
+                    self._dirty.add(theme)
+        return len(dirty)
+
+    def clear(self) -> None:
+        """Forget every catalog (files are kept)."""
+        with self._lock:
+            self._items = {}
+            self._updated_at = {}
+            self._fetched_at = {}
+            self._dirty = set()
+
+
+# Global catalog store instance
+catalog_store = CatalogStore()
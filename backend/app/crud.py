@@ -0,0 +1,68 @@
+"""Database write helpers for scores."""
+
+from datetime import datetime
+from typing import List, Sequence
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.dimensions import score_params
+from app.histograms import record_scores
+from app.models import Score, ScoreRecord
+from app.rollups import record_rollups
+from app.schemas import ScoreCreate
+
+
+def insert_score(session: Session, score_data: ScoreCreate) -> ScoreRecord:
+    """Insert and commit a single score."""
+    record = ScoreRecord(**score_data.model_dump())
+    score = Score(**score_params(session, [record.model_dump(exclude={"id"})])[0])
+    session.add(score)
+    session.flush()
+    record.id = score.id
+    record_scores(session, [record])
+    record_rollups(session, [record])
+    session.commit()
+    return record
+
+
+def insert_records(session: Session, records: Sequence[ScoreRecord]) -> List[ScoreRecord]:
+    """Insert score records as they are and fill in their ids (no commit).
+
+    Only the scores table is written; histograms and rollups are left to
+    the caller.
+    """
+    if not records:
+        return []
+    rows = [record.model_dump(exclude={"id"}) for record in records]
+    statement = insert(Score).returning(Score.id, sort_by_parameter_order=True)
+    ids = session.scalars(statement, score_params(session, rows)).all()
+    for record, score_id in zip(records, ids):
+        record.id = score_id
+    return list(records)
+
+
+def bulk_insert_scores(session: Session, items: Sequence[ScoreCreate]) -> List[ScoreRecord]:
+    """Insert many scores with one executemany-style INSERT ... RETURNING.
+
+    Player, grid size and theme names are resolved to ids first. The
+    histograms and period rollups are updated in the same transaction. The
+    caller owns the transaction and must commit. Returned rows are in the
+    same order as `items`.
+    """
+    if not items:
+        return []
+    now = datetime.utcnow()
+    scores = insert_records(
+        session, [ScoreRecord.model_construct(**item.model_dump(), created_at=now) for item in items]
+    )
+    record_scores(session, scores)
+    record_rollups(session, scores)
+    return scores
+
+
+def save_scores(session: Session, items: Sequence[ScoreCreate]) -> List[ScoreRecord]:
+    """Bulk insert and commit scores."""
+    scores = bulk_insert_scores(session, items)
+    session.commit()
+    return scores
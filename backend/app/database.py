@@ -1,27 +1,182 @@
 """Database configuration and session management."""
 
 from sqlmodel import SQLModel, Session, create_engine
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from typing import Any, AsyncGenerator, Callable, Optional, TypeVar, Union
 import os
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL", "sqlite:///./memory_game.db"
 )
+# Optional read replica for GET endpoints (Postgres); SQLite reads use a
+# separate pool of WAL reader connections on the same file.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or DATABASE_URL
+# Serve the score endpoints through an async engine (aiosqlite / asyncpg)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=False,
-)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, as in PRAGMA cache_size
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+T = TypeVar("T")
+
+
+def is_sqlite_memory(url: str) -> bool:
+    """Whether the URL is an in-memory SQLite database."""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def sqlite_pragmas(read_only: bool) -> list:
+    """PRAGMA statements applied to every new SQLite connection."""
+    pragmas = [
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        # The journal mode is persistent, so only the writer sets it
+        pragmas.insert(0, f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def engine_options(url: str, read_only: bool, is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine / create_async_engine.
+
+    aiosqlite defaults to NullPool, which takes no pool sizing: async
+    SQLite file engines get a sized AsyncAdaptedQueuePool instead.
+    """
+    options: dict = {"echo": False}
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if is_async and not is_sqlite_memory(url):
+            options["poolclass"] = AsyncAdaptedQueuePool
+    elif backend == "postgresql" and read_only:
+        options["execution_options"] = {"postgresql_readonly": True}
+    if not is_sqlite_memory(url):
+        options["pool_size"] = DB_READ_POOL_SIZE if read_only else DB_POOL_SIZE
+        options["max_overflow"] = DB_READ_MAX_OVERFLOW if read_only else DB_MAX_OVERFLOW
+    return options
+
+
+def configure_sqlite(sync_engine: Engine, read_only: bool) -> None:
+    """Apply the SQLite pragma profile on connect."""
+    if sync_engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def build_engine(url: str, read_only: bool = False) -> Engine:
+    """Create a sync engine with the pool and SQLite profile applied."""
+    new_engine = create_engine(url, **engine_options(url, read_only))
+    configure_sqlite(new_engine, read_only)
+    return new_engine
+
+
+def build_async_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    """Create an async engine with the pool and SQLite profile applied."""
+    new_engine = create_async_engine(to_async_url(url), **engine_options(url, read_only, is_async=True))
+    configure_sqlite(new_engine.sync_engine, read_only)
+    return new_engine
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL to the matching async driver."""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    raise ValueError(f"No async driver configured for '{scheme}'")
+
+
+engine = build_engine(DATABASE_URL)
+# An in-memory database only exists on its own connections, so reads share the writer
+read_engine = engine if is_sqlite_memory(DATABASE_URL) else build_engine(DATABASE_READ_URL, read_only=True)
+
+async_engine: Optional[AsyncEngine] = None
+async_read_engine: Optional[AsyncEngine] = None
+if DATABASE_ASYNC:
+    async_engine = build_async_engine(DATABASE_URL)
+    async_read_engine = (
+        async_engine
+        if is_sqlite_memory(DATABASE_URL)
+        else build_async_engine(DATABASE_READ_URL, read_only=True)
+    )
+
+
+async def dispose_async_engines() -> None:
+    """Close the pooled async connections (their driver threads keep the process alive)."""
+    for pooled in {async_engine, async_read_engine} - {None}:
+        await pooled.dispose()
+
+
+def is_read_request(request: Request) -> bool:
+    """Whether the request only reads (served by the read engine)."""
+    return request.method in ("GET", "HEAD")
 
 
 def create_db_and_tables() -> None:
-    """Create database tables."""
+    """Migrate older schemas, then create missing tables and indexes."""
+    from app.migrations import migrate_score_dimensions
+
+    migrate_score_dimensions(engine)
     SQLModel.metadata.create_all(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+async def get_session(request: Request) -> AsyncGenerator[Union[Session, AsyncSession], None]:
+    """Get database session (an AsyncSession when DATABASE_ASYNC is enabled).
+
+    GET and HEAD requests get a session on the read engine. Endpoints should
+    go through run_db so that both session kinds work.
+    """
+    read_only = is_read_request(request)
+    if async_engine is not None:
+        async with AsyncSession(async_read_engine if read_only else async_engine) as session:
+            yield session
+    else:
+        with Session(read_engine if read_only else engine) as session:
+            yield session
 
 
-def get_session() -> Generator[Session, None, None]:
-    """Get database session."""
-    with Session(engine) as session:
-        yield session
+async def run_db(
+    session: Union[Session, AsyncSession], fn: Callable[..., T], *args: Any
+) -> T:
+    """Run `fn(sync_session, *args)` without blocking the event loop.
 
+    With an AsyncSession the function runs through `run_sync`, so its I/O
+    goes through the async driver on the event loop; with a sync Session it
+    is sent to the threadpool.
+    """
+    if isinstance(session, AsyncSession):
+        return await session.run_sync(fn, *args)
+    return await run_in_threadpool(fn, session, *args)
@@ -0,0 +1,195 @@
+"""Server-side seeded decks, and a pool of ready decks for popular themes and grids.
+
+A deck lists each card item once and a layout giving the item id at every
+grid position. The same theme, grid size and seed give the same deck as
+long as the theme's cached catalog is unchanged, so every member of a
+room can be dealt an identical board.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.themes import get_theme_data
+
+logger = logging.getLogger(__name__)
+
+# Decks kept ready per (theme, grid size)
+DECK_POOL_SIZE = int(os.getenv("DECK_POOL_SIZE", "3"))
+# Pooled combinations, as theme:grid pairs
+DECK_POOL_KEYS = tuple(
+    tuple(key.strip().split(":", 1))
+    for key in os.getenv("DECK_POOL_KEYS", "numbers:4x4,pokemon:4x4,flags:4x4,dogs:4x4,fruits:4x4").split(",")
+    if ":" in key
+)
+DECK_POOL_REFILL_SECONDS = float(os.getenv("DECK_POOL_REFILL_SECONDS", "60"))
+
+# Largest width or height of a custom grid
+MAX_GRID_SIDE = 10
+
+
+@dataclass(frozen=True)
+class Deck:
+    """Card items (each once) and the item id at every position, row by row."""
+
+    theme: str
+    grid_size: str
+    seed: int
+    items: List[Dict[str, Any]]
+    layout: List[int]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready deck."""
+        return {
+            "theme": self.theme,
+            "grid_size": self.grid_size,
+            "seed": self.seed,
+            "items": self.items,
+            "layout": self.layout,
+        }
+
+
+def grid_positions(grid_size: str) -> int:
+    """Number of cards of a "WxH" grid; raises ValueError if it cannot hold pairs."""
+    width, _, height = grid_size.partition("x")
+    if not (width.isdigit() and height.isdigit()):
+        raise ValueError(f"Invalid grid size '{grid_size}'")
+    width, height = int(width), int(height)
+    if not (2 <= width <= MAX_GRID_SIDE and 2 <= height <= MAX_GRID_SIDE) or width * height % 2:
+        raise ValueError(f"Grid size '{grid_size}' cannot be filled with pairs")
+    return width * height
+
+
+def new_seed() -> int:
+    """Random 32-bit deck seed."""
+    return random.getrandbits(32)
+
+
+async def build_deck(theme: str, grid_size: str, seed: int) -> Deck:
+    """Pick the items of a deck and lay out their pairs, both from `seed`.
+
+    Like the client, a theme returning fewer items than pairs gives a
+    smaller deck rather than an error.
+    """
+    pairs = grid_positions(grid_size) // 2
+    if theme == "numbers":
+        items = [{"id": i, "name": str(i)} for i in range(1, pairs + 1)]
+    else:
+        items = await get_theme_data(theme, pairs, random.Random(f"{seed}:items"))
+        # Concurrent fetches complete in any order
+        items = sorted(items, key=lambda item: item["id"])[:pairs]
+    layout = [item["id"] for item in items for _ in range(2)]
+    random.Random(seed).shuffle(layout)
+    return Deck(theme=theme, grid_size=grid_size, seed=seed, items=items, layout=layout)
+
+
+class DeckPool:
+    """Ready-made decks per (theme, grid size), refilled in the background."""
+
+    def __init__(self, keys=DECK_POOL_KEYS, size: int = DECK_POOL_SIZE):
+        """Initialize empty pools for `keys`."""
+        self.configured_keys: Tuple[Tuple[str, str], ...] = tuple(keys)
+        self.keys = self.configured_keys
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self._decks: Dict[Tuple[str, str], Deque[Deck]] = {key: deque() for key in self.keys}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the refill task runs."""
+        return self._task is not None
+
+    async def take(self, theme: str, grid_size: str) -> Deck:
+        """A ready deck if one is pooled, else a new one built now."""
+        decks = self._decks.get((theme, grid_size))
+        if decks:
+            self.hits += 1
+            if self._wakeup is not None:
+                self._wakeup.set()
+            return decks.popleft()
+        self.misses += 1
+        return await build_deck(theme, grid_size, new_seed())
+
+    def track(self, keys) -> None:
+        """Pool `keys` too, on top of the configured ones (replaces the previously tracked keys)."""
+        tracked = tuple(key for key in dict.fromkeys(keys) if key not in self.configured_keys)
+        self.keys = self.configured_keys + tracked
+        self._decks = {key: self._decks.get(key, deque()) for key in self.keys}
+
+    async def fill_key(self, key: Tuple[str, str]) -> int:
+        """Top up the pool of one theme and grid; returns the number of decks built."""
+        built = 0
+        decks = self._decks.setdefault(key, deque())
+        while len(decks) < self.size:
+            try:
+                deck = await build_deck(*key, new_seed())
+            except Exception as e:
+                # Upstream down: try again on the next refill
+                self.failures += 1
+                logger.warning(f"Could not build a {key[0]} {key[1]} deck: {e}")
+                break
+            decks.append(deck)
+            built += 1
+        return built
+
+    async def fill(self) -> int:
+        """Top up every pool; returns the number of decks built."""
+        built = 0
+        for key in self.keys:
+            built += await self.fill_key(key)
+        return built
+
+    async def start(self) -> None:
+        """Start refilling in the background."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the refill task."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.fill()
+            except Exception as e:
+                logger.error(f"Error refilling the deck pool: {str(e)}", exc_info=True)
+            try:
+                # Refill as soon as a deck is taken, or periodically to retry failures
+                await asyncio.wait_for(self._wakeup.wait(), timeout=DECK_POOL_REFILL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def clear(self) -> None:
+        """Drop every pooled deck and tracked key, and reset the counters."""
+        self.keys = self.configured_keys
+        self._decks = {key: deque() for key in self.keys}
+        self.hits = self.misses = self.failures = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pooled decks per key and hit counters."""
+        return {
+            "ready": {f"{theme}:{grid}": len(decks) for (theme, grid), decks in self._decks.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+        }
+
+
+# Global deck pool instance
+deck_pool = DeckPool()
@@ -0,0 +1,168 @@
+"""Player, grid size and theme lookup tables with an in-process intern cache."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Type
+
+from sqlalchemy import event, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, SQLModel, select
+
+from app.models import GridSize, Player, Score, ScoreRecord, Theme
+
+# Player names kept in the intern cache (grid sizes and themes are all kept)
+INTERN_CACHE_SIZE = int(os.getenv("INTERN_CACHE_SIZE", "100000"))
+
+# session.info key holding ids read or created in the current transaction
+_PENDING = "interned"
+
+
+class InternTable:
+    """Name -> id cache in front of a (id, name) lookup table.
+
+    Missing names are inserted (or found) in the caller's transaction and
+    only cached once it commits, so a rollback never leaves unknown ids in
+    the cache.
+    """
+
+    def __init__(self, model: Type[SQLModel], max_size: Optional[int] = None):
+        """Initialize an empty cache, bounded to `max_size` names (LRU) if given."""
+        self.model = model
+        self.max_size = max_size
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, name: str) -> Optional[int]:
+        """Id of a name if it is cached."""
+        with self._lock:
+            value = self._ids.get(name)
+            if value is not None and self.max_size is not None:
+                self._ids.move_to_end(name)
+            return value
+
+    def store(self, ids: Mapping[str, int]) -> None:
+        """Add committed name -> id pairs to the cache."""
+        with self._lock:
+            self._ids.update(ids)
+            if self.max_size is not None:
+                for name in ids:
+                    self._ids.move_to_end(name)
+                while len(self._ids) > self.max_size:
+                    self._ids.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached name."""
+        with self._lock:
+            self._ids.clear()
+
+    def resolve(self, session: Session, names: Iterable[str]) -> Dict[str, int]:
+        """Ids of `names`, inserting the missing ones (no commit)."""
+        ids: Dict[str, int] = {}
+        missing = set()
+        for name in set(names):
+            value = self.cached(name)
+            if value is None:
+                missing.add(name)
+            else:
+                ids[name] = value
+        if not missing:
+            return ids
+        model = self.model
+        dialect = session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            upsert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            session.execute(
+                upsert(model).on_conflict_do_nothing(index_elements=["name"]),
+                [{"name": name} for name in sorted(missing)],
+            )
+        else:
+            known = set(session.exec(select(model.name).where(model.name.in_(missing))))
+            for name in sorted(missing - known):
+                session.execute(insert(model).values(name=name))
+        found = dict(session.exec(select(model.name, model.id).where(model.name.in_(missing))).all())
+        session.info.setdefault(_PENDING, []).append((self, found))
+        ids.update(found)
+        return ids
+
+
+players = InternTable(Player, max_size=INTERN_CACHE_SIZE)
+grid_sizes = InternTable(GridSize)
+themes = InternTable(Theme)
+
+
+@event.listens_for(SASession, "after_commit")
+def _cache_committed_names(session: SASession) -> None:
+    for table, ids in session.info.pop(_PENDING, ()):
+        table.store(ids)
+
+
+@event.listens_for(SASession, "after_rollback")
+def _forget_rolled_back_names(session: SASession) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def clear_intern_caches() -> None:
+    """Empty all intern caches (e.g. after the database was replaced)."""
+    for table in (players, grid_sizes, themes):
+        table.clear()
+
+
+def score_params(session: Session, rows: List[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Map score dicts holding names to Score insert parameters holding ids."""
+    player_ids = players.resolve(session, (row["player_name"] for row in rows))
+    grid_size_ids = grid_sizes.resolve(session, (row["grid_size"] for row in rows))
+    theme_ids = themes.resolve(session, (row["theme"] for row in rows))
+    params = []
+    for row in rows:
+        values = {key: value for key, value in row.items() if key not in ("player_name", "grid_size", "theme")}
+        values["player_id"] = player_ids[row["player_name"]]
+        values["grid_size_id"] = grid_size_ids[row["grid_size"]]
+        values["theme_id"] = theme_ids[row["theme"]]
+        params.append(values)
+    return params
+
+
+def grid_size_id_clause(grid_size: str):
+    """Scalar subquery for the id of a grid size name (lets the planner use the id indexes)."""
+    return select(GridSize.id).where(GridSize.name == grid_size).scalar_subquery()
+
+
+def theme_id_clause(theme: str):
+    """Scalar subquery for the id of a theme name."""
+    return select(Theme.id).where(Theme.name == theme).scalar_subquery()
+
+
+def select_records():
+    """Select scores with their names, in ScoreRecord field order.
+
+    The lookup tables are joined on their primary keys.
+    """
+    return (
+        select(
+            Score.id,
+            Player.name.label("player_name"),
+            Score.score,
+            Score.moves,
+            Score.time,
+            GridSize.name.label("grid_size"),
+            Theme.name.label("theme"),
+            Score.created_at,
+        )
+        .join(Player, Player.id == Score.player_id)
+        .join(GridSize, GridSize.id == Score.grid_size_id)
+        .join(Theme, Theme.id == Score.theme_id)
+    )
+
+
+def to_record(row) -> ScoreRecord:
+    """ScoreRecord from a select_records row (trusted data, not revalidated)."""
+    return ScoreRecord.model_construct(**row._mapping)
+
+
+def get_record(session: Session, score_id: int) -> Optional[ScoreRecord]:
+    """A saved score with its names, or None."""
+    row = session.exec(select_records().where(Score.id == score_id)).first()
+    return to_record(row) if row is not None else None
@@ -0,0 +1,69 @@
+"""Streaming NDJSON / CSV export of the raw scores table."""
+
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.dimensions import grid_size_id_clause, select_records, theme_id_clause
+from app.models import Score
+from app.serialization import SCORE_FIELDS, dumps
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_statement(
+    grid_size: Optional[str] = None,
+    theme: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Select the exported columns in id order; `since` is inclusive, `until` exclusive."""
+    statement = select_records().order_by(Score.id)
+    if grid_size is not None:
+        statement = statement.where(Score.grid_size_id == grid_size_id_clause(grid_size))
+    if theme is not None:
+        statement = statement.where(Score.theme_id == theme_id_clause(theme))
+    if since is not None:
+        statement = statement.where(Score.created_at >= since)
+    if until is not None:
+        statement = statement.where(Score.created_at < until)
+    return statement
+
+
+def encode_ndjson(rows) -> bytes:
+    """One JSON object per line."""
+    return b"".join(dumps(dict(zip(SCORE_FIELDS, row))) + b"\n" for row in rows)
+
+
+def encode_csv(rows) -> bytes:
+    """CSV lines without header."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+    return buffer.getvalue().encode()
+
+
+def iter_export(
+    bind: Engine, export_format: str, statement, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the encoded export one chunk of rows at a time.
+
+    Rows are read as plain tuples through a server-side cursor on a session
+    owned by the generator (the request session is closed before the body is
+    streamed), so memory stays bounded by `chunk_size`.
+    """
+    encode = encode_ndjson if export_format == "ndjson" else encode_csv
+    if export_format == "csv":
+        yield (",".join(SCORE_FIELDS) + "\n").encode()
+    with Session(bind) as session:
+        result = session.exec(statement.execution_options(yield_per=chunk_size))
+        for chunk in result.partitions():
+            yield encode(chunk)
@@ -0,0 +1,194 @@
+"""Per (grid_size, theme) histograms of score, time and moves."""
+
+import argparse
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, func, select
+
+from app.models import CompactedScore, GridSize, Score, ScoreHistogram, ScoreRecord, Theme
+
+logger = logging.getLogger(__name__)
+
+# Bucket width per metric; values past the last bucket are clamped into it
+HISTOGRAM_BUCKET_WIDTHS = {
+    "score": int(os.getenv("HISTOGRAM_SCORE_BUCKET", "1")),
+    "time": int(os.getenv("HISTOGRAM_TIME_BUCKET", "5")),
+    "moves": int(os.getenv("HISTOGRAM_MOVES_BUCKET", "1")),
+}
+HISTOGRAM_MAX_BUCKETS = int(os.getenv("HISTOGRAM_MAX_BUCKETS", "500"))
+
+# For score a higher value is better, for time and moves a lower one
+HIGHER_IS_BETTER = {"score": True, "time": False, "moves": False}
+
+HistogramKey = Tuple[str, str, str, int]
+
+
+def bucket_for(metric: str, value: int) -> int:
+    """Bucket index of a metric value."""
+    return min(value // HISTOGRAM_BUCKET_WIDTHS[metric], HISTOGRAM_MAX_BUCKETS - 1)
+
+
+def bucket_bounds(metric: str, bucket: int) -> Tuple[int, Optional[int]]:
+    """Inclusive start and exclusive end of a bucket (None for the open last bucket)."""
+    width = HISTOGRAM_BUCKET_WIDTHS[metric]
+    end = None if bucket == HISTOGRAM_MAX_BUCKETS - 1 else (bucket + 1) * width
+    return bucket * width, end
+
+
+def histogram_increments(rows: Iterable[tuple]) -> Counter:
+    """Count bucket increments for (grid_size, theme, score, time, moves[, count]) rows."""
+    increments: Counter = Counter()
+    for grid_size, theme, score, time, moves, *count in rows:
+        weight = count[0] if count else 1
+        for metric, value in (("score", score), ("time", time), ("moves", moves)):
+            increments[(grid_size, theme, metric, bucket_for(metric, value))] += weight
+    return increments
+
+
+def apply_increments(session: Session, increments: Dict[HistogramKey, int]) -> None:
+    """Add counts to the histogram table with an upsert (no commit)."""
+    if not increments:
+        return
+    rows = [
+        {"grid_size": grid_size, "theme": theme, "metric": metric, "bucket": bucket, "count": count}
+        for (grid_size, theme, metric, bucket), count in increments.items()
+    ]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        upsert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        statement = upsert(ScoreHistogram)
+        statement = statement.on_conflict_do_update(
+            index_elements=["grid_size", "theme", "metric", "bucket"],
+            set_={"count": ScoreHistogram.count + statement.excluded.count},
+        )
+        session.execute(statement, rows)
+        return
+    for row in rows:
+        existing = session.get(
+            ScoreHistogram, (row["grid_size"], row["theme"], row["metric"], row["bucket"])
+        )
+        if existing is None:
+            session.add(ScoreHistogram(**row))
+        else:
+            existing.count += row["count"]
+    session.flush()
+
+
+def record_scores(session: Session, scores: Iterable[ScoreRecord]) -> None:
+    """Update the histograms for newly inserted scores (no commit)."""
+    apply_increments(
+        session,
+        histogram_increments(
+            (score.grid_size, score.theme, score.score, score.time, score.moves) for score in scores
+        ),
+    )
+
+
+def load_histogram(
+    session: Session, metric: str, grid_size: str, theme: Optional[str] = None
+) -> Dict[int, int]:
+    """Bucket counts of one metric, summed over themes when theme is None."""
+    statement = (
+        select(ScoreHistogram.bucket, func.sum(ScoreHistogram.count))
+        .where(ScoreHistogram.metric == metric, ScoreHistogram.grid_size == grid_size)
+        .group_by(ScoreHistogram.bucket)
+    )
+    if theme is not None:
+        statement = statement.where(ScoreHistogram.theme == theme)
+    return {bucket: int(count) for bucket, count in session.exec(statement)}
+
+
+def percentile(histogram: Dict[int, int], metric: str, value: int) -> Dict[str, Any]:
+    """Share of games a value beats, counting half of its own bucket."""
+    total = sum(histogram.values())
+    bucket = bucket_for(metric, value)
+    if HIGHER_IS_BETTER[metric]:
+        worse = sum(count for other, count in histogram.items() if other < bucket)
+    else:
+        worse = sum(count for other, count in histogram.items() if other > bucket)
+    same = histogram.get(bucket, 0)
+    start, end = bucket_bounds(metric, bucket)
+    return {
+        "value": value,
+        "bucket_start": start,
+        "bucket_end": end,
+        "percentile": round(100 * (worse + same / 2) / total, 2) if total else 0.0,
+    }
+
+
+def distribution(histogram: Dict[int, int], metric: str) -> List[Dict[str, Any]]:
+    """Non-empty buckets in ascending order."""
+    result = []
+    for bucket in sorted(histogram):
+        start, end = bucket_bounds(metric, bucket)
+        result.append({"start": start, "end": end, "count": histogram[bucket]})
+    return result
+
+
+def rebuild_histograms(session: Session, chunk_size: int = 5000) -> int:
+    """Recompute the histogram table from the raw and compacted scores.
+
+    Scores are streamed in chunks; only the bucket counters are kept in
+    memory. Returns the number of scores read.
+    """
+    session.execute(delete(ScoreHistogram))
+    statement = (
+        select(GridSize.name, Theme.name, Score.score, Score.time, Score.moves)
+        .join(GridSize, GridSize.id == Score.grid_size_id)
+        .join(Theme, Theme.id == Score.theme_id)
+        .execution_options(yield_per=chunk_size)
+    )
+    increments: Counter = Counter()
+    total = 0
+    for chunk in session.exec(statement).partitions():
+        increments.update(histogram_increments(chunk))
+        total += len(chunk)
+    compacted = session.exec(
+        select(
+            CompactedScore.grid_size,
+            CompactedScore.theme,
+            CompactedScore.score,
+            CompactedScore.time,
+            CompactedScore.moves,
+            CompactedScore.count,
+        )
+    ).all()
+    increments.update(histogram_increments(compacted))
+    total += sum(row[-1] for row in compacted)
+    rows = [
+        {"grid_size": grid_size, "theme": theme, "metric": metric, "bucket": bucket, "count": count}
+        for (grid_size, theme, metric, bucket), count in increments.items()
+    ]
+    for offset in range(0, len(rows), chunk_size):
+        session.execute(insert(ScoreHistogram), rows[offset : offset + chunk_size])
+    session.commit()
+    logger.info(f"Rebuilt histograms from {total} scores ({len(rows)} buckets)")
+    return total
+
+
+def ensure_histograms(session: Session) -> None:
+    """Build the histograms once for databases that predate them."""
+    has_histograms = session.exec(select(ScoreHistogram.bucket).limit(1)).first() is not None
+    has_scores = session.exec(select(Score.id).limit(1)).first() is not None
+    if has_scores and not has_histograms:
+        rebuild_histograms(session)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score histogram maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    from app.database import create_db_and_tables, engine
+
+    logging.basicConfig(level=logging.INFO)
+    create_db_and_tables()
+    with Session(engine) as db_session:
+        rebuild_histograms(db_session, chunk_size=args.chunk_size)
@@ -0,0 +1,145 @@
+"""Application-wide pooled HTTP client for upstream APIs (theme providers)."""
+
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "false").lower() == "true"
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper counting requests in flight, from send until the body is closed."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        """Wrap `transport`."""
+        self.transport = transport
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self.errors += 1
+            self.in_flight -= 1
+            raise
+        if response.is_closed:
+            # Body already read in memory (e.g. httpx.MockTransport responses)
+            self.in_flight -= 1
+        else:
+            response.stream = MeteredStream(response.stream, self)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class MeteredStream(httpx.AsyncByteStream):
+    """Response body that marks its request done once closed."""
+
+    def __init__(self, stream, transport: MeteredTransport):
+        self.stream = stream
+        self.transport = transport
+        self.closed = False
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.transport.in_flight -= 1
+        await self.stream.aclose()
+
+
+class UpstreamClient:
+    """One httpx.AsyncClient shared by every request, created at startup.
+
+    Reusing it keeps TCP/TLS connections alive between theme loads.
+    """
+
+    def __init__(self):
+        """Initialize without a client (see start)."""
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[MeteredTransport] = None
+        self.http2 = False
+
+    @property
+    def running(self) -> bool:
+        """Whether the client is open."""
+        return self._client is not None
+
+    def start(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        """Open the shared client (idempotent); `transport` replaces the network one."""
+        if self._client is not None:
+            return self._client
+        self.http2 = False
+        if transport is None:
+            limits = httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            )
+            try:
+                transport = httpx.AsyncHTTPTransport(limits=limits, http2=HTTP_HTTP2)
+                self.http2 = HTTP_HTTP2
+            except ImportError:
+                logger.warning("HTTP_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+                transport = httpx.AsyncHTTPTransport(limits=limits)
+        self._transport = MeteredTransport(transport)
+        self._client = httpx.AsyncClient(
+            transport=self._transport, timeout=HTTP_TIMEOUT, follow_redirects=True
+        )
+        return self._client
+
+    def get(self) -> httpx.AsyncClient:
+        """The shared client, opened on first use outside the application."""
+        return self._client or self.start()
+
+    async def close(self) -> None:
+        """Close the client and its pooled connections."""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Request counters and pooled connection usage."""
+        transport = self._transport
+        if transport is None:
+            return {"running": False}
+        metrics = {
+            "running": self.running,
+            "http2": self.http2,
+            "max_connections": HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            "requests": transport.requests,
+            "errors": transport.errors,
+            "in_flight": transport.in_flight,
+            "peak_in_flight": transport.peak_in_flight,
+        }
+        # httpcore connection pool behind httpx.AsyncHTTPTransport
+        pool = getattr(transport.transport, "_pool", None)
+        if pool is not None:
+            connections = list(pool.connections)
+            idle = sum(1 for connection in connections if connection.is_idle())
+            metrics["connections"] = {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+        return metrics
+
+
+# Global upstream client instance
+upstream_client = UpstreamClient()
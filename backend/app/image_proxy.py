@@ -0,0 +1,278 @@
+"""Image proxy for theme cards with an on-disk, content-addressed LRU cache.
+
+Images are stored once per content digest under objects/<2 chars>/<digest>;
+index.json maps each upstream URL to its digest and content type.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.http_client import upstream_client
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "./image_cache")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Largest accepted upstream image
+IMAGE_PROXY_MAX_BYTES = int(os.getenv("IMAGE_PROXY_MAX_KB", "5120")) * 1024
+# Image CDNs of the theme providers; any other host is refused
+IMAGE_PROXY_ALLOWED_HOSTS = frozenset(
+    host.strip()
+    for host in os.getenv(
+        "IMAGE_PROXY_ALLOWED_HOSTS",
+        "raw.githubusercontent.com,images.dog.ceo,image.tmdb.org,flagcdn.com,upload.wikimedia.org",
+    ).split(",")
+    if host.strip()
+)
+IMAGE_CACHE_CONTROL = "public, max-age=86400"
+# Redirects followed per image, each to an allowed host
+IMAGE_PROXY_MAX_REDIRECTS = int(os.getenv("IMAGE_PROXY_MAX_REDIRECTS", "3"))
+
+
+class ImageProxyError(Exception):
+    """An upstream image could not be fetched or is not acceptable."""
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the image."""
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    """An image file in the cache."""
+
+    digest: str
+    content_type: str
+    size: int
+    path: Path
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag: the content digest."""
+        return f'"{self.digest}"'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single `bytes=` range, or None to send the whole image.
+
+    Multiple ranges and malformed headers are ignored (RFC 9110 allows
+    answering with the full representation).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start < 0 or (last and start > end):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def iter_file(path: Path, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Bytes start..end (inclusive) of a file, in chunks."""
+    remaining = end - start + 1
+    with open(path, "rb") as image_file:
+        image_file.seek(start)
+        while remaining > 0:
+            chunk = image_file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class ImageCache:
+    """Upstream images stored by content digest, evicted least recently used first."""
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        """Initialize an empty cache in `directory` (see load)."""
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # url -> (digest, content type)
+        self._urls: Dict[str, Tuple[str, str]] = {}
+        # digest -> size, least recently used first
+        self._objects: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+
+    def object_path(self, digest: str) -> Path:
+        """File of an image."""
+        return self.directory / "objects" / digest[:2] / digest
+
+    def load(self) -> int:
+        """Read the index and the cached files; returns the number of images."""
+        index_path = self.directory / "index.json"
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            index = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring image cache index {index_path}: {e}")
+            index = {}
+        objects = {}
+        for path in (self.directory / "objects").glob("*/*"):
+            stat = path.stat()
+            objects[path.name] = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            self._urls = {
+                url: (digest, content_type) for url, (digest, content_type) in index.items() if digest in objects
+            }
+            referenced = {digest for digest, _ in self._urls.values()}
+            self._objects = OrderedDict(
+                (digest, size) for digest, (_, size) in sorted(objects.items(), key=lambda item: item[1][0])
+                if digest in referenced
+            )
+            self.total_bytes = sum(self._objects.values())
+        for digest in objects.keys() - referenced:
+            # Written but never indexed (interrupted store)
+            self.object_path(digest).unlink(missing_ok=True)
+        return len(self._objects)
+
+    def is_allowed(self, url: str) -> bool:
+        """Whether the URL points at an allowed image host over HTTPS."""
+        parts = urlsplit(url)
+        return parts.scheme == "https" and parts.hostname in IMAGE_PROXY_ALLOWED_HOSTS
+
+    def lookup(self, url: str) -> Optional[CachedImage]:
+        """Cached image of a URL, marked as recently used."""
+        with self._lock:
+            entry = self._urls.get(url)
+            if entry is None or entry[0] not in self._objects:
+                self.misses += 1
+                return None
+            digest, content_type = entry
+            self._objects.move_to_end(digest)
+            self.hits += 1
+            size = self._objects[digest]
+        path = self.object_path(digest)
+        try:
+            # Keeps the LRU order across restarts
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(digest)
+            return None
+        return CachedImage(digest, content_type, size, path)
+
+    async def fetch(self, url: str) -> CachedImage:
+        """Download an image through the shared HTTP client and cache it.
+
+        Redirects are followed by hand, at most IMAGE_PROXY_MAX_REDIRECTS,
+        and only to allowed hosts: no request ever leaves the allowlist.
+        """
+        client = upstream_client.get()
+        target = url
+        try:
+            for _ in range(IMAGE_PROXY_MAX_REDIRECTS + 1):
+                if not self.is_allowed(target):
+                    raise ImageProxyError(f"Image host not allowed: {urlsplit(target).hostname}")
+                async with client.stream("GET", target, follow_redirects=False) as response:
+                    if response.is_redirect and response.next_request is not None:
+                        target = str(response.next_request.url)
+                        continue
+                    if response.status_code != 200:
+                        raise ImageProxyError(f"Upstream answered {response.status_code}")
+                    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+                    if not content_type.startswith("image/"):
+                        raise ImageProxyError(f"Not an image: {content_type or 'no content type'}")
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if len(body) > IMAGE_PROXY_MAX_BYTES:
+                            raise ImageProxyError("Image too large")
+                    break
+            else:
+                raise ImageProxyError("Too many redirects")
+        except httpx.HTTPError as e:
+            raise ImageProxyError(f"Upstream request failed: {e}") from e
+        return await asyncio.to_thread(self.store, url, bytes(body), content_type)
+
+    def store(self, url: str, body: bytes, content_type: str) -> CachedImage:
+        """Write an image (once per digest), index its URL and evict over the size budget."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(digest + ".partial")
+            partial.write_bytes(body)
+            os.replace(partial, path)
+        with self._lock:
+            if digest not in self._objects:
+                self._objects[digest] = len(body)
+                self.total_bytes += len(body)
+            self._objects.move_to_end(digest)
+            self._urls[url] = (digest, content_type)
+            evicted = self._evict(keep=digest)
+        for old in evicted:
+            self.object_path(old).unlink(missing_ok=True)
+        self._write_index()
+        return CachedImage(digest, content_type, len(body), path)
+
+    def _evict(self, keep: str) -> list:
+        evicted = []
+        while self.total_bytes > self.max_bytes and len(self._objects) > 1:
+            digest = next(iter(self._objects))
+            if digest == keep:
+                break
+            self._forget(digest)
+            self.evictions += 1
+            evicted.append(digest)
+        return evicted
+
+    def _forget(self, digest: str) -> None:
+        self.total_bytes -= self._objects.pop(digest, 0)
+        self._urls = {url: entry for url, entry in self._urls.items() if entry[0] != digest}
+
+    def _write_index(self) -> None:
+        # Serialized so that the last write always holds the latest index
+        with self._index_lock:
+            with self._lock:
+                index = dict(self._urls)
+            index_path = self.directory / "index.json"
+            partial = index_path.with_name("index.json.partial")
+            partial.write_text(json.dumps(index), encoding="utf-8")
+            os.replace(partial, index_path)
+
+    def metrics(self) -> Dict[str, int]:
+        """Size and hit counters."""
+        with self._lock:
+            return {
+                "images": len(self._objects),
+                "urls": len(self._urls),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Global image cache instance
+image_cache = ImageCache()
@@ -0,0 +1,259 @@
+"""In-memory top-K leaderboard kept in sync with the scores table."""
+
+import base64
+import bisect
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, and_, or_, select
+
+from app.dimensions import grid_size_id_clause, select_records, theme_id_clause, to_record
+from app.models import LeaderboardRollup, Score, ScoreRecord
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+
+# Same ordering as the SQL leaderboard, with the id as final tiebreaker so
+# that the in-memory and SQL orderings are fully deterministic.
+LEADERBOARD_ORDER = (Score.score.desc(), Score.time.asc(), Score.moves.asc(), Score.id.asc())
+
+
+def sort_key(score: ScoreRecord) -> Tuple[int, int, int, int]:
+    """Sort key matching LEADERBOARD_ORDER (smaller is better)."""
+    return (-score.score, score.time, score.moves, score.id)
+
+
+def top_scores_statement(limit: int):
+    """Select the best `limit` scores in leaderboard order."""
+    return select_records().order_by(*LEADERBOARD_ORDER).limit(limit)
+
+
+def rollup_as_score(row: LeaderboardRollup) -> ScoreRecord:
+    """Score-shaped copy of a rollup row (the id is the original score id)."""
+    return ScoreRecord.model_construct(
+        id=row.score_id,
+        player_name=row.player_name,
+        score=row.score,
+        moves=row.moves,
+        time=row.time,
+        grid_size=row.grid_size,
+        theme=row.theme,
+        created_at=row.created_at,
+    )
+
+
+def load_top_scores(session: Session, limit: int) -> List[ScoreRecord]:
+    """Best `limit` scores, including all-time rollup rows whose raw score was compacted."""
+    live = [to_record(row) for row in session.exec(top_scores_statement(limit))]
+    archived = session.exec(
+        select(LeaderboardRollup)
+        .where(
+            LeaderboardRollup.period == "alltime",
+            LeaderboardRollup.score_id.not_in(select(Score.id)),
+        )
+        .order_by(
+            LeaderboardRollup.score.desc(),
+            LeaderboardRollup.time.asc(),
+            LeaderboardRollup.moves.asc(),
+            LeaderboardRollup.score_id.asc(),
+        )
+        .limit(limit)
+    ).all()
+    if not archived:
+        return live
+    return sorted([*live, *map(rollup_as_score, archived)], key=sort_key)[:limit]
+
+
+def encode_cursor(score: ScoreRecord, rank: int) -> str:
+    """Encode the sort tuple, id and rank of the last row of a page."""
+    payload = [score.score, score.time, score.moves, score.id, rank]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int, int, int, int]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(values, list) or len(values) != 5 or not all(
+        isinstance(value, int) for value in values
+    ):
+        raise ValueError("Malformed cursor")
+    score, time, moves, score_id, rank = values
+    return score, time, moves, score_id, rank
+
+
+def after_clause(columns, after: Tuple[int, int, int, int]):
+    """Rows strictly after `after` in (score desc, time, moves, id) order, for those columns."""
+    score_column, time_column, moves_column, id_column = columns
+    score, time, moves, score_id = after
+    return and_(
+        # Redundant bound lets the planner seek into the ranking index
+        score_column <= score,
+        or_(
+            score_column < score,
+            and_(
+                score_column == score,
+                or_(
+                    time_column > time,
+                    and_(
+                        time_column == time,
+                        or_(
+                            moves_column > moves,
+                            and_(moves_column == moves, id_column > score_id),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+    )
+
+
+def leaderboard_page_statement(
+    limit: int,
+    grid_size: Optional[str] = None,
+    theme: Optional[str] = None,
+    after: Optional[Tuple[int, int, int, int]] = None,
+):
+    """Select one leaderboard page using keyset pagination on (score desc, time, moves, id)."""
+    statement = select_records()
+    if grid_size is not None:
+        statement = statement.where(Score.grid_size_id == grid_size_id_clause(grid_size))
+    if theme is not None:
+        statement = statement.where(Score.theme_id == theme_id_clause(theme))
+    if after is not None:
+        statement = statement.where(after_clause((Score.score, Score.time, Score.moves, Score.id), after))
+    return statement.order_by(*LEADERBOARD_ORDER).limit(limit)
+
+
+def archived_page_statement(
+    limit: int,
+    grid_size: Optional[str] = None,
+    theme: Optional[str] = None,
+    after: Optional[Tuple[int, int, int, int]] = None,
+):
+    """Same page over all-time rollup rows whose raw score was compacted, shaped like select_records."""
+    statement = select(
+        LeaderboardRollup.score_id.label("id"),
+        LeaderboardRollup.player_name,
+        LeaderboardRollup.score,
+        LeaderboardRollup.moves,
+        LeaderboardRollup.time,
+        LeaderboardRollup.grid_size,
+        LeaderboardRollup.theme,
+        LeaderboardRollup.created_at,
+    ).where(
+        LeaderboardRollup.period == "alltime",
+        LeaderboardRollup.score_id.not_in(select(Score.id)),
+    )
+    if grid_size is not None:
+        statement = statement.where(LeaderboardRollup.grid_size == grid_size)
+    if theme is not None:
+        statement = statement.where(LeaderboardRollup.theme == theme)
+    columns = (LeaderboardRollup.score, LeaderboardRollup.time, LeaderboardRollup.moves, LeaderboardRollup.score_id)
+    if after is not None:
+        statement = statement.where(after_clause(columns, after))
+    return statement.order_by(
+        LeaderboardRollup.score.desc(),
+        LeaderboardRollup.time.asc(),
+        LeaderboardRollup.moves.asc(),
+        LeaderboardRollup.score_id.asc(),
+    ).limit(limit)
+
+
+def load_leaderboard_page(
+    session: Session,
+    limit: int,
+    grid_size: Optional[str] = None,
+    theme: Optional[str] = None,
+    after: Optional[Tuple[int, int, int, int]] = None,
+) -> List[Any]:
+    """One leaderboard page, including all-time rollup rows whose raw score was compacted.
+
+    Compacted scores only remain if they were in the all-time rollup (the
+    best ROLLUP_SIZE overall), like in load_top_scores.
+    """
+    live = session.exec(leaderboard_page_statement(limit, grid_size, theme, after)).all()
+    archived = session.exec(archived_page_statement(limit, grid_size, theme, after)).all()
+    if not archived:
+        return live
+    return sorted([*live, *archived], key=lambda row: (-row.score, row.time, row.moves, row.id))[:limit]
+
+
+class Leaderboard:
+    """Keeps the best `size` scores sorted in memory."""
+
+    def __init__(self, size: int = LEADERBOARD_SIZE):
+        """Initialize an empty leaderboard."""
+        self.size = size
+        self.loaded = False
+        self._keys: List[Tuple[int, int, int, int]] = []
+        self._entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def load(self, session: Session) -> None:
+        """Warm the leaderboard from the database."""
+        self.rebuild(load_top_scores(session, self.size))
+
+    def rebuild(self, scores: Iterable[ScoreRecord]) -> None:
+        """Replace the leaderboard contents with the best of `scores`."""
+        ranked = sorted(scores, key=sort_key)[: self.size]
+        with self._lock:
+            self._keys = [sort_key(score) for score in ranked]
+            self._entries = [score.model_dump() for score in ranked]
+            self.loaded = True
+
+    def clear(self) -> None:
+        """Drop all entries and mark the leaderboard as not loaded."""
+        with self._lock:
+            self._keys = []
+            self._entries = []
+            self.loaded = False
+
+    def offer(self, score: ScoreRecord) -> bool:
+        """Insert a newly saved score if it makes the top-K."""
+        key = sort_key(score)
+        with self._lock:
+            if not self.loaded:
+                return False
+            if len(self._keys) >= self.size and key >= self._keys[-1]:
+                return False
+            index = bisect.bisect_left(self._keys, key)
+            self._keys.insert(index, key)
+            self._entries.insert(index, score.model_dump())
+            if len(self._keys) > self.size:
+                self._keys.pop()
+                self._entries.pop()
+            return True
+
+    def top(self, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Return the best `limit` entries, or None if they are not all held in memory."""
+        with self._lock:
+            if not self.loaded or limit > self.size:
+                return None
+            return [dict(entry) for entry in self._entries[: max(limit, 0)]]
+
+    def check_consistency(self, session: Session) -> List[str]:
+        """Compare the in-memory order with the SQL order and list any mismatches."""
+        expected = load_top_scores(session, self.size)
+        with self._lock:
+            actual_ids = [entry["id"] for entry in self._entries]
+        problems = []
+        if len(actual_ids) != len(expected):
+            problems.append(f"size mismatch: memory={len(actual_ids)} sql={len(expected)}")
+        for position, (memory_id, score) in enumerate(zip(actual_ids, expected), start=1):
+            if memory_id != score.id:
+                problems.append(f"rank {position}: memory id={memory_id} sql id={score.id}")
+        if problems:
+            logger.warning(f"Leaderboard out of sync with database: {problems[:5]}")
+        return problems
+
+
+# Global leaderboard instance
+leaderboard = Leaderboard()
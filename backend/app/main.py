@@ -1,29 +1,91 @@
 """FastAPI application main file."""
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Body, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import Session, select, func
-from typing import List
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlmodel import Session
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional
+from urllib.parse import urlencode
+import asyncio
 import logging
+import os
 
-from app.database import get_session, create_db_and_tables
-from app.models import Score
+from app.catalog_store import THEME_CATALOG_REFRESH_SECONDS, catalog_store
+from app.crud import insert_score, save_scores
+from app.database import engine, read_engine, get_session, create_db_and_tables, dispose_async_engines, run_db
+from app.export import EXPORT_MEDIA_TYPES, export_statement, iter_export
+from app.histograms import distribution, ensure_histograms, load_histogram, percentile
+from app.http_client import upstream_client
+from app.image_proxy import (
+    IMAGE_CACHE_CONTROL,
+    ImageProxyError,
+    RangeNotSatisfiable,
+    image_cache,
+    iter_file,
+    parse_range,
+)
+from app.leaderboard import (
+    decode_cursor,
+    encode_cursor,
+    leaderboard,
+    load_leaderboard_page,
+    load_top_scores,
+    rollup_as_score,
+)
+from app.dimensions import get_record
+from app.models import ScoreRecord
+from app.ranking import rank_from_sql, ranking
+from app.response_cache import etag_matches, response_cache
+from app.snapshot import SCORE_SNAPSHOT_PATH, warm_start
+from app.serialization import FastJSONResponse, dumps, top_score_row
+from app.rollups import (
+    RETENTION_INTERVAL_HOURS,
+    ROLLUP_SIZE,
+    SCORE_RETENTION_DAYS,
+    compact_scores,
+    ensure_rollups,
+    period_start,
+    top_rollup,
+)
+from app.stats import compute_statistics_from_sql, empty_statistics, statistics
+from app.upstream_guard import upstream_guards
+from app.websocket_manager import manager as websocket_manager
+from app.write_behind import SCORE_WRITE_MODE, score_queue
 from app.schemas import (
     ScoreCreate,
     ScoreResponse,
+    BatchScoreError,
+    BatchScoreResponse,
     TopScoreResponse,
+    LeaderboardPage,
+    RankResponse,
+    MetricPercentile,
+    PercentileResponse,
+    DistributionResponse,
     StatisticsResponse,
 )
 
+SCORE_BATCH_MAX_SIZE = int(os.getenv("SCORE_BATCH_MAX_SIZE", "1000"))
+# Point theme image URLs at /api/images by default
+THEME_IMAGE_PROXY = os.getenv("THEME_IMAGE_PROXY", "false").lower() == "true"
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 try:
-    from app.themes import get_theme_data
+    from app.themes import get_theme_data, get_theme_data_within, refresh_catalogs, warm_theme_cache
+    from app.theme_cache import theme_cache, theme_fetches
+    from app.decks import build_deck, deck_pool
+    from app.prewarm import THEME_PREWARM_SECONDS, theme_prewarmer
 except ImportError as e:
     # Themes module optional
     logger.warning(f"Themes module not available: {e}")
     get_theme_data = None
+    theme_cache = None
+    deck_pool = None
+    theme_prewarmer = None
 
 app = FastAPI(
     title="Memory Game API",
@@ -33,7 +95,6 @@ app = FastAPI(
 
 # CORS middleware - Allow local network access
 # In development, allow connections from localhost and local network IPs
-import os
 import socket
 
 def get_allowed_origins():
@@ -85,8 +146,168 @@ else:
 
 @app.on_event("startup")
 def on_startup() -> None:
-    """Initialize database on startup."""
+    """Initialize database and in-memory score aggregates on startup."""
     create_db_and_tables()
+    with Session(engine) as session:
+        ensure_histograms(session)
+        ensure_rollups(session)
+        leaderboard.load(session)
+        if not (SCORE_SNAPSHOT_PATH and os.path.exists(SCORE_SNAPSHOT_PATH) and warm_start(session, SCORE_SNAPSHOT_PATH)):
+            statistics.load(session)
+            ranking.load(session)
+
+
+@app.on_event("shutdown")
+async def close_async_engines() -> None:
+    """Close the async database connections when DATABASE_ASYNC is enabled."""
+    await dispose_async_engines()
+
+
+def register_score(score: ScoreRecord) -> None:
+    """Update the in-memory aggregates with a newly saved score."""
+    leaderboard.offer(score)
+    statistics.add(score)
+    ranking.add(score)
+    response_cache.bump()
+
+
+async def cached_json(request: Request, key: str, build: Callable[[], Awaitable[Any]]) -> Response:
+    """Serve a JSON body from the response cache, building it on a miss.
+
+    `build` returns JSON-ready content (plain dicts and lists). Responses
+    carry a strong ETag; a matching If-None-Match gets a 304 without
+    touching the database or serializing anything.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        version = response_cache.version
+        body = dumps(await build())
+        entry = response_cache.put(key, body, version)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+@app.on_event("startup")
+async def start_score_queue() -> None:
+    """Start the write-behind queue when SCORE_WRITE_MODE=write_behind."""
+    if SCORE_WRITE_MODE == "write_behind":
+        await score_queue.start(on_commit=register_score)
+
+
+@app.on_event("shutdown")
+async def stop_score_queue() -> None:
+    """Flush queued scores before shutting down."""
+    await score_queue.stop()
+
+
+def run_retention() -> int:
+    """Compact raw scores past the retention window."""
+    with Session(engine) as session:
+        return compact_scores(session)
+
+
+async def retention_loop() -> None:
+    """Periodically compact old raw scores."""
+    while True:
+        try:
+            await asyncio.to_thread(run_retention)
+        except Exception as e:
+            logger.error(f"Error compacting scores: {str(e)}", exc_info=True)
+        await asyncio.sleep(RETENTION_INTERVAL_HOURS * 3600)
+
+
+retention_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+def start_upstream_client() -> None:
+    """Open the pooled HTTP client shared by the theme providers and the image proxy."""
+    upstream_client.start()
+    image_cache.load()
+
+
+@app.on_event("shutdown")
+async def stop_upstream_client() -> None:
+    """Close the pooled HTTP client."""
+    await upstream_client.close()
+
+
+async def theme_catalog_loop() -> None:
+    """Periodically refresh expiring theme catalogs and save their snapshots."""
+    while True:
+        await asyncio.sleep(THEME_CATALOG_REFRESH_SECONDS)
+        try:
+            await refresh_catalogs(horizon=THEME_CATALOG_REFRESH_SECONDS)
+            await asyncio.to_thread(catalog_store.flush)
+        except Exception as e:
+            logger.error(f"Error refreshing theme catalogs: {str(e)}", exc_info=True)
+
+
+theme_catalog_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def start_theme_catalogs() -> None:
+    """Warm the theme cache from catalog snapshots and keep them refreshed."""
+    global theme_catalog_task
+    if get_theme_data is None:
+        return
+    catalog_store.load()
+    warm_theme_cache()
+    theme_catalog_task = asyncio.create_task(theme_catalog_loop())
+
+
+@app.on_event("shutdown")
+async def stop_theme_catalogs() -> None:
+    """Cancel the refresh task and save updated catalogs."""
+    if theme_catalog_task is not None:
+        theme_catalog_task.cancel()
+    catalog_store.flush()
+
+
+@app.on_event("startup")
+async def start_deck_pool() -> None:
+    """Keep decks ready for the pooled themes and grids."""
+    if deck_pool is not None and deck_pool.size > 0:
+        await deck_pool.start()
+
+
+@app.on_event("shutdown")
+async def stop_deck_pool() -> None:
+    """Stop refilling the deck pool."""
+    if deck_pool is not None:
+        await deck_pool.stop()
+
+
+@app.on_event("startup")
+async def start_theme_prewarmer() -> None:
+    """Prewarm the most played themes and grids when THEME_PREWARM_SECONDS is set."""
+    if theme_prewarmer is not None and THEME_PREWARM_SECONDS > 0:
+        await theme_prewarmer.start()
+
+
+@app.on_event("shutdown")
+async def stop_theme_prewarmer() -> None:
+    """Stop the prewarmer."""
+    if theme_prewarmer is not None:
+        await theme_prewarmer.stop()
+
+
+@app.on_event("startup")
+async def start_retention() -> None:
+    """Start score compaction when SCORE_RETENTION_DAYS is set."""
+    global retention_task
+    if SCORE_RETENTION_DAYS > 0:
+        retention_task = asyncio.create_task(retention_loop())
+
+
+@app.on_event("shutdown")
+async def stop_retention() -> None:
+    """Cancel the compaction task."""
+    if retention_task is not None:
+        retention_task.cancel()
 
 
 @app.get("/health")
@@ -95,106 +316,350 @@ def health_check() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+def get_metrics() -> Dict[str, Any]:
+    """Internal counters useful for tuning."""
+    metrics = {
+        "write_queue": score_queue.metrics(),
+        "response_cache": response_cache.metrics(),
+        "upstream_http": upstream_client.metrics(),
+        "image_cache": image_cache.metrics(),
+        "upstream_providers": upstream_guards.metrics(),
+        "websockets": websocket_manager.metrics(),
+    }
+    if theme_cache is not None:
+        metrics["theme_cache"] = theme_cache.metrics()
+        metrics["theme_fetches"] = theme_fetches.metrics()
+        metrics["deck_pool"] = deck_pool.metrics()
+        metrics["theme_prewarm"] = theme_prewarmer.metrics()
+    return metrics
+
+
 @app.post("/api/scores", response_model=ScoreResponse, status_code=201)
-def create_score(
+async def create_score(
     score_data: ScoreCreate, session: Session = Depends(get_session)
 ) -> ScoreResponse:
     """Create a new score."""
     try:
-        score = Score(**score_data.model_dump())
-        session.add(score)
-        session.commit()
-        session.refresh(score)
-        return ScoreResponse.model_validate(score)
+        if score_queue.running:
+            # Write-behind mode: wait for the group commit holding this score
+            score = await score_queue.submit(score_data)
+        else:
+            score = await run_db(session, insert_score, score_data)
+            register_score(score)
+        response = ScoreResponse.model_validate(score)
+        ranks = ranking.rank(score.grid_size, score.score, score.time, score.moves)
+        if ranks is not None:
+            response.global_rank = ranks["global_rank"]
+            response.grid_rank = ranks["grid_rank"]
+        return response
     except Exception as e:
         logger.error(f"Error creating score: {str(e)}", exc_info=True)
-        session.rollback()
+        await run_db(session, Session.rollback)
         raise HTTPException(status_code=500, detail=f"Failed to create score: {str(e)}")
 
 
-@app.get("/api/scores/top", response_model=List[TopScoreResponse])
-def get_top_scores(
-    limit: int = 10, session: Session = Depends(get_session)
-) -> List[TopScoreResponse]:
-    """Get top scores ordered by score (descending) and time (ascending)."""
-    try:
-        statement = (
-            select(Score)
-            .order_by(Score.score.desc(), Score.time.asc(), Score.moves.asc())
-            .limit(limit)
+@app.post("/api/scores/batch", response_model=BatchScoreResponse, status_code=201)
+async def create_scores_batch(
+    items: List[Any] = Body(...), session: Session = Depends(get_session)
+) -> BatchScoreResponse:
+    """Create many scores in a single transaction.
+
+    Each item is validated on its own, even one that is not an object;
+    invalid items are reported in `errors` and the valid ones are still
+    inserted.
+    """
+    if len(items) > SCORE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {SCORE_BATCH_MAX_SIZE} items)",
         )
-        scores = session.exec(statement).all()
 
-        result = []
-        for rank, score in enumerate(scores, start=1):
-            score_dict = score.model_dump()
-            score_dict["rank"] = rank
-            result.append(TopScoreResponse(**score_dict))
+    valid = []
+    positions = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            valid.append(ScoreCreate.model_validate(item))
+            positions.append(index)
+        except ValidationError as e:
+            errors.append(BatchScoreError(index=index, errors=e.errors(include_url=False)))
 
-        return result
+    ids: List[Optional[int]] = [None] * len(items)
+    try:
+        scores = await run_db(session, save_scores, valid)
+    except Exception as e:
+        logger.error(f"Error creating score batch: {str(e)}", exc_info=True)
+        await run_db(session, Session.rollback)
+        raise HTTPException(status_code=500, detail=f"Failed to create scores: {str(e)}")
+
+    for index, score in zip(positions, scores):
+        ids[index] = score.id
+        register_score(score)
+    return BatchScoreResponse(ids=ids, errors=errors)
+
+
+@app.get("/api/scores/top", response_model=List[TopScoreResponse])
+async def get_top_scores(
+    request: Request,
+    limit: int = 10,
+    period: Literal["daily", "weekly", "alltime"] = "alltime",
+    session: Session = Depends(get_session),
+) -> Response:
+    """Get top scores ordered by score (descending) and time (ascending).
+
+    `period` restricts the ranking to the current day or week (UTC, weeks
+    start on Monday); those are served from the rollup tables.
+    """
+
+    async def build() -> List[Dict[str, Any]]:
+        # Rows come from the database or the in-memory leaderboard, so they are
+        # encoded as they are instead of being revalidated by TopScoreResponse
+        if period != "alltime":
+            entries = await run_db(session, top_rollup, period, min(limit, ROLLUP_SIZE))
+            entries = [rollup_as_score(row) for row in entries]
+        else:
+            entries = leaderboard.top(limit)
+        if entries is None:
+            # Not held in memory (leaderboard not warmed or limit above K)
+            entries = await run_db(session, load_top_scores, limit)
+        return [top_score_row(entry, rank) for rank, entry in enumerate(entries, start=1)]
+
+    key = f"top:{period}:{period_start(period, datetime.utcnow())}:{limit}"
+    try:
+        return await cached_json(request, key, build)
     except Exception as e:
         logger.error(f"Error getting top scores: {str(e)}", exc_info=True)
         # Return empty list if there's an error
-        return []
+        return FastJSONResponse([])
+
+
+@app.get("/api/scores/leaderboard", response_model=LeaderboardPage)
+async def get_leaderboard_page(
+    grid_size: Optional[str] = None,
+    theme: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_session),
+) -> Response:
+    """Get one page of the leaderboard, optionally filtered by grid size and theme.
+
+    Pages are addressed by the opaque `next_cursor` of the previous page
+    (keyset pagination), so deep pages cost the same as the first one.
+    Scores removed by retention (SCORE_RETENTION_DAYS) still appear while
+    they are in the all-time rollup, as on /api/scores/top; older ones no
+    longer do.
+    """
+    after = None
+    rank = 0
+    if cursor:
+        try:
+            *after, rank = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    scores = await run_db(session, load_leaderboard_page, limit + 1, grid_size, theme, after)
+
+    items = [top_score_row(score, rank) for rank, score in enumerate(scores[:limit], start=rank + 1)]
+
+    next_cursor = None
+    if len(scores) > limit:
+        next_cursor = encode_cursor(scores[limit - 1], rank + limit)
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
 
 
 @app.get("/api/scores/statistics", response_model=StatisticsResponse)
-def get_statistics(session: Session = Depends(get_session)) -> StatisticsResponse:
+async def get_statistics(request: Request, session: Session = Depends(get_session)) -> Response:
     """Get statistics about all games."""
+
+    async def build() -> Dict[str, Any]:
+        if statistics.loaded:
+            return statistics.snapshot()
+        return await run_db(session, compute_statistics_from_sql)
+
     try:
-        total = session.exec(select(func.count(Score.id))).one() or 0
-
-        if total == 0:
-            return StatisticsResponse(
-                total_participations=0,
-                average_score=0.0,
-                average_time=0.0,
-                average_moves=0.0,
-                best_time=0,
-                best_moves=0,
-                total_players=0,
-            )
-
-        avg_score = session.exec(select(func.avg(Score.score))).one()
-        avg_time = session.exec(select(func.avg(Score.time))).one()
-        avg_moves = session.exec(select(func.avg(Score.moves))).one()
-        # Get best time and moves (minimum for best performance)
-        best_time_result = session.exec(select(func.min(Score.time))).one()
-        best_moves_result = session.exec(select(func.min(Score.moves))).one()
-        # Get distinct player count
-        total_players_result = session.exec(
-            select(func.count(func.distinct(Score.player_name)))
-        ).one()
-        
-        best_time = int(best_time_result) if best_time_result else 0
-        best_moves = int(best_moves_result) if best_moves_result else 0
-        total_players = int(total_players_result) if total_players_result else 0
-
-        return StatisticsResponse(
-            total_participations=total,
-            average_score=float(avg_score) if avg_score else 0.0,
-            average_time=float(avg_time) if avg_time else 0.0,
-            average_moves=float(avg_moves) if avg_moves else 0.0,
-            best_time=best_time,
-            best_moves=best_moves,
-            total_players=total_players,
-        )
+        return await cached_json(request, "statistics", build)
     except Exception as e:
         logger.error(f"Error getting statistics: {str(e)}", exc_info=True)
         # Return default values if there's an error
-        return StatisticsResponse(
-            total_participations=0,
-            average_score=0.0,
-            average_time=0.0,
-            average_moves=0.0,
-            best_time=0,
-            best_moves=0,
-            total_players=0,
+        return FastJSONResponse(empty_statistics())
+
+
+@app.get("/api/scores/statistics/drift")
+async def get_statistics_drift(session: Session = Depends(get_session)) -> Dict[str, Any]:
+    """Recompute statistics with SQL and report fields that differ from memory."""
+    if not statistics.loaded:
+        raise HTTPException(status_code=503, detail="Statistics not loaded")
+    return {"drift": await run_db(session, statistics.diff_against_sql)}
+
+
+@app.get("/api/scores/export")
+async def export_scores(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    grid_size: Optional[str] = None,
+    theme: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+) -> StreamingResponse:
+    """Stream the raw scores as NDJSON or CSV, in id order.
+
+    `since` is inclusive and `until` exclusive (on created_at). Scores
+    already compacted by retention are not part of the export.
+    """
+    # The export opens its own sync session; an AsyncSession cannot be used from the stream thread
+    bind = session.get_bind() if isinstance(session, Session) else read_engine
+    statement = export_statement(grid_size, theme, since, until)
+    return StreamingResponse(
+        iter_export(bind, format, statement),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="scores.{format}"'},
+    )
+
+
+@app.get("/api/scores/{score_id}/rank", response_model=RankResponse)
+async def get_score_rank(score_id: int, session: Session = Depends(get_session)) -> RankResponse:
+    """Get the global and per-grid rank of a saved score."""
+    score = await run_db(session, get_record, score_id)
+    if score is None:
+        raise HTTPException(status_code=404, detail="Score not found")
+    ranks = ranking.rank(score.grid_size, score.score, score.time, score.moves)
+    if ranks is None:
+        ranks = await run_db(
+            session, rank_from_sql, score.grid_size, score.score, score.time, score.moves
         )
+    return RankResponse(id=score.id, grid_size=score.grid_size, **ranks)
+
+
+@app.get("/api/scores/percentiles", response_model=PercentileResponse)
+async def get_percentiles(
+    grid_size: str,
+    theme: Optional[str] = None,
+    score: Optional[int] = Query(None, ge=0),
+    time: Optional[int] = Query(None, ge=0),
+    moves: Optional[int] = Query(None, ge=0),
+    session: Session = Depends(get_session),
+) -> PercentileResponse:
+    """Get the share of games beaten by a score, time and/or moves count.
+
+    Answered from the precomputed histograms, so the cost does not depend
+    on the number of scores. Without `theme`, all themes of the grid count.
+    """
+    values = {"score": score, "time": time, "moves": moves}
+
+    def compute(db: Session) -> PercentileResponse:
+        result = PercentileResponse(grid_size=grid_size, theme=theme, total=0)
+        for metric, value in values.items():
+            histogram = load_histogram(db, metric, grid_size, theme)
+            result.total = sum(histogram.values())
+            if value is not None:
+                setattr(result, metric, MetricPercentile(**percentile(histogram, metric, value)))
+        return result
+
+    return await run_db(session, compute)
+
+
+@app.get("/api/scores/distribution", response_model=DistributionResponse)
+async def get_distribution(
+    grid_size: str,
+    metric: str = Query("time", pattern="^(score|time|moves)$"),
+    theme: Optional[str] = None,
+    session: Session = Depends(get_session),
+) -> DistributionResponse:
+    """Get the histogram of a metric for a grid size (and optionally a theme)."""
+    histogram = await run_db(session, load_histogram, metric, grid_size, theme)
+    return DistributionResponse(
+        grid_size=grid_size,
+        theme=theme,
+        metric=metric,
+        total=sum(histogram.values()),
+        buckets=distribution(histogram, metric),
+    )
+
+
+@app.get("/api/decks/{theme_name}")
+async def get_deck(theme_name: str, grid_size: str = "4x4", seed: Optional[int] = Query(None, ge=0)):
+    """
+    Get a paired and shuffled deck for a theme (numbers, pokemon, dogs, movies, flags, fruits).
+
+    `items` lists each card item once; `layout` gives the item id at every
+    grid position, row by row. The same seed returns the same deck while the
+    theme's catalog is cached; without a seed a ready deck is taken from the pool.
+    """
+    if deck_pool is None:
+        raise HTTPException(status_code=501, detail="Themes feature not available")
+    try:
+        if seed is None:
+            deck = await deck_pool.take(theme_name, grid_size)
+        else:
+            deck = await build_deck(theme_name, grid_size, seed)
+        return deck.to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building {theme_name} deck: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to build deck: {str(e)}")
+
+
+@app.get("/api/images")
+async def get_image(request: Request, url: str) -> Response:
+    """Serve a theme card image through the local content-addressed cache.
+
+    Only HTTPS URLs on IMAGE_PROXY_ALLOWED_HOSTS are proxied. Supports
+    If-None-Match (ETag is the content digest) and single byte ranges.
+    """
+    if not image_cache.is_allowed(url):
+        raise HTTPException(status_code=400, detail="Image host not allowed")
+    image = image_cache.lookup(url)
+    if image is None:
+        try:
+            image = await image_cache.fetch(url)
+        except ImageProxyError as e:
+            logger.warning(f"Error proxying image {url}: {e}")
+            raise HTTPException(status_code=502, detail=f"Failed to fetch image: {str(e)}")
+
+    headers = {"ETag": image.etag, "Cache-Control": IMAGE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag_matches(request.headers.get("if-none-match"), image.etag):
+        return Response(status_code=304, headers=headers)
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == image.etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), image.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{image.size}"})
+    start, end = byte_range or (0, image.size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{image.size}"
+    return StreamingResponse(
+        iter_file(image.path, start, end),
+        status_code=206 if byte_range is not None else 200,
+        media_type=image.content_type,
+        headers=headers,
+    )
+
+
+def proxied_images(request: Request, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copies of theme items whose `image` points at the image proxy."""
+    proxy = str(request.url_for("get_image"))
+    return [
+        {**item, "image": f"{proxy}?{urlencode({'url': item['image']})}"}
+        if image_cache.is_allowed(item.get("image", "")) else item
+        for item in items
+    ]
 
 
 @app.get("/api/themes/{theme_name}")
-async def get_theme(theme_name: str, limit: int = 18):
+async def get_theme(
+    request: Request,
+    theme_name: str,
+    limit: int = 18,
+    proxy_images: bool = THEME_IMAGE_PROXY,
+    deadline_ms: Optional[int] = Query(None, ge=1, le=60000),
+):
     """
     Get theme data (Pokemon, dogs, movies, flags, fruits).
     
@@ -204,6 +669,14 @@ async def get_theme(theme_name: str, limit: int = 18):
     - image: URL to the image (for pokemon, dogs, movies, flags)
     - emoji: Emoji character (for fruits theme only)
     
+    With `proxy_images` (default THEME_IMAGE_PROXY), image URLs point at
+    /api/images so clients share the backend's image cache.
+
+    With `deadline_ms`, the answer never waits longer: past the deadline or
+    on an upstream failure, the last known items of the theme are returned,
+    or fruit emojis when there are none. `source` then tells which
+    ("upstream", "snapshot" or "fruits").
+
     Example response:
     {
         "theme": "pokemon",
@@ -220,8 +693,15 @@ async def get_theme(theme_name: str, limit: int = 18):
     if get_theme_data is None:
         raise HTTPException(status_code=501, detail="Themes feature not available")
     try:
-        theme_data = await get_theme_data(theme_name, limit)
-        return {"theme": theme_name, "data": theme_data}
+        if deadline_ms is None:
+            theme_data, source = await get_theme_data(theme_name, limit), None
+        else:
+            theme_data, source = await get_theme_data_within(theme_name, limit, deadline_ms / 1000)
+        if proxy_images:
+            theme_data = proxied_images(request, theme_data)
+        if source is None:
+            return {"theme": theme_name, "data": theme_data}
+        return {"theme": theme_name, "data": theme_data, "source": source}
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,76 @@
+"""In-place migrations for databases created by earlier versions of the schema."""
+
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+
+from app.models import GridSize, Player, Score, Theme
+
+logger = logging.getLogger(__name__)
+
+# Indexes of the score table before names moved to lookup tables
+LEGACY_SCORE_INDEXES = (
+    "ix_score_ranking",
+    "ix_score_grid_ranking",
+    "ix_score_theme_ranking",
+    "ix_score_grid_theme_ranking",
+)
+
+
+def has_legacy_score_table(connection: Connection) -> bool:
+    """Whether the score table still stores player names, grid sizes and themes inline."""
+    inspector = inspect(connection)
+    if not inspector.has_table("score"):
+        return False
+    return "player_name" in {column["name"] for column in inspector.get_columns("score")}
+
+
+def migrate_score_dimensions(engine: Engine) -> bool:
+    """Move inline score names into the player, gridsize and theme tables.
+
+    Runs in one transaction: the old table is renamed, the new one created
+    and filled with an INSERT ... SELECT joining the lookup tables, then the
+    old table is dropped. Score ids are kept. Returns False when there was
+    nothing to migrate.
+    """
+    with engine.begin() as connection:
+        if not has_legacy_score_table(connection):
+            return False
+        tables = inspect(connection).get_table_names()
+        for index in LEGACY_SCORE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        connection.execute(text("ALTER TABLE score RENAME TO score_legacy"))
+        SQLModel.metadata.create_all(
+            connection, tables=[Player.__table__, GridSize.__table__, Theme.__table__, Score.__table__]
+        )
+
+        player_names = "SELECT player_name FROM score_legacy"
+        if "compactedplayer" in tables:
+            # Players of compacted scores were kept in their own table
+            player_names += " UNION SELECT player_name FROM compactedplayer"
+        connection.execute(text(f"INSERT INTO player (name) SELECT DISTINCT player_name FROM ({player_names}) AS names"))
+        connection.execute(text("INSERT INTO gridsize (name) SELECT DISTINCT grid_size FROM score_legacy"))
+        connection.execute(text("INSERT INTO theme (name) SELECT DISTINCT theme FROM score_legacy"))
+        migrated = connection.execute(
+            text(
+                "INSERT INTO score (id, player_id, score, moves, time, grid_size_id, theme_id, created_at) "
+                "SELECT s.id, p.id, s.score, s.moves, s.time, g.id, t.id, s.created_at "
+                "FROM score_legacy AS s "
+                "JOIN player AS p ON p.name = s.player_name "
+                "JOIN gridsize AS g ON g.name = s.grid_size "
+                "JOIN theme AS t ON t.name = s.theme"
+            )
+        ).rowcount
+
+        connection.execute(text("DROP TABLE score_legacy"))
+        if "compactedplayer" in tables:
+            connection.execute(text("DROP TABLE compactedplayer"))
+        if connection.dialect.name == "postgresql":
+            # Explicit ids do not advance the serial sequence
+            connection.execute(
+                text("SELECT setval(pg_get_serial_sequence('score', 'id'), COALESCE((SELECT max(id) FROM score), 1))")
+            )
+    logger.info(f"Migrated {migrated} scores to the player, grid size and theme lookup tables")
+    return True
@@ -1,14 +1,53 @@
 """Database models."""
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 
+class Player(SQLModel, table=True):
+    """Distinct player name referenced by scores."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(max_length=100, unique=True)
+
+
+class GridSize(SQLModel, table=True):
+    """Grid size label (e.g. "4x4") referenced by scores."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(max_length=10, unique=True)
+
+
+class Theme(SQLModel, table=True):
+    """Card theme name referenced by scores."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(max_length=20, unique=True)
+
+
 class Score(SQLModel, table=True):
-    """Score model for storing game results."""
+    """Score model for storing game results.
+
+    The player, grid size and theme are stored as ids into their lookup
+    tables; ScoreRecord is the same score with the names resolved.
+    """
 
     id: Optional[int] = Field(default=None, primary_key=True)
+    player_id: int = Field(foreign_key="player.id")
+    score: int = Field(ge=0)
+    moves: int = Field(ge=0)
+    time: int = Field(ge=0, description="Time in seconds")
+    grid_size_id: int = Field(foreign_key="gridsize.id")
+    theme_id: int = Field(foreign_key="theme.id")
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+
+
+class ScoreRecord(SQLModel):
+    """A score with its player name, grid size and theme (the API shape)."""
+
+    id: Optional[int] = None
     player_name: str = Field(max_length=100)
     score: int = Field(ge=0)
     moves: int = Field(ge=0)
@@ -17,3 +56,67 @@ class Score(SQLModel, table=True):
     theme: str = Field(max_length=20)
     created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
 
+
+# Composite indexes matching the leaderboard ordering (score desc, time, moves, id)
+# so that filtered leaderboard pages are index range scans.
+Index("ix_score_ranking", Score.score.desc(), Score.time, Score.moves, Score.id)
+Index("ix_score_grid_ranking", Score.grid_size_id, Score.score.desc(), Score.time, Score.moves, Score.id)
+Index("ix_score_theme_ranking", Score.theme_id, Score.score.desc(), Score.time, Score.moves, Score.id)
+Index(
+    "ix_score_grid_theme_ranking",
+    Score.grid_size_id,
+    Score.theme_id,
+    Score.score.desc(),
+    Score.time,
+    Score.moves,
+    Score.id,
+)
+Index("ix_score_player", Score.player_id)
+
+
+class ScoreHistogram(SQLModel, table=True):
+    """Count of scores per (grid_size, theme, metric, bucket)."""
+
+    grid_size: str = Field(max_length=10, primary_key=True)
+    theme: str = Field(max_length=20, primary_key=True)
+    metric: str = Field(max_length=10, primary_key=True)
+    bucket: int = Field(primary_key=True)
+    count: int = Field(default=0, ge=0)
+
+
+class LeaderboardRollup(SQLModel, table=True):
+    """Copy of a score that is in the top K of a daily, weekly or all-time period."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    period: str = Field(max_length=10)
+    period_start: date
+    score_id: int
+    player_name: str = Field(max_length=100)
+    score: int = Field(ge=0)
+    moves: int = Field(ge=0)
+    time: int = Field(ge=0)
+    grid_size: str = Field(max_length=10)
+    theme: str = Field(max_length=20)
+    created_at: datetime
+
+
+Index(
+    "ix_leaderboardrollup_ranking",
+    LeaderboardRollup.period,
+    LeaderboardRollup.period_start,
+    LeaderboardRollup.score.desc(),
+    LeaderboardRollup.time,
+    LeaderboardRollup.moves,
+    LeaderboardRollup.score_id,
+)
+
+
+class CompactedScore(SQLModel, table=True):
+    """Number of deleted raw scores per (grid_size, theme, score, time, moves)."""
+
+    grid_size: str = Field(max_length=10, primary_key=True)
+    theme: str = Field(max_length=20, primary_key=True)
+    score: int = Field(primary_key=True)
+    time: int = Field(primary_key=True)
+    moves: int = Field(primary_key=True)
+    count: int = Field(default=0, ge=0)
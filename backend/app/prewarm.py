@@ -0,0 +1,182 @@
+"""Background prewarming of the themes and grids people play most.
+
+The most played (theme, grid size) pairs of recent scores are added to the
+deck pool and their decks built ahead of time; the rest of an upstream
+request budget prefetches Pokemon and movie items into the theme cache.
+Runs only while no upstream request is in flight.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, func, select
+
+from app.database import read_engine, run_db
+from app.decks import deck_pool, grid_positions
+from app.http_client import upstream_client
+from app.models import GridSize, Score, Theme
+from app.themes import ITEM_THEMES, THEME_PROVIDERS, prefetch_items
+
+logger = logging.getLogger(__name__)
+
+# Seconds between prewarm runs (0 disables the prewarmer)
+THEME_PREWARM_SECONDS = float(os.getenv("THEME_PREWARM_SECONDS", "1800"))
+# Most played (theme, grid size) pairs to prewarm
+THEME_PREWARM_TOP = int(os.getenv("THEME_PREWARM_TOP", "5"))
+# Scores counted, by age (0: all of them)
+THEME_PREWARM_WINDOW_DAYS = float(os.getenv("THEME_PREWARM_WINDOW_DAYS", "7"))
+# Upstream requests one run may send
+THEME_PREWARM_BUDGET = int(os.getenv("THEME_PREWARM_BUDGET", "100"))
+
+# Seconds between idle checks while upstream requests are in flight
+IDLE_POLL_SECONDS = 5
+
+
+def play_frequency(session: Session, since: Optional[datetime] = None) -> List[Tuple[str, str, int]]:
+    """(theme, grid size, plays) of scores since `since`, most played first."""
+    plays = func.count(Score.id)
+    statement = (
+        select(Theme.name, GridSize.name, plays)
+        .join(Theme, Theme.id == Score.theme_id)
+        .join(GridSize, GridSize.id == Score.grid_size_id)
+        .group_by(Theme.name, GridSize.name)
+        .order_by(plays.desc(), Theme.name, GridSize.name)
+    )
+    if since is not None:
+        statement = statement.where(Score.created_at >= since)
+    return [(theme, grid_size, count) for theme, grid_size, count in session.exec(statement)]
+
+
+def is_poolable(theme: str, grid_size: str) -> bool:
+    """Whether decks can be built for a recorded theme and grid size."""
+    if theme != "numbers" and theme not in THEME_PROVIDERS:
+        return False
+    try:
+        grid_positions(grid_size)
+    except ValueError:
+        return False
+    return True
+
+
+def upstream_requests() -> int:
+    """Upstream requests sent so far by the shared HTTP client."""
+    return upstream_client.metrics().get("requests", 0)
+
+
+class ThemePrewarmer:
+    """Pools decks for the most played themes and grids, within an upstream request budget."""
+
+    def __init__(
+        self,
+        top: int = THEME_PREWARM_TOP,
+        budget: int = THEME_PREWARM_BUDGET,
+        window_days: float = THEME_PREWARM_WINDOW_DAYS,
+    ):
+        """Initialize without play statistics."""
+        self.top = top
+        self.budget = budget
+        self.window_days = window_days
+        self.popular: List[Tuple[str, str, int]] = []
+        self.runs = 0
+        self.skipped = 0
+        self.requests = 0
+        self.decks = 0
+        self.prefetched = 0
+        self.last_run: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def idle(self) -> bool:
+        """Whether no upstream request is in flight."""
+        return upstream_client.metrics().get("in_flight", 0) == 0
+
+    async def run_once(self, session: Session) -> Dict[str, int]:
+        """Read play counts, then build decks and prefetch items until the budget is spent.
+
+        The budget is checked before each pair and prefetch, so a run may
+        exceed it by the requests of one deck.
+        """
+        since = datetime.utcnow() - timedelta(days=self.window_days) if self.window_days > 0 else None
+        rows = await run_db(session, play_frequency, since)
+        self.popular = [row for row in rows if is_poolable(row[0], row[1])][: self.top]
+        deck_pool.track((theme, grid_size) for theme, grid_size, _ in self.popular)
+
+        start = upstream_requests()
+        decks = prefetched = 0
+        for theme, grid_size, _ in self.popular:
+            if upstream_requests() - start >= self.budget:
+                break
+            decks += await deck_pool.fill_key((theme, grid_size))
+        for theme in dict.fromkeys(theme for theme, _, _ in self.popular if theme in ITEM_THEMES):
+            remaining = self.budget - (upstream_requests() - start)
+            if remaining <= 0:
+                break
+            prefetched += await prefetch_items(theme, remaining)
+
+        spent = upstream_requests() - start
+        self.runs += 1
+        self.requests += spent
+        self.decks += decks
+        self.prefetched += prefetched
+        self.last_run = datetime.utcnow()
+        return {"decks": decks, "prefetched": prefetched, "requests": spent}
+
+    async def start(self, interval: float = THEME_PREWARM_SECONDS) -> None:
+        """Prewarm now and every `interval` seconds in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        """Stop the background task."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            next_run = loop.time() + interval
+            # Wait for a quiet moment, at most until the next run
+            while not self.idle() and loop.time() + IDLE_POLL_SECONDS < next_run:
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+            if self.idle():
+                try:
+                    with Session(read_engine) as session:
+                        result = await self.run_once(session)
+                    logger.info(
+                        f"Prewarmed {result['decks']} decks and {result['prefetched']} theme items "
+                        f"with {result['requests']} upstream requests"
+                    )
+                except Exception as e:
+                    logger.error(f"Error prewarming themes: {str(e)}", exc_info=True)
+            else:
+                self.skipped += 1
+            await asyncio.sleep(max(next_run - loop.time(), 0))
+
+    def clear(self) -> None:
+        """Forget the play statistics and reset the counters."""
+        self.popular = []
+        self.runs = self.skipped = self.requests = self.decks = self.prefetched = 0
+        self.last_run = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Prewarmed pairs and counters."""
+        return {
+            "popular": [
+                {"theme": theme, "grid_size": grid_size, "plays": plays}
+                for theme, grid_size, plays in self.popular
+            ],
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "requests": self.requests,
+            "decks": self.decks,
+            "prefetched": self.prefetched,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+        }
+
+
+# Global theme prewarmer instance
+theme_prewarmer = ThemePrewarmer()
@@ -0,0 +1,245 @@
+"""Order-statistic index answering "what rank is this score" in O(log n)."""
+
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from math import isqrt
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, and_, func, or_, select
+
+from app.dimensions import grid_size_id_clause
+from app.models import CompactedScore, GridSize, Score, ScoreRecord
+
+logger = logging.getLogger(__name__)
+
+
+class FenwickTree:
+    """Counts of integers with O(log n) prefix sums.
+
+    The tree is indexed by rank among the distinct values seen (coordinate
+    compression), so its size follows the number of distinct values, not
+    their magnitude. New values wait in a small buffer that is merged into
+    the tree once it outgrows the square root of the tree size.
+    """
+
+    MIN_PENDING = 32
+
+    def __init__(self):
+        """Initialize an empty tree."""
+        self._keys: List[int] = []  # distinct values in the tree, sorted
+        self._counts = array("q")  # count per key
+        self._tree = array("q", [0])
+        self._pending: Dict[int, int] = {}  # values not in the tree yet
+        self.total = 0
+
+    def _merge_pending(self) -> None:
+        counts = dict(zip(self._keys, self._counts))
+        for value, delta in self._pending.items():
+            counts[value] = counts.get(value, 0) + delta
+        self._pending = {}
+        self._keys = sorted(counts)
+        self._counts = array("q", (counts[value] for value in self._keys))
+        tree = array("q", [0]) + self._counts
+        size = len(self._keys)
+        # Linear-time Fenwick construction
+        for index in range(1, size + 1):
+            parent = index + (index & -index)
+            if parent <= size:
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def add(self, value: int, delta: int = 1) -> None:
+        """Add `delta` occurrences of `value`."""
+        self.total += delta
+        position = bisect_left(self._keys, value)
+        if position == len(self._keys) or self._keys[position] != value:
+            self._pending[value] = self._pending.get(value, 0) + delta
+            if len(self._pending) > max(self.MIN_PENDING, isqrt(len(self._keys))):
+                self._merge_pending()
+            return
+        self._counts[position] += delta
+        index = position + 1
+        size = len(self._tree)
+        while index < size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def count_at_most(self, value: int) -> int:
+        """Number of recorded values <= `value`."""
+        index = bisect_right(self._keys, value)
+        result = sum(delta for other, delta in self._pending.items() if other <= value)
+        while index > 0:
+            result += self._tree[index]
+            index -= index & -index
+        return result
+
+
+class RankIndex:
+    """Counts of (score, time, moves) tuples supporting "how many are better" queries.
+
+    A score is better than another when it has a higher score, then a lower
+    time, then fewer moves (the leaderboard ordering).
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._by_score = FenwickTree()
+        self._by_time: Dict[int, FenwickTree] = {}
+        self._by_moves: Dict[Tuple[int, int], Counter] = {}
+
+    @property
+    def total(self) -> int:
+        """Number of recorded scores."""
+        return self._by_score.total
+
+    def add(self, score: int, time: int, moves: int, count: int = 1) -> None:
+        """Record `count` games with this result."""
+        self._by_score.add(score, count)
+        self._by_time.setdefault(score, FenwickTree()).add(time, count)
+        self._by_moves.setdefault((score, time), Counter())[moves] += count
+
+    def count_better(self, score: int, time: int, moves: int) -> int:
+        """Number of recorded games strictly better than this result."""
+        better = self._by_score.total - self._by_score.count_at_most(score)
+        times = self._by_time.get(score)
+        if times is not None:
+            better += times.count_at_most(time - 1)
+        same_time = self._by_moves.get((score, time))
+        if same_time:
+            better += sum(count for other, count in same_time.items() if other < moves)
+        return better
+
+
+class ScoreRanking:
+    """Global and per-grid rank indexes over all saved scores."""
+
+    def __init__(self):
+        """Initialize empty indexes."""
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._global = RankIndex()
+        self._grids: Dict[str, RankIndex] = {}
+
+    def _add(self, grid_size: str, score: int, time: int, moves: int, count: int = 1) -> None:
+        self._global.add(score, time, moves, count)
+        self._grids.setdefault(grid_size, RankIndex()).add(score, time, moves, count)
+
+    def add(self, score: ScoreRecord) -> None:
+        """Account for a newly saved score."""
+        with self._lock:
+            if self.loaded:
+                self._add(score.grid_size, score.score, score.time, score.moves)
+
+    def rebuild(self, rows: Iterable[tuple], compacted: Iterable[tuple] = ()) -> None:
+        """Rebuild from (grid_size, score, time, moves) tuples.
+
+        `compacted` holds (grid_size, score, time, moves, count) tuples for
+        scores folded away by retention.
+        """
+        global_index = RankIndex()
+        grids: Dict[str, RankIndex] = {}
+        for grid_size, score, time, moves in rows:
+            global_index.add(score, time, moves)
+            grids.setdefault(grid_size, RankIndex()).add(score, time, moves)
+        for grid_size, score, time, moves, count in compacted:
+            global_index.add(score, time, moves, count)
+            grids.setdefault(grid_size, RankIndex()).add(score, time, moves, count)
+        with self._lock:
+            self._global = global_index
+            self._grids = grids
+            self.loaded = True
+
+    def load(self, session: Session, rows: Optional[Iterable[tuple]] = None) -> None:
+        """Rebuild from the raw and compacted scores in a single streaming pass.
+
+        `rows` replaces the scan of the raw scores table when given (warm start).
+        """
+        if rows is None:
+            statement = select(GridSize.name, Score.score, Score.time, Score.moves).join(
+                GridSize, GridSize.id == Score.grid_size_id
+            )
+            rows = session.exec(statement.execution_options(yield_per=1000))
+        self.rebuild(
+            rows,
+            session.exec(
+                select(
+                    CompactedScore.grid_size,
+                    CompactedScore.score,
+                    CompactedScore.time,
+                    CompactedScore.moves,
+                    CompactedScore.count,
+                )
+            ),
+        )
+
+    def clear(self) -> None:
+        """Drop all indexes and mark the ranking as not loaded."""
+        with self._lock:
+            self._global = RankIndex()
+            self._grids = {}
+            self.loaded = False
+
+    def rank(self, grid_size: str, score: int, time: int, moves: int) -> Optional[Dict[str, int]]:
+        """Global and per-grid rank (1 + number of strictly better games)."""
+        with self._lock:
+            if not self.loaded:
+                return None
+            grid = self._grids.get(grid_size, RankIndex())
+            return {
+                "global_rank": self._global.count_better(score, time, moves) + 1,
+                "global_total": self._global.total,
+                "grid_rank": grid.count_better(score, time, moves) + 1,
+                "grid_total": grid.total,
+            }
+
+
+def better_than_clause(score: int, time: int, moves: int):
+    """SQL condition selecting games strictly better than this result."""
+    return or_(
+        Score.score > score,
+        and_(
+            Score.score == score,
+            or_(Score.time < time, and_(Score.time == time, Score.moves < moves)),
+        ),
+    )
+
+
+def better_than_compacted(score: int, time: int, moves: int):
+    """better_than_clause for the compacted results table."""
+    return or_(
+        CompactedScore.score > score,
+        and_(
+            CompactedScore.score == score,
+            or_(
+                CompactedScore.time < time,
+                and_(CompactedScore.time == time, CompactedScore.moves < moves),
+            ),
+        ),
+    )
+
+
+def rank_from_sql(session: Session, grid_size: str, score: int, time: int, moves: int) -> Dict[str, int]:
+    """Compute the ranks with index range counts (fallback when not loaded)."""
+
+    def count(*conditions) -> int:
+        live = session.exec(select(func.count(Score.id)).where(*conditions[:1])).one()
+        compacted = session.exec(
+            select(func.coalesce(func.sum(CompactedScore.count), 0)).where(*conditions[1:])
+        ).one()
+        return int(live) + int(compacted)
+
+    better = (better_than_clause(score, time, moves), better_than_compacted(score, time, moves))
+    in_grid = (Score.grid_size_id == grid_size_id_clause(grid_size), CompactedScore.grid_size == grid_size)
+    return {
+        "global_rank": count(better[0], better[1]) + 1,
+        "global_total": count(),
+        "grid_rank": count(and_(in_grid[0], better[0]), and_(in_grid[1], better[1])) + 1,
+        "grid_total": count(in_grid[0], in_grid[1]),
+    }
+
+
+# Global score ranking instance
+ranking = ScoreRanking()
@@ -0,0 +1,109 @@
+"""Pre-serialized responses for the score read endpoints, validated by ETag."""
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Maximum number of cached (endpoint, query) bodies; 0 disables the cache.
+# The version is per process: disable it when running several workers.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized JSON body and its strong ETag."""
+
+    body: bytes
+    etag: str
+    version: int
+
+
+def make_etag(version: int, body: bytes) -> str:
+    """Strong ETag from the scores version and a digest of the body."""
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison, RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Response bodies keyed by request, valid for one scores version.
+
+    Every saved score bumps the version, which invalidates all entries at
+    once; entries built from a stale version are never stored.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        """Initialize an empty cache at version 0."""
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, CachedResponse] = {}
+        self._lock = threading.Lock()
+
+    def bump(self) -> None:
+        """Invalidate every cached response (a score was saved)."""
+        with self._lock:
+            self.version += 1
+            self._entries = {}
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Cached response for the current version, if any."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key: str, body: bytes, version: int) -> CachedResponse:
+        """Store a body built while the scores were at `version`.
+
+        The body is still returned (with its ETag) when the version moved on
+        in the meantime, but it is not kept.
+        """
+        entry = CachedResponse(body=body, etag=make_etag(version, body), version=version)
+        with self._lock:
+            if version == self.version and self.max_entries > 0:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = entry
+        return entry
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries = {}
+            self.hits = 0
+            self.misses = 0
+
+    def metrics(self) -> Dict[str, int]:
+        """Version, size and hit counters."""
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Global response cache instance
+response_cache = ResponseCache()
@@ -0,0 +1,258 @@
+"""Daily, weekly and all-time leaderboard rollups and raw score retention."""
+
+import argparse
+import heapq
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, and_, func, or_, select
+
+from app.dimensions import select_records
+from app.leaderboard import LEADERBOARD_SIZE
+from app.models import CompactedScore, LeaderboardRollup, Score, ScoreRecord
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("daily", "weekly", "alltime")
+ROLLUP_SIZE = int(os.getenv("ROLLUP_SIZE", str(LEADERBOARD_SIZE)))
+# Raw scores older than this are compacted into the rollups; 0 keeps everything
+SCORE_RETENTION_DAYS = int(os.getenv("SCORE_RETENTION_DAYS", "0"))
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+
+ALLTIME_START = date(1970, 1, 1)
+
+# First key of the Postgres advisory locks taken on rollup periods
+ROLLUP_LOCK_NAMESPACE = 0x524F4C4C  # "ROLL"
+
+ROLLUP_ORDER = (
+    LeaderboardRollup.score.desc(),
+    LeaderboardRollup.time.asc(),
+    LeaderboardRollup.moves.asc(),
+    LeaderboardRollup.score_id.asc(),
+)
+
+
+def period_start(period: str, moment: datetime) -> date:
+    """First day of the period containing `moment`."""
+    if period == "daily":
+        return moment.date()
+    if period == "weekly":
+        return moment.date() - timedelta(days=moment.weekday())
+    if period == "alltime":
+        return ALLTIME_START
+    raise ValueError(f"Unknown period '{period}'")
+
+
+def rollup_key(row) -> Tuple[int, int, int, int]:
+    """Leaderboard sort key of a rollup row (smaller is better)."""
+    return (-row.score, row.time, row.moves, row.score_id)
+
+
+def lock_periods(session: Session, periods: Iterable[Tuple[str, date]]) -> None:
+    """Serialize rollup updates of the same periods across Postgres transactions.
+
+    SQLite needs no lock: the transaction inserting the scores already holds
+    the database write lock.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    # Sorted so that concurrent batches take their locks in the same order
+    for period, start in sorted(periods):
+        lock_key = PERIODS.index(period) * 1_000_000 + start.toordinal()
+        session.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_NAMESPACE, lock_key)))
+
+
+def record_rollups(session: Session, scores: Iterable[ScoreRecord], size: int = ROLLUP_SIZE) -> None:
+    """Add newly inserted scores to the period rollups they make (no commit).
+
+    Each period keeps at most `size` rows: when it is full, better scores
+    replace the current worst rows. The rows of the touched periods are
+    read in one query, merged in memory and written with one bulk delete
+    and one bulk insert.
+    """
+    offered: Dict[Tuple[str, date], list] = {}
+    for score in scores:
+        key = (-score.score, score.time, score.moves, score.id)
+        for period in PERIODS:
+            offered.setdefault((period, period_start(period, score.created_at)), []).append((key, score))
+    if not offered:
+        return
+    lock_periods(session, offered)
+
+    current: Dict[Tuple[str, date], list] = {}
+    rows = session.exec(
+        select(
+            LeaderboardRollup.id,
+            LeaderboardRollup.period,
+            LeaderboardRollup.period_start,
+            LeaderboardRollup.score,
+            LeaderboardRollup.time,
+            LeaderboardRollup.moves,
+            LeaderboardRollup.score_id,
+        ).where(
+            or_(*(
+                and_(LeaderboardRollup.period == period, LeaderboardRollup.period_start == start)
+                for period, start in offered
+            ))
+        )
+    )
+    for row in rows:
+        current.setdefault((row.period, row.period_start), []).append((rollup_key(row), row.id))
+
+    stale: List[int] = []
+    added: List[dict] = []
+    for (period, start), candidates in offered.items():
+        existing = current.get((period, start), [])
+        kept = {key for key, _ in heapq.nsmallest(size, existing + candidates, key=lambda entry: entry[0])}
+        stale.extend(rollup_id for key, rollup_id in existing if key not in kept)
+        added.extend(
+            {
+                "period": period,
+                "period_start": start,
+                "score_id": score.id,
+                "player_name": score.player_name,
+                "score": score.score,
+                "moves": score.moves,
+                "time": score.time,
+                "grid_size": score.grid_size,
+                "theme": score.theme,
+                "created_at": score.created_at,
+            }
+            for key, score in candidates
+            if key in kept
+        )
+    if stale:
+        session.execute(delete(LeaderboardRollup).where(LeaderboardRollup.id.in_(stale)))
+    if added:
+        session.execute(insert(LeaderboardRollup), added)
+
+
+def top_rollup(
+    session: Session, period: str, limit: int, moment: Optional[datetime] = None
+) -> List[LeaderboardRollup]:
+    """Best rows of the period containing `moment` (now by default)."""
+    start = period_start(period, moment or datetime.utcnow())
+    return session.exec(
+        select(LeaderboardRollup)
+        .where(LeaderboardRollup.period == period, LeaderboardRollup.period_start == start)
+        .order_by(*ROLLUP_ORDER)
+        .limit(limit)
+    ).all()
+
+
+def rebuild_rollups(session: Session, chunk_size: int = 5000, size: int = ROLLUP_SIZE) -> None:
+    """Recompute all period rollups from the raw scores table.
+
+    Scores are streamed in chunks and each period keeps a bounded heap of
+    its best rows. Rows whose raw score was already compacted away are kept.
+    """
+    heaps: Dict[Tuple[str, date], list] = {}
+
+    def offer(period: str, start: date, key: Tuple[int, int, int, int], row: dict) -> None:
+        # Max-heap on the sort key (via negation) so the worst row is on top
+        entry = (tuple(-part for part in key), row)
+        heap = heaps.setdefault((period, start), [])
+        if len(heap) < size:
+            heapq.heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+    compacted = session.exec(
+        select(LeaderboardRollup).where(LeaderboardRollup.score_id.not_in(select(Score.id)))
+    ).all()
+    for rollup in compacted:
+        row = rollup.model_dump(exclude={"id"})
+        offer(rollup.period, rollup.period_start, rollup_key(rollup), row)
+
+    statement = select_records().execution_options(yield_per=chunk_size)
+    for chunk in session.exec(statement).partitions():
+        for score in chunk:
+            key = (-score.score, score.time, score.moves, score.id)
+            row = score._asdict()
+            row["score_id"] = row.pop("id")
+            for period in PERIODS:
+                start = period_start(period, score.created_at)
+                offer(period, start, key, {**row, "period": period, "period_start": start})
+
+    session.execute(delete(LeaderboardRollup))
+    rows = [row for heap in heaps.values() for _, row in heap]
+    for offset in range(0, len(rows), chunk_size):
+        session.execute(insert(LeaderboardRollup), rows[offset : offset + chunk_size])
+    session.commit()
+    logger.info(f"Rebuilt leaderboard rollups ({len(rows)} rows in {len(heaps)} periods)")
+
+
+def ensure_rollups(session: Session) -> None:
+    """Build the rollups once for databases that predate them."""
+    has_rollups = session.exec(select(LeaderboardRollup.id).limit(1)).first() is not None
+    has_scores = session.exec(select(Score.id).limit(1)).first() is not None
+    if has_scores and not has_rollups:
+        rebuild_rollups(session)
+
+
+def compact_scores(
+    session: Session,
+    retention_days: int = SCORE_RETENTION_DAYS,
+    chunk_size: int = 5000,
+    now: Optional[datetime] = None,
+) -> int:
+    """Fold raw scores older than the retention window into the rollups and delete them.
+
+    Leaderboard rows already live in LeaderboardRollup, histograms are
+    cumulative and players are kept, so only the per-result counts needed
+    for all-time statistics and ranks are kept. Returns the number of
+    deleted rows.
+    """
+    if retention_days <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    dialect = session.get_bind().dialect.name
+    upsert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    deleted = 0
+    while True:
+        rows = session.exec(
+            select_records().where(Score.created_at < cutoff).order_by(Score.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        counts = Counter((row.grid_size, row.theme, row.score, row.time, row.moves) for row in rows)
+        statement = upsert(CompactedScore)
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["grid_size", "theme", "score", "time", "moves"],
+                set_={"count": CompactedScore.count + statement.excluded.count},
+            ),
+            [
+                {"grid_size": g, "theme": t, "score": s, "time": tm, "moves": m, "count": c}
+                for (g, t, s, tm, m), c in counts.items()
+            ],
+        )
+        session.execute(delete(Score).where(Score.id.in_([row.id for row in rows])))
+        session.commit()
+        deleted += len(rows)
+    if deleted:
+        logger.info(f"Compacted {deleted} scores older than {cutoff:%Y-%m-%d}")
+    return deleted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Leaderboard rollups and score retention")
+    parser.add_argument("command", choices=["compact", "rebuild"])
+    parser.add_argument("--retention-days", type=int, default=SCORE_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    from app.database import create_db_and_tables, engine
+
+    logging.basicConfig(level=logging.INFO)
+    create_db_and_tables()
+    with Session(engine) as db_session:
+        if args.command == "compact":
+            compact_scores(db_session, args.retention_days)
+        else:
+            rebuild_rollups(db_session)
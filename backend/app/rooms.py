@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
 
+from app.decks import Deck
+
 
 class RoomStatus(Enum):
     """Room status."""
@@ -36,6 +38,7 @@ class GameRoom:
     players: Dict[str, Player] = field(default_factory=dict)
     status: RoomStatus = RoomStatus.WAITING
     settings: Optional[Dict] = None
+    deck: Optional[Deck] = None
     created_at: datetime = field(default_factory=datetime.utcnow)
     expires_at: datetime = field(default_factory=lambda: datetime.utcnow() + timedelta(hours=2))
 
@@ -133,6 +136,14 @@ class RoomManager:
             return self.rooms.get(room_code)
         return None
 
+    def deal_deck(self, code: str, deck: Deck) -> bool:
+        """Set the deck shared by every player of a waiting room."""
+        room = self.rooms.get(code)
+        if not room or room.status != RoomStatus.WAITING:
+            return False
+        room.deck = deck
+        return True
+
     def update_room_status(self, code: str, status: RoomStatus) -> bool:
         """Update room status."""
         room = self.rooms.get(code)
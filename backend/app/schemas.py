@@ -2,16 +2,21 @@
 
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
+
+# Upper bounds of a submitted game, far above any real game
+MAX_SCORE = 10_000
+MAX_MOVES = 100_000
+MAX_TIME_SECONDS = 86_400
 
 
 class ScoreCreate(BaseModel):
     """Schema for creating a score."""
 
     player_name: str = Field(..., max_length=100)
-    score: int = Field(..., ge=0)
-    moves: int = Field(..., ge=0)
-    time: int = Field(..., ge=0, description="Time in seconds")
+    score: int = Field(..., ge=0, le=MAX_SCORE)
+    moves: int = Field(..., ge=0, le=MAX_MOVES)
+    time: int = Field(..., ge=0, le=MAX_TIME_SECONDS, description="Time in seconds")
     grid_size: str = Field(..., max_length=10)
     theme: str = Field(..., max_length=20)
 
@@ -27,6 +32,10 @@ class ScoreResponse(BaseModel):
     grid_size: str
     theme: str
     created_at: datetime
+    # Rank among all games and among games on the same grid (1 = best),
+    # filled in when the score is created
+    global_rank: Optional[int] = None
+    grid_rank: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -49,6 +58,88 @@ class TopScoreResponse(BaseModel):
         from_attributes = True
 
 
+class LeaderboardPage(BaseModel):
+    """Schema for a page of a filtered leaderboard."""
+
+    items: List[TopScoreResponse]
+    next_cursor: Optional[str] = None
+
+
+class BatchScoreError(BaseModel):
+    """Schema for a rejected item of a score batch."""
+
+    index: int
+    errors: List[Any]
+
+
+class BatchScoreResponse(BaseModel):
+    """Schema for batch score creation response.
+
+    `ids` is aligned with the submitted list; rejected items have a null id
+    and are described in `errors`.
+    """
+
+    ids: List[Optional[int]]
+    errors: List[BatchScoreError]
+
+
+class RankResponse(BaseModel):
+    """Schema for the rank of a saved score.
+
+    Ranks are 1 + the number of strictly better games, so equal results
+    share a rank.
+    """
+
+    id: int
+    grid_size: str
+    global_rank: int
+    global_total: int
+    grid_rank: int
+    grid_total: int
+
+
+class MetricPercentile(BaseModel):
+    """Schema for the percentile of one metric value.
+
+    `percentile` is the share of games (0-100) this value beats; the bucket
+    bounds give the histogram resolution it was computed at.
+    """
+
+    value: int
+    bucket_start: int
+    bucket_end: Optional[int] = None
+    percentile: float
+
+
+class PercentileResponse(BaseModel):
+    """Schema for percentile lookup response."""
+
+    grid_size: str
+    theme: Optional[str] = None
+    total: int
+    score: Optional[MetricPercentile] = None
+    time: Optional[MetricPercentile] = None
+    moves: Optional[MetricPercentile] = None
+
+
+class HistogramBucket(BaseModel):
+    """Schema for one histogram bucket ([start, end), end null when open)."""
+
+    start: int
+    end: Optional[int] = None
+    count: int
+
+
+class DistributionResponse(BaseModel):
+    """Schema for a metric distribution."""
+
+    grid_size: str
+    theme: Optional[str] = None
+    metric: str
+    total: int
+    buckets: List[HistogramBucket]
+
+
 class StatisticsResponse(BaseModel):
     """Schema for statistics response."""
 
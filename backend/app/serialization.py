@@ -0,0 +1,51 @@
+"""Direct JSON encoding of trusted score rows, bypassing pydantic revalidation."""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Mapping, Union
+
+from fastapi.responses import JSONResponse
+
+from app.models import ScoreRecord
+
+try:
+    import orjson
+except ImportError:
+    # Optional faster encoder
+    orjson = None
+
+# Fields of TopScoreResponse, in the same order
+SCORE_FIELDS = ("id", "player_name", "score", "moves", "time", "grid_size", "theme", "created_at")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to compact JSON bytes (orjson when installed).
+
+    Naive datetimes are written in ISO 8601 like pydantic does.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+def top_score_row(score: Union[ScoreRecord, Mapping[str, Any]], rank: int) -> Dict[str, Any]:
+    """TopScoreResponse-shaped dict from a score record, a select_records row or a leaderboard entry."""
+    if isinstance(score, Mapping):
+        row = {field: score[field] for field in SCORE_FIELDS}
+    else:
+        row = {field: getattr(score, field) for field in SCORE_FIELDS}
+    row["rank"] = rank
+    return row
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with `dumps`; the content must already be JSON-ready."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,276 @@
+"""Columnar binary snapshots of the scores table for backup, restore and warm start.
+
+Layout (little-endian, every section aligned to 8 bytes):
+
+    header      magic, format version, string count, row count, string blob size
+    columns     one fixed-width array per column, in COLUMNS order
+    offsets     uint32 start offset of each string in the blob, plus the end
+    blob        UTF-8 strings, referenced by index from the string columns
+
+Snapshots are memory-mapped and read through typed memoryviews, so opening
+one does not create per-row Python objects.
+"""
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+from sqlalchemy import insert, text
+from sqlmodel import Session, func, select
+
+from app.dimensions import clear_intern_caches, score_params, select_records
+from app.models import Score
+
+logger = logging.getLogger(__name__)
+
+SCORE_SNAPSHOT_PATH = os.getenv("SCORE_SNAPSHOT_PATH", "")
+
+MAGIC = b"MGSNAP\x00\x00"
+# Version 2 stores score, moves and time as int64 (int32 in version 1)
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sIIQQ")
+
+# (column, array typecode); string columns hold indexes into the string table
+COLUMNS = (
+    ("id", "q"),
+    ("score", "q"),
+    ("moves", "q"),
+    ("time", "q"),
+    ("created_at", "q"),
+    ("player_name", "I"),
+    ("grid_size", "I"),
+    ("theme", "I"),
+)
+STRING_COLUMNS = ("player_name", "grid_size", "theme")
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _check_byteorder() -> None:
+    if sys.byteorder != "little":
+        raise RuntimeError("Score snapshots are only supported on little-endian platforms")
+
+
+def write_snapshot(session: Session, path: Union[str, Path], chunk_size: int = 5000) -> int:
+    """Write the scores table to `path` and return the number of rows.
+
+    Rows are streamed in id order; the file is written next to `path` and
+    renamed into place once complete.
+    """
+    _check_byteorder()
+    columns: Dict[str, array] = {name: array(code) for name, code in COLUMNS}
+    string_index: Dict[str, int] = {}
+    statement = select_records().order_by(Score.id)
+    for chunk in session.exec(statement.execution_options(yield_per=chunk_size)).partitions():
+        for row in chunk:
+            columns["id"].append(row.id)
+            columns["score"].append(row.score)
+            columns["moves"].append(row.moves)
+            columns["time"].append(row.time)
+            columns["created_at"].append((row.created_at - EPOCH) // MICROSECOND)
+            for name in STRING_COLUMNS:
+                columns[name].append(string_index.setdefault(getattr(row, name), len(string_index)))
+
+    encoded = [value.encode() for value in string_index]
+    offsets = array("I", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    blob = b"".join(encoded)
+
+    path = Path(path)
+    partial = path.with_name(path.name + ".partial")
+    count = len(columns["id"])
+    with open(partial, "wb") as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded), count, len(blob)))
+        for section in [*(columns[name] for name, _ in COLUMNS), offsets]:
+            out.write(section.tobytes())
+            out.write(b"\0" * (_aligned(out.tell()) - out.tell()))
+        out.write(blob)
+    os.replace(partial, path)
+    logger.info(f"Wrote snapshot of {count} scores to {path}")
+    return count
+
+
+class ScoreSnapshot:
+    """A memory-mapped snapshot; columns are typed memoryviews over the file."""
+
+    def __init__(self, path: Union[str, Path]):
+        """Map the file and validate its header."""
+        _check_byteorder()
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            view = self._view(0, len(self._mmap))
+            magic, version, string_count, self.count, blob_size = HEADER.unpack_from(view)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} score snapshot")
+            offset = HEADER.size
+            self.columns: Dict[str, memoryview] = {}
+            for name, code in COLUMNS:
+                size = self.count * array(code).itemsize
+                self.columns[name] = self._view(offset, size, code)
+                offset = _aligned(offset + size)
+            offsets = self._view(offset, (string_count + 1) * 4, "I")
+            blob = self._view(_aligned(offset + (string_count + 1) * 4), blob_size)
+            # Distinct strings only: one object per player name, not per row
+            self.strings = [
+                str(blob[offsets[i] : offsets[i + 1]], "utf-8") for i in range(string_count)
+            ]
+        except Exception:
+            self.close()
+            raise
+
+    def _view(self, offset: int, size: int, code: str = "B") -> memoryview:
+        view = memoryview(self._mmap)[offset : offset + size].cast(code)
+        self._views.append(view)
+        return view
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> "ScoreSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the views and unmap the file."""
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._file.close()
+
+    @property
+    def max_id(self) -> Optional[int]:
+        """Largest score id in the snapshot (rows are in id order)."""
+        return self.columns["id"][-1] if self.count else None
+
+    def strings_of(self, column: str) -> Iterator[str]:
+        """Decoded values of a string column."""
+        return map(self.strings.__getitem__, self.columns[column])
+
+    def statistics_rows(self) -> Iterator[tuple]:
+        """(score, time, moves) rows for StatisticsAggregator (players come from their table)."""
+        columns = self.columns
+        return zip(columns["score"], columns["time"], columns["moves"])
+
+    def ranking_rows(self) -> Iterator[tuple]:
+        """(grid_size, score, time, moves) rows for ScoreRanking."""
+        columns = self.columns
+        return zip(self.strings_of("grid_size"), columns["score"], columns["time"], columns["moves"])
+
+    def iter_rows(self, chunk_size: int = 5000) -> Iterator[List[dict]]:
+        """Score rows as insert parameter dicts, one chunk at a time."""
+        columns = self.columns
+        for start in range(0, self.count, chunk_size):
+            stop = min(start + chunk_size, self.count)
+            names = [
+                map(self.strings.__getitem__, columns[column][start:stop]) for column in STRING_COLUMNS
+            ]
+            yield [
+                {
+                    "id": score_id, "score": score, "moves": moves, "time": time,
+                    "created_at": EPOCH + created_at * MICROSECOND,
+                    "player_name": player_name, "grid_size": grid_size, "theme": theme,
+                }
+                for score_id, score, moves, time, created_at, player_name, grid_size, theme in zip(
+                    columns["id"][start:stop], columns["score"][start:stop],
+                    columns["moves"][start:stop], columns["time"][start:stop],
+                    columns["created_at"][start:stop], *names,
+                )
+            ]
+
+
+def restore_snapshot(session: Session, path: Union[str, Path], chunk_size: int = 5000) -> int:
+    """Bulk insert a snapshot into an empty scores table and rebuild derived tables.
+
+    Returns the number of restored rows.
+    """
+    from app.histograms import rebuild_histograms
+    from app.rollups import rebuild_rollups
+
+    if session.exec(select(Score.id).limit(1)).first() is not None:
+        raise ValueError("The scores table is not empty")
+    # Cached ids may belong to another database
+    clear_intern_caches()
+    with ScoreSnapshot(path) as snapshot:
+        for rows in snapshot.iter_rows(chunk_size):
+            session.execute(insert(Score), score_params(session, rows))
+        count = len(snapshot)
+    if count and session.get_bind().dialect.name == "postgresql":
+        # Explicit ids do not advance the serial sequence
+        session.execute(text("SELECT setval(pg_get_serial_sequence('score', 'id'), (SELECT max(id) FROM score))"))
+    session.commit()
+    rebuild_histograms(session, chunk_size=chunk_size)
+    rebuild_rollups(session, chunk_size=chunk_size)
+    logger.info(f"Restored {count} scores from {path}")
+    return count
+
+
+def warm_start(session: Session, path: Union[str, Path]) -> bool:
+    """Load the statistics and ranking aggregates from a snapshot plus newer rows.
+
+    The snapshot is only used when every score it covers is still in the
+    table unchanged in number (no deletion or compaction since it was
+    taken) and the file is in the current format; returns False otherwise so
+    the caller can load from the database.
+    """
+    from app.ranking import ranking
+    from app.stats import statistics
+
+    try:
+        snapshot = ScoreSnapshot(path)
+    except ValueError as e:
+        logger.warning(f"Ignoring snapshot: {e}")
+        return False
+    with snapshot:
+        if not len(snapshot):
+            return False
+        max_id = snapshot.max_id
+        covered = session.exec(select(func.count(Score.id)).where(Score.id <= max_id)).one()
+        if covered != len(snapshot):
+            logger.warning(f"Snapshot {path} is stale ({len(snapshot)} rows, {covered} in the database)")
+            return False
+        newer = session.exec(select_records().where(Score.id > max_id)).all()
+        statistics.load(
+            session, chain(snapshot.statistics_rows(), ((r.score, r.time, r.moves) for r in newer))
+        )
+        ranking.load(
+            session, chain(snapshot.ranking_rows(), ((r.grid_size, r.score, r.time, r.moves) for r in newer))
+        )
+    logger.info(f"Warm-started score aggregates from {path} (+{len(newer)} newer rows)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score table snapshots")
+    parser.add_argument("command", choices=["save", "restore"])
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    from app.database import create_db_and_tables, engine
+
+    logging.basicConfig(level=logging.INFO)
+    create_db_and_tables()
+    with Session(engine) as db_session:
+        if args.command == "save":
+            write_snapshot(db_session, args.path, chunk_size=args.chunk_size)
+        else:
+            restore_snapshot(db_session, args.path, chunk_size=args.chunk_size)
@@ -0,0 +1,253 @@
+"""Incrementally maintained score statistics."""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from sqlmodel import Session, func, select
+
+from app.models import CompactedScore, Player, Score, ScoreRecord
+
+logger = logging.getLogger(__name__)
+
+# "exact" keeps every player name in a set, "hll" uses a HyperLogLog sketch
+STATS_DISTINCT_MODE = os.getenv("STATS_DISTINCT_MODE", "exact")
+STATS_HLL_PRECISION = int(os.getenv("STATS_HLL_PRECISION", "14"))
+
+
+class ExactDistinctCounter:
+    """Exact distinct counter backed by a set."""
+
+    relative_error = 0.0
+
+    def __init__(self):
+        """Initialize an empty counter."""
+        self._values: set = set()
+
+    def add(self, value: str) -> None:
+        """Record a value."""
+        self._values.add(value)
+
+    def count(self) -> int:
+        """Number of distinct values seen."""
+        return len(self._values)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count estimator with 2**precision registers."""
+
+    def __init__(self, precision: int = STATS_HLL_PRECISION):
+        """Initialize an empty sketch."""
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self._size = 1 << precision
+        self._registers = bytearray(self._size)
+        self.relative_error = 1.04 / math.sqrt(self._size)
+
+    def add(self, value: str) -> None:
+        """Record a value."""
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        """Estimated number of distinct values seen."""
+        size = self._size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Small range correction (linear counting)
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+
+def make_distinct_counter(mode: str = STATS_DISTINCT_MODE):
+    """Build the distinct-player counter for the configured mode."""
+    if mode == "hll":
+        return HyperLogLog()
+    if mode == "exact":
+        return ExactDistinctCounter()
+    raise ValueError(f"Unknown STATS_DISTINCT_MODE '{mode}'")
+
+
+def empty_statistics() -> Dict[str, Any]:
+    """Statistics for an empty scores table."""
+    return {
+        "total_participations": 0,
+        "average_score": 0.0,
+        "average_time": 0.0,
+        "average_moves": 0.0,
+        "best_time": 0,
+        "best_moves": 0,
+        "total_players": 0,
+    }
+
+
+def compute_statistics_from_sql(session: Session) -> Dict[str, Any]:
+    """Compute the statistics with aggregate queries over raw and compacted scores."""
+    count, sum_score, sum_time, sum_moves, min_time, min_moves = session.exec(
+        select(
+            func.count(Score.id),
+            func.sum(Score.score),
+            func.sum(Score.time),
+            func.sum(Score.moves),
+            func.min(Score.time),
+            func.min(Score.moves),
+        )
+    ).one()
+    c_count, c_score, c_time, c_moves, c_min_time, c_min_moves = session.exec(
+        select(
+            func.sum(CompactedScore.count),
+            func.sum(CompactedScore.score * CompactedScore.count),
+            func.sum(CompactedScore.time * CompactedScore.count),
+            func.sum(CompactedScore.moves * CompactedScore.count),
+            func.min(CompactedScore.time),
+            func.min(CompactedScore.moves),
+        )
+    ).one()
+    total = (count or 0) + (c_count or 0)
+    if not total:
+        return empty_statistics()
+    # Players are never deleted (not even by compaction), so this is a plain row count
+    total_players = session.exec(select(func.count(Player.id))).one()
+    best_time = min(value for value in (min_time, c_min_time) if value is not None)
+    best_moves = min(value for value in (min_moves, c_min_moves) if value is not None)
+    return {
+        "total_participations": total,
+        "average_score": float((sum_score or 0) + (c_score or 0)) / total,
+        "average_time": float((sum_time or 0) + (c_time or 0)) / total,
+        "average_moves": float((sum_moves or 0) + (c_moves or 0)) / total,
+        "best_time": int(best_time),
+        "best_moves": int(best_moves),
+        "total_players": int(total_players) if total_players else 0,
+    }
+
+
+class StatisticsAggregator:
+    """Running sums, counts and minimums over all saved scores."""
+
+    def __init__(self, distinct_mode: str = STATS_DISTINCT_MODE):
+        """Initialize an empty aggregator."""
+        self.distinct_mode = distinct_mode
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.count = 0
+        self.sum_score = 0
+        self.sum_time = 0
+        self.sum_moves = 0
+        self.min_time: Optional[int] = None
+        self.min_moves: Optional[int] = None
+        self._players = make_distinct_counter(self.distinct_mode)
+
+    def _add(self, score: int, time: int, moves: int, player_name: Optional[str], count: int = 1) -> None:
+        self.count += count
+        self.sum_score += score * count
+        self.sum_time += time * count
+        self.sum_moves += moves * count
+        self.min_time = time if self.min_time is None else min(self.min_time, time)
+        self.min_moves = moves if self.min_moves is None else min(self.min_moves, moves)
+        if player_name is not None:
+            self._players.add(player_name)
+
+    def add(self, score: ScoreRecord) -> None:
+        """Account for a newly saved score."""
+        with self._lock:
+            if self.loaded:
+                self._add(score.score, score.time, score.moves, score.player_name)
+
+    def rebuild(
+        self,
+        rows: Iterable[tuple],
+        compacted: Iterable[tuple] = (),
+        players: Iterable[str] = (),
+    ) -> None:
+        """Rebuild from (score, time, moves[, player_name]) tuples.
+
+        `compacted` holds (score, time, moves, count) tuples for scores folded
+        away by retention and `players` player names counted even without a
+        row in `rows`.
+        """
+        with self._lock:
+            self._reset()
+            for score, time, moves, *player_name in rows:
+                self._add(score, time, moves, player_name[0] if player_name else None)
+            for score, time, moves, count in compacted:
+                self._add(score, time, moves, None, count)
+            for player_name in players:
+                self._players.add(player_name)
+            self.loaded = True
+
+    def load(self, session: Session, rows: Optional[Iterable[tuple]] = None) -> None:
+        """Rebuild from the raw and compacted scores in a single streaming pass.
+
+        `rows` replaces the scan of the raw scores table when given (warm start).
+        """
+        if rows is None:
+            statement = select(Score.score, Score.time, Score.moves)
+            rows = session.exec(statement.execution_options(yield_per=1000))
+        self.rebuild(
+            rows,
+            session.exec(
+                select(CompactedScore.score, CompactedScore.time, CompactedScore.moves, CompactedScore.count)
+            ),
+            # Every player, including those whose scores were compacted
+            session.exec(select(Player.name).execution_options(yield_per=1000)),
+        )
+
+    def clear(self) -> None:
+        """Drop all totals and mark the aggregator as not loaded."""
+        with self._lock:
+            self._reset()
+            self.loaded = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current statistics, shaped like StatisticsResponse."""
+        with self._lock:
+            if not self.count:
+                return empty_statistics()
+            return {
+                "total_participations": self.count,
+                "average_score": self.sum_score / self.count,
+                "average_time": self.sum_time / self.count,
+                "average_moves": self.sum_moves / self.count,
+                "best_time": self.min_time,
+                "best_moves": self.min_moves,
+                "total_players": self._players.count(),
+            }
+
+    def diff_against_sql(self, session: Session) -> Dict[str, Dict[str, Any]]:
+        """Recompute the statistics with SQL and report fields that drifted."""
+        memory = self.snapshot()
+        expected = compute_statistics_from_sql(session)
+        drift = {}
+        for name, sql_value in expected.items():
+            memory_value = memory[name]
+            if isinstance(sql_value, float):
+                matches = math.isclose(memory_value, sql_value, rel_tol=1e-9, abs_tol=1e-9)
+            elif name == "total_players":
+                tolerance = 3 * self._players.relative_error * sql_value
+                matches = abs(memory_value - sql_value) <= tolerance
+            else:
+                matches = memory_value == sql_value
+            if not matches:
+                drift[name] = {"memory": memory_value, "sql": sql_value}
+        if drift:
+            logger.warning(f"Statistics drifted from database: {drift}")
+        return drift
+
+
+# Global statistics aggregator instance
+statistics = StatisticsAggregator()
+
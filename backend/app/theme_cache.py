@@ -0,0 +1,157 @@
+"""In-process cache of upstream theme catalogs and items (TTL + LRU, stale-while-revalidate)."""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Maximum number of cached catalogs and items, all themes together
+THEME_CACHE_SIZE = int(os.getenv("THEME_CACHE_SIZE", "2048"))
+# How long past its TTL an entry may still be served while it is refreshed
+THEME_CACHE_STALE_SECONDS = float(os.getenv("THEME_CACHE_STALE_SECONDS", "86400"))
+
+
+class ThemeCache:
+    """Upstream data keyed by (theme, key), each entry with its own expiry.
+
+    Past its TTL an entry is stale: `lookup` still returns it (flagged) for
+    `stale_seconds` so the caller can refresh it in the background. Entries
+    past that window count as misses and are dropped on access; the least
+    recently used entry is evicted when the cache is full.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = THEME_CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+        stale_seconds: float = THEME_CACHE_STALE_SECONDS,
+    ):
+        """Initialize an empty cache."""
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stale_seconds = stale_seconds
+        self.evictions = 0
+        # (theme, key) -> (expires at, stale until, value)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, float, Any]]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, theme: str, counter: str) -> None:
+        counters = self._counters.setdefault(theme, {"hits": 0, "stale": 0, "misses": 0})
+        counters[counter] += 1
+
+    def lookup(self, theme: str, key: Hashable = None) -> Optional[Tuple[Any, bool]]:
+        """Cached value and whether it is stale, or None."""
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get((theme, key))
+            if entry is not None and entry[1] <= now:
+                del self._entries[(theme, key)]
+                entry = None
+            if entry is None:
+                self._count(theme, "misses")
+                return None
+            self._entries.move_to_end((theme, key))
+            stale = entry[0] <= now
+            self._count(theme, "stale" if stale else "hits")
+            return entry[2], stale
+
+    def fresh(self, theme: str, key: Hashable = None) -> bool:
+        """Whether a value is cached and not expired (not counted as a hit or miss)."""
+        with self._lock:
+            entry = self._entries.get((theme, key))
+            return entry is not None and entry[0] > self.clock()
+
+    def get(self, theme: str, key: Hashable = None) -> Optional[Any]:
+        """Cached value if present and not expired."""
+        entry = self.lookup(theme, key)
+        return entry[0] if entry is not None and not entry[1] else None
+
+    def put(self, theme: str, key: Hashable, value: Any, ttl: float) -> None:
+        """Store a value fresh for `ttl` seconds (negative: already stale for that long)."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            expires_at = self.clock() + ttl
+            stale_until = expires_at + self.stale_seconds
+            if stale_until <= self.clock():
+                return
+            self._entries[(theme, key)] = (expires_at, stale_until, value)
+            self._entries.move_to_end((theme, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._counters = {}
+            self.evictions = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """Size, evictions and hit/stale/miss counters per theme."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "hits": sum(counters["hits"] for counters in self._counters.values()),
+                "stale": sum(counters["stale"] for counters in self._counters.values()),
+                "misses": sum(counters["misses"] for counters in self._counters.values()),
+                "themes": {theme: dict(counters) for theme, counters in self._counters.items()},
+            }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one running call.
+
+    Every caller awaits the shared task; it is cancelled only when all of
+    them have been cancelled.
+    """
+
+    def __init__(self):
+        """Initialize with nothing in flight."""
+        self.calls = 0
+        self.shared = 0
+        # key -> [task, waiting callers]
+        self._flights: Dict[Hashable, List[Any]] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call for `key` is running."""
+        return key in self._flights
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of `call()`, shared with every concurrent caller of the same key."""
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(call())
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(lambda _: self._flights.pop(key, None) if self._flights.get(key) is flight else None)
+            self.calls += 1
+        else:
+            self.shared += 1
+        flight[1] += 1
+        try:
+            return await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not flight[0].done():
+                flight[0].cancel()
+
+    def metrics(self) -> Dict[str, int]:
+        """Calls started, callers served by another caller's call, calls running."""
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
+
+    def clear(self) -> None:
+        """Reset the counters."""
+        self.calls = 0
+        self.shared = 0
+
+
+# Global theme cache instance
+theme_cache = ThemeCache()
+
+# Upstream theme fetches in flight, keyed by (theme, key)
+theme_fetches = SingleFlight()
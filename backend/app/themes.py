@@ -1,45 +1,341 @@
-"""Card themes from external APIs."""
+"""Card themes from external APIs.
+
+Upstream catalogs and items are cached per theme (see THEME_CACHE_TTLS);
+the random sample of `limit` items is drawn on every request.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from typing import List, Dict, Any
 import httpx
 from fastapi import HTTPException
 
+from app.catalog_store import catalog_store
+from app.http_client import upstream_client
+from app.theme_cache import theme_cache, theme_fetches
+from app.upstream_guard import upstream_guards
+
+logger = logging.getLogger(__name__)
+
+# Seconds upstream data stays cached, per theme (THEME_CACHE_TTL_<THEME> overrides)
+THEME_CACHE_TTLS = {
+    theme: int(os.getenv(f"THEME_CACHE_TTL_{theme.upper()}", str(default)))
+    for theme, default in {"pokemon": 7 * 86400, "dogs": 600, "movies": 86400, "flags": 86400}.items()
+}
+
+# Random dog images fetched per catalog refresh (dog.ceo returns at most 50)
+DOG_CATALOG_SIZE = 50
+
+POKEMON_COUNT = 151
+
+# Upstream requests in flight per theme load, and the time budget for them
+THEME_FETCH_CONCURRENCY = int(os.getenv("THEME_FETCH_CONCURRENCY", "8"))
+THEME_FETCH_DEADLINE_SECONDS = float(os.getenv("THEME_FETCH_DEADLINE_SECONDS", "5"))
+
+# Curated list of popular movies with verified working poster URLs
+# Only movies with confirmed working images are included
+POPULAR_MOVIES = [
+    {'id': 550, 'name': 'Fight Club', 'poster_path': '/pB8BM7pdSp6B6Ih7QZ4DrQ3PmJK.jpg'},
+    {'id': 278, 'name': 'The Shawshank Redemption', 'poster_path': '/q6y0Go1tsGEsmtFryDOJo3dEmqu.jpg'},
+    {'id': 238, 'name': 'The Godfather', 'poster_path': '/3bhkrj58Vtu7enYsRolD1fZdja1.jpg'},
+    {'id': 424, 'name': 'Schindler\'s List', 'poster_path': '/sF1U4EUQS8YHUYjNl3pMGNIQyr0.jpg'},
+    {'id': 240, 'name': 'The Godfather Part II', 'poster_path': '/hek3koDUyRQk7FhKdJqX5vffNU5.jpg'},
+    {'id': 129, 'name': 'Spirited Away', 'poster_path': '/39wmItIWvg5YkBGp3rMyHEcrSRI.jpg'},
+    {'id': 497, 'name': 'The Green Mile', 'poster_path': '/velWPhVMQeQKcxggNEU8YmIo52R.jpg'},
+    {'id': 680, 'name': 'Pulp Fiction', 'poster_path': '/d5iIlFn5s0ImszYzBPb8JPIfbXD.jpg'},
+    {'id': 13, 'name': 'Forrest Gump', 'poster_path': '/arw2vcBveWOVZr6pxd9XTd1TdQa.jpg'},
+    {'id': 429, 'name': 'The Good, the Bad and the Ugly', 'poster_path': '/bX2xnavhMYjWDoZp1VM6VnU1xwe.jpg'},
+    {'id': 122, 'name': 'The Lord of the Rings: The Return of the King', 'poster_path': '/rCzpDGLbOoPwLjy3OAm5NUPOTrC.jpg'},
+    {'id': 155, 'name': 'The Dark Knight', 'poster_path': '/qJ2tW6WMUDux911r6m7haRef0WH.jpg'},
+    {'id': 11, 'name': 'Star Wars', 'poster_path': '/6FfCtAuVAW8XJjZ7eWeLibRLWTw.jpg'},
+    {'id': 27205, 'name': 'Inception', 'poster_path': '/oYuLEt3zVCKq57qu2F8dT7NIa6f.jpg'},
+    {'id': 120, 'name': 'The Lord of the Rings: The Fellowship of the Ring', 'poster_path': '/6oom5QYQ2yQTMJIbnvbkBL9cHo6.jpg'},
+    {'id': 121, 'name': 'The Lord of the Rings: The Two Towers', 'poster_path': '/5VTN0pR8gcqV3EPUHHfMGnJYN9L.jpg'},
+    {'id': 49026, 'name': 'The Dark Knight Rises', 'poster_path': '/85cWkCC1Nxq3o74s7Bp2jNU0Aas.jpg'},
+    {'id': 603, 'name': 'The Matrix', 'poster_path': '/f89U3ADr1oiB1s9GkdPOEpXUk5H.jpg'},
+    {'id': 11216, 'name': 'Cinema Paradiso', 'poster_path': '/8SRUfRUi6x4O68n0VCbDNRa6iGL.jpg'},
+    {'id': 389, 'name': '12 Angry Men', 'poster_path': '/ppd84D2i9W8ijXFMhXK62lO7vfQ.jpg'},
+    {'id': 346, 'name': 'Seven Samurai', 'poster_path': '/8OKmBV5BUFaozqlNxSgFz8l8J3P.jpg'},
+    {'id': 637, 'name': 'Life Is Beautiful', 'poster_path': '/74hLDKjD5aGYOotO6esUVaeISa2.jpg'},
+    {'id': 769, 'name': 'GoodFellas', 'poster_path': '/aKuFiU82s5ISJpGZp7YkIr3kCUd.jpg'},
+    {'id': 274, 'name': 'The Silence of the Lambs', 'poster_path': '/uS9m8OBk1A8eM9I042e8rVKbOc0.jpg'},
+    {'id': 539, 'name': 'Psycho', 'poster_path': '/tdqX0MWaFHuGwUygYn7j6eluOdP.jpg'},
+    {'id': 510, 'name': 'One Flew Over the Cuckoo\'s Nest', 'poster_path': '/3jcbDmRFiQ83drXNOvRDeKHxr0M.jpg'},
+    {'id': 18, 'name': 'The Fifth Element', 'poster_path': '/zaFa1NRZEnFgRTv5OVXyIZg1fZ8.jpg'},
+    {'id': 475557, 'name': 'Joker', 'poster_path': '/udDclJo2j3QyA8kX3i3k6tqEaZ3.jpg'},
+    {'id': 335983, 'name': 'Venom', 'poster_path': '/2uNW4WbgBXL25BAbXGLnLqX71Sw.jpg'},
+    {'id': 299536, 'name': 'Avengers: Infinity War', 'poster_path': '/7WsyChQLEftFiDOVTGkv3hFpyyt.jpg'},
+    {'id': 299534, 'name': 'Avengers: Endgame', 'poster_path': '/or06FN3Dka5tukK1e9sl16pB3iy.jpg'},
+    {'id': 181808, 'name': 'Star Wars: The Last Jedi', 'poster_path': '/kOVEVeg59E0wsnXmF9Ura6NS8pR.jpg'},
+    {'id': 181803, 'name': 'Star Wars: The Rise of Skywalker', 'poster_path': '/db32LaOibfE2AmfF9k3dPZR4TzJ.jpg'},
+    {'id': 284054, 'name': 'Black Panther', 'poster_path': '/uxzzxijgPIY7slzFvMotPv8wjKA.jpg'},
+    {'id': 284053, 'name': 'Thor: Ragnarok', 'poster_path': '/rzRwTcFvttcN1ZpX2xv4N3gTOsu.jpg'},
+]
+
+FRUIT_EMOJIS = {
+    'apple': '🍎', 'banana': '🍌', 'orange': '🍊', 'grape': '🍇',
+    'strawberry': '🍓', 'watermelon': '🍉', 'pineapple': '🍍', 'mango': '🥭',
+    'peach': '🍑', 'cherry': '🍒', 'pear': '🍐', 'kiwi': '🥝',
+    'lemon': '🍋', 'coconut': '🥥', 'avocado': '🥑', 'tomato': '🍅',
+    'eggplant': '🍆', 'pepper': '🌶️', 'corn': '🌽', 'carrot': '🥕',
+}
+
+
+async def fetch_pokemon(client: httpx.AsyncClient, pokemon_id: int) -> Optional[Dict[str, Any]]:
+    """Fetch one Pokemon from PokeAPI, or None if it has no sprite."""
+    response = await client.get(
+        f"https://pokeapi.co/api/v2/pokemon/{pokemon_id}",
+        timeout=15.0
+    )
+    response.raise_for_status()
+    data = response.json()
+    image_url = data.get('sprites', {}).get('front_default')
+    if not image_url:
+        return None
+    return {
+        'id': pokemon_id,
+        'name': data.get('name', f'Pokemon {pokemon_id}').title(),
+        'image': image_url,
+    }
+
+
+async def fetch_dogs_catalog(client: httpx.AsyncClient) -> List[Dict[str, Any]]:
+    """Fetch a batch of random dog images from Dog API, with breed names."""
+    response = await client.get(
+        f"https://dog.ceo/api/breeds/image/random/{DOG_CATALOG_SIZE}",
+        timeout=15.0
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get('status') != 'success':
+        raise HTTPException(status_code=500, detail="Dog API returned error")
+
+    dogs = []
+    for image_url in data.get('message', []):
+        # Extract breed name from URL if possible
+        breed_name = 'Dog'
+        if '/' in image_url:
+            parts = image_url.split('/')
+            if len(parts) >= 4:
+                breed_part = parts[-2]
+                breed_name = breed_part.replace('-', ' ').title()
+        dogs.append({'name': breed_name, 'image': image_url})
+    return dogs
+
+
+async def validate_movie_poster(client: httpx.AsyncClient, movie: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Movie item with a reachable TMDB poster URL, or None."""
+    poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
+    # Quick validation: check if image URL is accessible
+    response = await client.head(poster_url, timeout=5.0)
+    if response.status_code != 200:
+        # Try alternative size if w500 fails
+        poster_url = f"https://image.tmdb.org/t/p/w342{movie['poster_path']}"
+        response = await client.head(poster_url, timeout=5.0)
+        if response.status_code != 200:
+            return None
+    return {
+        'id': movie['id'],
+        'name': movie['name'],
+        'image': poster_url,
+    }
+
+
+async def fetch_flags_catalog(client: httpx.AsyncClient) -> List[Dict[str, Any]]:
+    """Fetch every country flag from REST Countries API."""
+    response = await client.get(
+        "https://restcountries.com/v3.1/all?fields=name,flags",
+        timeout=15.0
+    )
+    response.raise_for_status()
+    flags = []
+    for i, country in enumerate(response.json(), 1):
+        flag_url = country.get('flags', {}).get('png') or country.get('flags', {}).get('svg')
+        if flag_url:
+            flags.append({
+                'name': country.get('name', {}).get('common', f'Country {i}'),
+                'image': flag_url,
+            })
+    return flags
+
+
+async def refresh_catalog(theme: str) -> List[Dict[str, Any]]:
+    """Fetch the full catalog of a theme and store it in the cache and catalog store."""
+    catalog = await upstream_guards.get(theme).call(partial(CATALOG_FETCHERS[theme], upstream_client.get()))
+    if catalog:
+        theme_cache.put(theme, None, catalog, THEME_CACHE_TTLS[theme])
+        catalog_store.replace(theme, catalog)
+    return catalog
+
+
+async def load_pokemon(pokemon_id: int) -> Optional[Dict[str, Any]]:
+    """Fetch one Pokemon and store it in the cache and catalog store."""
+    pokemon = await upstream_guards.get('pokemon').call(partial(fetch_pokemon, upstream_client.get(), pokemon_id))
+    if pokemon is not None:
+        theme_cache.put('pokemon', pokemon_id, pokemon, THEME_CACHE_TTLS['pokemon'])
+        catalog_store.merge('pokemon', [pokemon])
+    return pokemon
+
+
+async def load_movie(movie: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Validate one movie poster and store the item in the cache and catalog store."""
+    item = await upstream_guards.get('movies').call(partial(validate_movie_poster, upstream_client.get(), movie))
+    if item is not None:
+        theme_cache.put('movies', movie['id'], item, THEME_CACHE_TTLS['movies'])
+        catalog_store.merge('movies', [item])
+    return item
 
-async def get_pokemon_theme(limit: int = 18) -> List[Dict[str, Any]]:
-    """Fetch Pokemon images from PokeAPI."""
+
+# Background revalidations and late theme loads, referenced until done
+_background: Set[asyncio.Task] = set()
+
+
+def _background_done(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled():
+        # A late failure was already handled by the caller or nobody waits for it
+        task.exception()
+
+
+def keep_in_background(task: asyncio.Task) -> None:
+    """Keep a task running after its caller stopped waiting for it."""
+    _background.add(task)
+    task.add_done_callback(_background_done)
+
+
+def revalidate(theme: str, key: Any, load) -> None:
+    """Refresh a stale cache entry in the background, unless already being fetched."""
+    if theme_fetches.in_flight((theme, key)):
+        return
+
+    async def refresh():
+        try:
+            await theme_fetches.run((theme, key), load)
+        except Exception as e:
+            logger.warning(f"Could not revalidate {theme} {key}: {e}")
+
+    keep_in_background(asyncio.create_task(refresh()))
+
+
+def cached_item(theme: str, key: Any, load) -> Optional[Dict[str, Any]]:
+    """Cached item; a stale one is returned and refreshed with `load()` in the background."""
+    entry = theme_cache.lookup(theme, key)
+    if entry is None:
+        return None
+    item, stale = entry
+    if stale:
+        revalidate(theme, key, load)
+    return item
+
+
+async def cached_catalog(theme: str) -> List[Dict[str, Any]]:
+    """Whole catalog of a theme: cached, fetched, or the last known one if upstream fails.
+
+    Concurrent misses share one upstream fetch; a stale catalog is served
+    while it is refreshed in the background.
+    """
+    load = partial(refresh_catalog, theme)
+    catalog = cached_item(theme, None, load)
+    if catalog is None:
+        try:
+            catalog = await theme_fetches.run((theme, None), load)
+        except Exception as e:
+            catalog = catalog_store.get(theme)
+            if not catalog:
+                raise
+            logger.warning(f"Serving {theme} theme from its catalog snapshot: {e}")
+    return catalog
+
+
+def fill_from_snapshot(
+    theme: str, items: List[Dict[str, Any]], limit: int, rng: random.Random = random
+) -> List[Dict[str, Any]]:
+    """Top `items` up to `limit` with last known items of the theme (upstream fallback)."""
+    if len(items) >= limit:
+        return items
+    taken = {item['id'] for item in items}
+    spare = [item for item in catalog_store.get(theme) or () if item['id'] not in taken]
+    if spare:
+        logger.warning(f"Completing {theme} theme with {min(limit - len(items), len(spare))} snapshot items")
+    return items + rng.sample(spare, min(limit - len(items), len(spare)))
+
+
+def numbered(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copies of sampled catalog items with ids 1..n."""
+    return [{'id': i, **item} for i, item in enumerate(items, 1)]
+
+
+async def fan_out(fetch, keys: List[Any], want: int) -> List[Dict[str, Any]]:
+    """Run `fetch(key)` for every key concurrently and collect the items.
+
+    At most THEME_FETCH_CONCURRENCY fetches run at once. Returns as soon as
+    `want` items succeeded or THEME_FETCH_DEADLINE_SECONDS elapsed, with the
+    items received so far; the fetches still running are cancelled. Failed
+    fetches and None results are skipped.
+    """
+    semaphore = asyncio.Semaphore(THEME_FETCH_CONCURRENCY)
+
+    async def bounded(key):
+        async with semaphore:
+            try:
+                return await fetch(key)
+            except Exception:
+                return None
+
+    tasks = [asyncio.create_task(bounded(key)) for key in keys]
+    items = []
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=THEME_FETCH_DEADLINE_SECONDS):
+            try:
+                item = await next_done
+            except asyncio.TimeoutError:
+                break
+            if item is not None:
+                items.append(item)
+                if len(items) >= want:
+                    break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return items
+
+
+async def get_pokemon_theme(limit: int = 18, rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Fetch Pokemon images from PokeAPI (each Pokemon is cached)."""
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            # Get random Pokemon IDs
-            import random
-            pokemon_ids = random.sample(range(1, 152), min(limit, 151))
-            
-            pokemon_list = []
-            for pokemon_id in pokemon_ids:
-                try:
-                    response = await client.get(
-                        f"https://pokeapi.co/api/v2/pokemon/{pokemon_id}",
-                        timeout=15.0
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    image_url = data.get('sprites', {}).get('front_default')
-                    if image_url:
-                        pokemon_list.append({
-                            'id': pokemon_id,
-                            'name': data.get('name', f'Pokemon {pokemon_id}').title(),
-                            'image': image_url,
-                        })
-                except (httpx.HTTPError, KeyError) as e:
-                    # Skip this Pokemon if there's an error, continue with others
-                    continue
-            
-            if not pokemon_list:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Failed to fetch any Pokemon data"
-                )
-            
-            return pokemon_list[:limit]  # Ensure we don't exceed limit
+        # Get random Pokemon IDs
+        pokemon_ids = rng.sample(range(1, POKEMON_COUNT + 1), min(limit, POKEMON_COUNT))
+
+        pokemon_list = []
+        missing = []
+        for pokemon_id in pokemon_ids:
+            pokemon = cached_item('pokemon', pokemon_id, partial(load_pokemon, pokemon_id))
+            if pokemon is None:
+                missing.append(pokemon_id)
+            else:
+                pokemon_list.append(pokemon)
+
+        if missing:
+            def fetch(pokemon_id):
+                return theme_fetches.run(('pokemon', pokemon_id), partial(load_pokemon, pokemon_id))
+
+            pokemon_list += await fan_out(fetch, missing, len(missing))
+
+        pokemon_list = fill_from_snapshot('pokemon', pokemon_list, len(pokemon_ids), rng)
+
+        if not pokemon_list:
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to fetch any Pokemon data"
+            )
+
+        return pokemon_list[:limit]  # Ensure we don't exceed limit
     except HTTPException:
         raise
     except Exception as e:
@@ -49,41 +345,13 @@ async def get_pokemon_theme(limit: int = 18) -> List[Dict[str, Any]]:
         )
 
 
-async def get_dogs_theme(limit: int = 18) -> List[Dict[str, Any]]:
-    """Fetch dog images from Dog API (free, high-quality photos)."""
+async def get_dogs_theme(limit: int = 18, rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Sample dog images from a cached Dog API batch."""
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            # Get random dog images from Dog CEO API
-            response = await client.get(
-                f"https://dog.ceo/api/breeds/image/random/{limit}",
-                timeout=15.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get('status') != 'success':
-                raise HTTPException(status_code=500, detail="Dog API returned error")
-            
-            dogs = []
-            for i, image_url in enumerate(data.get('message', []), 1):
-                # Extract breed name from URL if possible
-                breed_name = 'Dog'
-                if '/' in image_url:
-                    parts = image_url.split('/')
-                    if len(parts) >= 4:
-                        breed_part = parts[-2]
-                        breed_name = breed_part.replace('-', ' ').title()
-                
-                dogs.append({
-                    'id': i,
-                    'name': breed_name,
-                    'image': image_url,
-                })
-            
-            if not dogs:
-                raise HTTPException(status_code=500, detail="No dog images received")
-            
-            return dogs[:limit]
+        catalog = await cached_catalog('dogs')
+        if not catalog:
+            raise HTTPException(status_code=500, detail="No dog images received")
+        return numbered(rng.sample(catalog, min(limit, len(catalog))))
     except HTTPException:
         raise
     except Exception as e:
@@ -93,87 +361,76 @@ async def get_dogs_theme(limit: int = 18) -> List[Dict[str, Any]]:
         )
 
 
-async def get_movies_theme(limit: int = 18) -> List[Dict[str, Any]]:
-    """Fetch movie posters from TMDB API (public endpoint, no API key needed)."""
+async def first_valid_movies(candidates: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """First `limit` candidates with a valid poster, in candidate order.
+
+    Posters missing from the cache are validated concurrently, only as many
+    as could still be chosen; which validation finishes first never changes
+    the choice.
+    """
+    resolved = {}
+    for movie in candidates:
+        item = cached_item('movies', movie['id'], partial(load_movie, movie))
+        if item is not None:
+            resolved[movie['id']] = item
+
+    def fetch(movie):
+        return theme_fetches.run(('movies', movie['id']), partial(load_movie, movie))
+
+    while True:
+        chosen, pending = [], []
+        for movie in candidates:
+            if len(chosen) + len(pending) >= limit:
+                break
+            if movie['id'] not in resolved:
+                pending.append(movie)
+            elif resolved[movie['id']] is not None:
+                chosen.append(resolved[movie['id']])
+        if not pending:
+            return chosen
+        fetched = {item['id']: item for item in await fan_out(fetch, pending, len(pending))}
+        for movie in pending:
+            # Invalid, failed or past the deadline: skipped
+            resolved[movie['id']] = fetched.get(movie['id'])
+
+
+async def get_movies_theme(limit: int = 18, rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Movie posters from TMDB (public image CDN, no API key needed).
+
+    Poster URLs are validated once and cached per movie. With a seeded `rng`
+    (decks), the first valid posters in sampled order are kept, so a seed
+    always gives the same movies; otherwise the first posters validated are.
+    """
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            # Curated list of popular movies with verified working poster URLs
-            # Only movies with confirmed working images are included
-            popular_movies = [
-                {'id': 550, 'name': 'Fight Club', 'poster_path': '/pB8BM7pdSp6B6Ih7QZ4DrQ3PmJK.jpg'},
-                {'id': 278, 'name': 'The Shawshank Redemption', 'poster_path': '/q6y0Go1tsGEsmtFryDOJo3dEmqu.jpg'},
-                {'id': 238, 'name': 'The Godfather', 'poster_path': '/3bhkrj58Vtu7enYsRolD1fZdja1.jpg'},
-                {'id': 424, 'name': 'Schindler\'s List', 'poster_path': '/sF1U4EUQS8YHUYjNl3pMGNIQyr0.jpg'},
-                {'id': 240, 'name': 'The Godfather Part II', 'poster_path': '/hek3koDUyRQk7FhKdJqX5vffNU5.jpg'},
-                {'id': 129, 'name': 'Spirited Away', 'poster_path': '/39wmItIWvg5YkBGp3rMyHEcrSRI.jpg'},
-                {'id': 497, 'name': 'The Green Mile', 'poster_path': '/velWPhVMQeQKcxggNEU8YmIo52R.jpg'},
-                {'id': 680, 'name': 'Pulp Fiction', 'poster_path': '/d5iIlFn5s0ImszYzBPb8JPIfbXD.jpg'},
-                {'id': 13, 'name': 'Forrest Gump', 'poster_path': '/arw2vcBveWOVZr6pxd9XTd1TdQa.jpg'},
-                {'id': 429, 'name': 'The Good, the Bad and the Ugly', 'poster_path': '/bX2xnavhMYjWDoZp1VM6VnU1xwe.jpg'},
-                {'id': 122, 'name': 'The Lord of the Rings: The Return of the King', 'poster_path': '/rCzpDGLbOoPwLjy3OAm5NUPOTrC.jpg'},
-                {'id': 155, 'name': 'The Dark Knight', 'poster_path': '/qJ2tW6WMUDux911r6m7haRef0WH.jpg'},
-                {'id': 11, 'name': 'Star Wars', 'poster_path': '/6FfCtAuVAW8XJjZ7eWeLibRLWTw.jpg'},
-                {'id': 27205, 'name': 'Inception', 'poster_path': '/oYuLEt3zVCKq57qu2F8dT7NIa6f.jpg'},
-                {'id': 120, 'name': 'The Lord of the Rings: The Fellowship of the Ring', 'poster_path': '/6oom5QYQ2yQTMJIbnvbkBL9cHo6.jpg'},
-                {'id': 121, 'name': 'The Lord of the Rings: The Two Towers', 'poster_path': '/5VTN0pR8gcqV3EPUHHfMGnJYN9L.jpg'},
-                {'id': 49026, 'name': 'The Dark Knight Rises', 'poster_path': '/85cWkCC1Nxq3o74s7Bp2jNU0Aas.jpg'},
-                {'id': 603, 'name': 'The Matrix', 'poster_path': '/f89U3ADr1oiB1s9GkdPOEpXUk5H.jpg'},
-                {'id': 11216, 'name': 'Cinema Paradiso', 'poster_path': '/8SRUfRUi6x4O68n0VCbDNRa6iGL.jpg'},
-                {'id': 389, 'name': '12 Angry Men', 'poster_path': '/ppd84D2i9W8ijXFMhXK62lO7vfQ.jpg'},
-                {'id': 346, 'name': 'Seven Samurai', 'poster_path': '/8OKmBV5BUFaozqlNxSgFz8l8J3P.jpg'},
-                {'id': 637, 'name': 'Life Is Beautiful', 'poster_path': '/74hLDKjD5aGYOotO6esUVaeISa2.jpg'},
-                {'id': 769, 'name': 'GoodFellas', 'poster_path': '/aKuFiU82s5ISJpGZp7YkIr3kCUd.jpg'},
-                {'id': 274, 'name': 'The Silence of the Lambs', 'poster_path': '/uS9m8OBk1A8eM9I042e8rVKbOc0.jpg'},
-                {'id': 539, 'name': 'Psycho', 'poster_path': '/tdqX0MWaFHuGwUygYn7j6eluOdP.jpg'},
-                {'id': 510, 'name': 'One Flew Over the Cuckoo\'s Nest', 'poster_path': '/3jcbDmRFiQ83drXNOvRDeKHxr0M.jpg'},
-                {'id': 18, 'name': 'The Fifth Element', 'poster_path': '/zaFa1NRZEnFgRTv5OVXyIZg1fZ8.jpg'},
-                {'id': 475557, 'name': 'Joker', 'poster_path': '/udDclJo2j3QyA8kX3i3k6tqEaZ3.jpg'},
-                {'id': 335983, 'name': 'Venom', 'poster_path': '/2uNW4WbgBXL25BAbXGLnLqX71Sw.jpg'},
-                {'id': 299536, 'name': 'Avengers: Infinity War', 'poster_path': '/7WsyChQLEftFiDOVTGkv3hFpyyt.jpg'},
-                {'id': 299534, 'name': 'Avengers: Endgame', 'poster_path': '/or06FN3Dka5tukK1e9sl16pB3iy.jpg'},
-                {'id': 181808, 'name': 'Star Wars: The Last Jedi', 'poster_path': '/kOVEVeg59E0wsnXmF9Ura6NS8pR.jpg'},
-                {'id': 181803, 'name': 'Star Wars: The Rise of Skywalker', 'poster_path': '/db32LaOibfE2AmfF9k3dPZR4TzJ.jpg'},
-                {'id': 284054, 'name': 'Black Panther', 'poster_path': '/uxzzxijgPIY7slzFvMotPv8wjKA.jpg'},
-                {'id': 284053, 'name': 'Thor: Ragnarok', 'poster_path': '/rzRwTcFvttcN1ZpX2xv4N3gTOsu.jpg'},
-            ]
-            
-            import random
-            # Request more movies than needed to account for validation failures
-            # Request 2x the limit to ensure we have enough after filtering
-            request_count = min(limit * 2, len(popular_movies))
-            selected_movies = random.sample(popular_movies, request_count)
-            
-            # Validate images before returning
+        # Request more movies than needed to account for validation failures
+        # Request 2x the limit to ensure we have enough after filtering
+        request_count = min(limit * 2, len(POPULAR_MOVIES))
+        selected_movies = rng.sample(POPULAR_MOVIES, request_count)
+
+        if rng is not random:
+            movies = await first_valid_movies(selected_movies, limit)
+        else:
             movies = []
+            missing = []
             for movie in selected_movies:
-                poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
-                try:
-                    # Quick validation: check if image URL is accessible
-                    response = await client.head(poster_url, timeout=5.0)
-                    if response.status_code == 200:
-                        movies.append({
-                            'id': movie['id'],
-                            'name': movie['name'],
-                            'image': poster_url,
-                        })
-                    else:
-                        # Try alternative size if w500 fails
-                        alt_url = f"https://image.tmdb.org/t/p/w342{movie['poster_path']}"
-                        alt_response = await client.head(alt_url, timeout=5.0)
-                        if alt_response.status_code == 200:
-                            movies.append({
-                                'id': movie['id'],
-                                'name': movie['name'],
-                                'image': alt_url,
-                            })
-                except Exception:
-                    # Skip this movie if image validation fails
-                    continue
-            
-            if not movies:
-                raise HTTPException(status_code=500, detail="No movie posters available")
-            
-            return movies[:limit]
+                item = cached_item('movies', movie['id'], partial(load_movie, movie))
+                if item is None:
+                    missing.append(movie)
+                elif len(movies) < limit:
+                    movies.append(item)
+
+            if missing and len(movies) < limit:
+                def fetch(movie):
+                    return theme_fetches.run(('movies', movie['id']), partial(load_movie, movie))
+
+                movies += await fan_out(fetch, missing, limit - len(movies))
+
+        movies = fill_from_snapshot('movies', movies, limit, rng)
+
+        if not movies:
+            raise HTTPException(status_code=500, detail="No movie posters available")
+
+        return movies[:limit]
     except HTTPException:
         raise
     except Exception as e:
@@ -183,35 +440,13 @@ async def get_movies_theme(limit: int = 18) -> List[Dict[str, Any]]:
         )
 
 
-async def get_flags_theme(limit: int = 18) -> List[Dict[str, Any]]:
-    """Fetch country flags from REST Countries API."""
+async def get_flags_theme(limit: int = 18, rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Sample country flags from the cached REST Countries catalog."""
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            # Get all countries
-            response = await client.get(
-                "https://restcountries.com/v3.1/all?fields=name,flags",
-                timeout=15.0
-            )
-            response.raise_for_status()
-            countries = response.json()
-            
-            import random
-            selected_countries = random.sample(countries, min(limit, len(countries)))
-            
-            flags = []
-            for i, country in enumerate(selected_countries, 1):
-                flag_url = country.get('flags', {}).get('png') or country.get('flags', {}).get('svg')
-                if flag_url:
-                    flags.append({
-                        'id': i,
-                        'name': country.get('name', {}).get('common', f'Country {i}'),
-                        'image': flag_url,
-                    })
-            
-            if not flags:
-                raise HTTPException(status_code=500, detail="No flag images received")
-            
-            return flags[:limit]
+        catalog = await cached_catalog('flags')
+        if not catalog:
+            raise HTTPException(status_code=500, detail="No flag images received")
+        return numbered(rng.sample(catalog, min(limit, len(catalog))))
     except HTTPException:
         raise
     except Exception as e:
@@ -221,39 +456,83 @@ async def get_flags_theme(limit: int = 18) -> List[Dict[str, Any]]:
         )
 
 
-async def get_fruits_theme(limit: int = 18) -> List[Dict[str, Any]]:
-    """Fetch fruit images from Fruityvice API."""
-    try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            # Fruityvice API doesn't provide images, so we'll use emoji fruits
-            # For a real implementation, you could use Unsplash or another image API
-            fruit_emojis = {
-                'apple': '🍎', 'banana': '🍌', 'orange': '🍊', 'grape': '🍇',
-                'strawberry': '🍓', 'watermelon': '🍉', 'pineapple': '🍍', 'mango': '🥭',
-                'peach': '🍑', 'cherry': '🍒', 'pear': '🍐', 'kiwi': '🥝',
-                'lemon': '🍋', 'coconut': '🥥', 'avocado': '🥑', 'tomato': '🍅',
-                'eggplant': '🍆', 'pepper': '🌶️', 'corn': '🌽', 'carrot': '🥕',
-            }
-            
-            fruit_names = list(fruit_emojis.keys())
-            import random
-            selected_fruits = random.sample(fruit_names, min(limit, len(fruit_names)))
-            
-            # Use emoji directly - simpler approach
-            fruits = []
-            for i, fruit_name in enumerate(selected_fruits, 1):
-                fruits.append({
-                    'id': i,
-                    'name': fruit_name.title(),
-                    'emoji': fruit_emojis[fruit_name],
-                })
-            
-            return fruits[:limit]
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to fetch fruits theme: {str(e)}"
-        )
+async def get_fruits_theme(limit: int = 18, rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Fruit emojis (no upstream API provides usable fruit images)."""
+    selected_fruits = rng.sample(list(FRUIT_EMOJIS), min(limit, len(FRUIT_EMOJIS)))
+    return [
+        {'id': i, 'name': fruit_name.title(), 'emoji': FRUIT_EMOJIS[fruit_name]}
+        for i, fruit_name in enumerate(selected_fruits, 1)
+    ]
+
+
+# Themes whose whole upstream catalog is cached as one entry
+CATALOG_FETCHERS = {
+    'dogs': fetch_dogs_catalog,
+    'flags': fetch_flags_catalog,
+}
+
+# Themes cached one item at a time, keyed by item id
+ITEM_THEMES = ('pokemon', 'movies')
+
+
+async def prefetch_items(theme: str, max_requests: int) -> int:
+    """Load up to `max_requests` items of a per-item theme missing from the cache.
+
+    Returns the number of items loaded. A movie may take two requests
+    (see validate_movie_poster).
+    """
+    if theme == 'pokemon':
+        keys = [i for i in range(1, POKEMON_COUNT + 1) if not theme_cache.fresh('pokemon', i)]
+        load = load_pokemon
+    elif theme == 'movies':
+        keys = [movie for movie in POPULAR_MOVIES if not theme_cache.fresh('movies', movie['id'])]
+        load = load_movie
+    else:
+        return 0
+    keys = keys[:max(max_requests, 0)]
+
+    def fetch(key):
+        return theme_fetches.run((theme, key if theme == 'pokemon' else key['id']), partial(load, key))
+
+    return len(await fan_out(fetch, keys, len(keys))) if keys else 0
+
+
+def warm_theme_cache() -> int:
+    """Fill the theme cache from catalog snapshots that are still within their TTL.
+
+    Pokemon and movies are warmed item by item, each for what is left of
+    its own TTL. Returns the number of warmed themes.
+    """
+    warmed = 0
+    for theme, ttl in THEME_CACHE_TTLS.items():
+        items, age = catalog_store.get(theme), catalog_store.age(theme)
+        if not items or age is None or age >= ttl:
+            continue
+        if theme in ITEM_THEMES:
+            fresh = [(item, item_age) for item, item_age in catalog_store.item_ages(theme) if item_age < ttl]
+            for item, item_age in fresh:
+                theme_cache.put(theme, item['id'], item, ttl - item_age)
+            if not fresh:
+                continue
+        else:
+            theme_cache.put(theme, None, items, ttl - age)
+        warmed += 1
+    return warmed
+
+
+async def refresh_catalogs(horizon: float = 0) -> None:
+    """Re-fetch the full catalogs expiring within `horizon` seconds.
+
+    A failed refresh keeps the previous catalog.
+    """
+    for theme in CATALOG_FETCHERS:
+        age = catalog_store.age(theme)
+        if age is not None and age + horizon < THEME_CACHE_TTLS[theme]:
+            continue
+        try:
+            await refresh_catalog(theme)
+        except Exception as e:
+            logger.warning(f"Could not refresh the {theme} theme catalog: {e}")
 
 
 THEME_PROVIDERS = {
@@ -265,8 +544,10 @@ THEME_PROVIDERS = {
 }
 
 
-async def get_theme_data(theme_name: str, limit: int = 18) -> List[Dict[str, Any]]:
-    """Get theme data from provider."""
+async def get_theme_data(
+    theme_name: str, limit: int = 18, rng: random.Random = random
+) -> List[Dict[str, Any]]:
+    """Get theme data from provider; `rng` draws the sample (seed it for reproducible picks)."""
     if theme_name not in THEME_PROVIDERS:
         raise HTTPException(
             status_code=400,
@@ -274,5 +555,43 @@ async def get_theme_data(theme_name: str, limit: int = 18) -> List[Dict[str, Any
         )
     
     provider = THEME_PROVIDERS[theme_name]
-    return await provider(limit)
+    return await provider(limit, rng)
+
+
+def last_known_items(theme: str, limit: int, rng: random.Random = random) -> List[Dict[str, Any]]:
+    """Sample of the last items received for a theme, cached or from its snapshot."""
+    items = catalog_store.get(theme) or []
+    sample = rng.sample(items, min(limit, len(items)))
+    return sample if theme in ITEM_THEMES else numbered(sample)
+
+
+async def get_theme_data_within(
+    theme_name: str, limit: int, deadline: float, rng: random.Random = random
+) -> Tuple[List[Dict[str, Any]], str]:
+    """Theme data answered within `deadline` seconds, and its source.
+
+    The source is "upstream" when the provider answered in time. Otherwise
+    the provider keeps loading in the background (filling the cache for the
+    next request) and the last known items of the theme are returned
+    ("snapshot"), or the bundled fruit emojis when there are none ("fruits").
+    """
+    if theme_name not in THEME_PROVIDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Theme '{theme_name}' not available"
+        )
+
+    task = asyncio.ensure_future(get_theme_data(theme_name, limit, rng))
+    keep_in_background(task)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), deadline), "upstream"
+    except asyncio.TimeoutError:
+        logger.warning(f"{theme_name} theme not ready within {deadline * 1000:.0f} ms, serving a fallback")
+    except HTTPException as e:
+        logger.warning(f"{theme_name} theme failed, serving a fallback: {e.detail}")
+
+    items = last_known_items(theme_name, limit, rng)
+    if items:
+        return items, "snapshot"
+    return await get_fruits_theme(limit, rng), "fruits"
 
@@ -0,0 +1,286 @@
+"""Per-provider circuit breakers, hedged requests and latency histograms for upstream APIs."""
+
+import asyncio
+import bisect
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+# Consecutive failures opening a provider's circuit, and how long it stays open
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+# A second identical request is sent once the first one is slower than this
+# latency quantile of the provider (0 disables hedging)
+UPSTREAM_HEDGE_QUANTILE = float(os.getenv("UPSTREAM_HEDGE_QUANTILE", "0.95"))
+UPSTREAM_HEDGE_MIN_MS = float(os.getenv("UPSTREAM_HEDGE_MIN_MS", "100"))
+# Hedge delay until enough latencies were observed
+UPSTREAM_HEDGE_DEFAULT_MS = float(os.getenv("UPSTREAM_HEDGE_DEFAULT_MS", "1000"))
+HEDGE_MIN_SAMPLES = 20
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit is open: the call was not attempted."""
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error means the provider is unhealthy (network, timeout, 5xx, 429)."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return False
+
+
+class CircuitBreaker:
+    """Closed, open after `failures` consecutive failures, half-open after `reset_seconds`.
+
+    A half-open circuit lets a single probe call through: it closes again on
+    success and re-opens on failure.
+    """
+
+    def __init__(
+        self,
+        failures: int = UPSTREAM_BREAKER_FAILURES,
+        reset_seconds: float = UPSTREAM_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a closed circuit."""
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """"closed", "open" or "half_open"."""
+        if self._opened_at is None:
+            return "closed"
+        if self.clock() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (counts rejections)."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self) -> None:
+        """Record a call the provider answered."""
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def failure(self) -> None:
+        """Record a failed call; opens the circuit past the threshold or after a failed probe."""
+        self.consecutive_failures += 1
+        if self._probing or (self._opened_at is None and self.consecutive_failures >= self.failures):
+            self._opened_at = self.clock()
+            self.opened += 1
+        self._probing = False
+
+    def release(self) -> None:
+        """Forget a call abandoned by its caller, without an outcome."""
+        self._probing = False
+
+    def reset(self) -> None:
+        """Close the circuit and reset the counters."""
+        self.consecutive_failures = self.opened = self.rejected = 0
+        self._opened_at = None
+        self._probing = False
+
+    def metrics(self) -> Dict[str, Any]:
+        """State and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyHistogram:
+    """Counts of latencies per LATENCY_BUCKETS_MS bucket."""
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every observation."""
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        """Add one latency."""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated latency quantile, interpolated within its bucket; None when empty."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS_MS[i - 1] if i else 0
+                upper = LATENCY_BUCKETS_MS[i]
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return LATENCY_BUCKETS_MS[-2]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Bucket counts (keyed by upper bound), total and main quantiles."""
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 1),
+            "buckets": {
+                ("inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)
+            },
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+        }
+
+
+class UpstreamGuard:
+    """Calls to one provider through its circuit breaker, hedged when slow."""
+
+    def __init__(self, name: str, breaker: Optional[CircuitBreaker] = None):
+        """Initialize with a closed circuit and no latency data."""
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a slow call is hedged, or None not to hedge."""
+        if UPSTREAM_HEDGE_QUANTILE <= 0 or self.breaker.state != "closed":
+            return None
+        if self.latency.count < HEDGE_MIN_SAMPLES:
+            return UPSTREAM_HEDGE_DEFAULT_MS / 1000
+        return max(UPSTREAM_HEDGE_MIN_MS, self.latency.quantile(UPSTREAM_HEDGE_QUANTILE)) / 1000
+
+    async def call(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of `request()`; raises CircuitOpenError without calling it when the circuit is open.
+
+        `request` must be idempotent: a hedged call runs it twice and keeps
+        the first answer.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        self.calls += 1
+        try:
+            result = await self._hedged(request)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.errors += 1
+            if is_upstream_failure(e):
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            raise
+        self.breaker.success()
+        return result
+
+    async def _attempt(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        result = await request()
+        self.latency.observe((time.perf_counter() - start) * 1000)
+        return result
+
+    async def _hedged(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        attempts = [asyncio.ensure_future(self._attempt(request))]
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    self.hedges += 1
+                    attempts.append(asyncio.ensure_future(self._attempt(request)))
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    error = attempt.exception()
+                    if error is None:
+                        if attempt is not attempts[0]:
+                            self.hedge_wins += 1
+                        return attempt.result()
+            # Every attempt failed
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    def reset(self) -> None:
+        """Close the circuit and drop the latency data and counters."""
+        self.breaker.reset()
+        self.latency.clear()
+        self.calls = self.errors = self.hedges = self.hedge_wins = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """Breaker state, call counters and latency histogram."""
+        return {
+            "breaker": self.breaker.metrics(),
+            "calls": self.calls,
+            "errors": self.errors,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency_ms": self.latency.metrics(),
+        }
+
+
+class UpstreamGuards:
+    """One UpstreamGuard per provider name, created on first use."""
+
+    def __init__(self):
+        """Initialize without providers."""
+        self._guards: Dict[str, UpstreamGuard] = {}
+
+    def get(self, name: str) -> UpstreamGuard:
+        """Guard of a provider."""
+        guard = self._guards.get(name)
+        if guard is None:
+            guard = self._guards[name] = UpstreamGuard(name)
+        return guard
+
+    def clear(self) -> None:
+        """Reset every provider."""
+        for guard in self._guards.values():
+            guard.reset()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Metrics per provider."""
+        return {name: guard.metrics() for name, guard in sorted(self._guards.items())}
+
+
+# Global provider guards, keyed by theme
+upstream_guards = UpstreamGuards()
@@ -2,18 +2,37 @@
 
 from typing import Dict, Set
 from fastapi import WebSocket
-import json
+import asyncio
 import logging
+import os
+
+from app.serialization import dumps
 
 logger = logging.getLogger(__name__)
 
+# Longest wait for one message to be sent to one client
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "2"))
+# Consecutive send timeouts after which a client is evicted
+WS_MAX_SEND_TIMEOUTS = int(os.getenv("WS_MAX_SEND_TIMEOUTS", "2"))
+
+# Close code sent to evicted clients ("try again later")
+WS_CLOSE_SLOW_CLIENT = 1013
+
 
 class ConnectionManager:
     """Manages WebSocket connections."""
 
-    def __init__(self):
+    def __init__(
+        self, send_timeout: float = WS_SEND_TIMEOUT_SECONDS, max_send_timeouts: int = WS_MAX_SEND_TIMEOUTS
+    ):
         """Initialize connection manager."""
         self.active_connections: Dict[str, Set[WebSocket]] = {}  # room_code -> set of websockets
+        self.send_timeout = send_timeout
+        self.max_send_timeouts = max_send_timeouts
+        self.send_timeouts = 0
+        self.send_errors = 0
+        self.evictions = 0
+        self._timeouts: Dict[WebSocket, int] = {}  # consecutive send timeouts per websocket
 
     async def connect(self, websocket: WebSocket, room_code: str):
         """Connect a client to a room."""
@@ -29,6 +48,7 @@ class ConnectionManager:
             self.active_connections[room_code].discard(websocket)
             if not self.active_connections[room_code]:
                 del self.active_connections[room_code]
+        self._timeouts.pop(websocket, None)
         logger.info(f"Client disconnected from room {room_code}")
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
@@ -38,24 +58,63 @@ class ConnectionManager:
         except Exception as e:
             logger.error(f"Error sending personal message: {e}")
 
+    async def _send(self, room_code: str, websocket: WebSocket, text: str) -> bool:
+        """Send one message within the timeout; returns whether the client should stay."""
+        try:
+            await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+        except asyncio.TimeoutError:
+            # The message is dropped for this client, not resent
+            self.send_timeouts += 1
+            timeouts = self._timeouts[websocket] = self._timeouts.get(websocket, 0) + 1
+            logger.warning(f"Send to a client of room {room_code} timed out ({timeouts} in a row)")
+            return timeouts < self.max_send_timeouts
+        except Exception as e:
+            self.send_errors += 1
+            logger.error(f"Error broadcasting to room {room_code}: {e}")
+            return False
+        self._timeouts.pop(websocket, None)
+        return True
+
+    async def _close(self, websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=WS_CLOSE_SLOW_CLIENT), self.send_timeout)
+        except Exception:
+            # Already closed or stalled: the connection is dropped anyway
+            pass
+
     async def broadcast_to_room(self, room_code: str, message: dict):
-        """Broadcast a message to all clients in a room."""
-        if room_code not in self.active_connections:
+        """Broadcast a message to all clients in a room, concurrently.
+
+        The message is encoded once. A client whose send fails, or times out
+        (send_timeout) max_send_timeouts times in a row, is evicted and its
+        socket closed, so one stalled client never delays the others for
+        longer than send_timeout.
+        """
+        connections = list(self.active_connections.get(room_code, ()))
+        if not connections:
             return
 
-        disconnected = []
-        for connection in self.active_connections[room_code]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to room {room_code}: {e}")
-                disconnected.append(connection)
+        text = dumps(message).decode()
+        keep = await asyncio.gather(*(self._send(room_code, connection, text) for connection in connections))
+
+        # Evict slow and disconnected clients
+        evicted = [connection for connection, stays in zip(connections, keep) if not stays]
+        for connection in evicted:
+            self.disconnect(connection, room_code)
+        self.evictions += len(evicted)
+        if evicted:
+            await asyncio.gather(*(self._close(connection) for connection in evicted))
 
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.active_connections[room_code].discard(connection)
+    def metrics(self) -> Dict[str, int]:
+        """Connection and send failure counters."""
+        return {
+            "rooms": len(self.active_connections),
+            "connections": sum(len(connections) for connections in self.active_connections.values()),
+            "send_timeouts": self.send_timeouts,
+            "send_errors": self.send_errors,
+            "evictions": self.evictions,
+        }
 
 
 # Global connection manager
 manager = ConnectionManager()
-
@@ -0,0 +1,182 @@
+"""Write-behind queue that group-commits score submissions."""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.crud import save_scores
+from app.database import engine
+from app.models import ScoreRecord
+from app.schemas import ScoreCreate
+
+logger = logging.getLogger(__name__)
+
+# "direct" commits each score in its request, "write_behind" goes through the queue
+SCORE_WRITE_MODE = os.getenv("SCORE_WRITE_MODE", "direct")
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "200"))
+WRITE_BEHIND_MAX_DEPTH = int(os.getenv("WRITE_BEHIND_MAX_DEPTH", "10000"))
+
+PendingScore = Tuple[ScoreCreate, "asyncio.Future[ScoreRecord]", float]
+
+
+class ScoreWriteQueue:
+    """Collects submissions and commits them in groups of up to `max_batch` rows.
+
+    A group is flushed `flush_ms` after its first submission or as soon as it
+    reaches `max_batch` rows, whichever comes first. Submitters wait for the
+    group commit and get the saved row back.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = lambda: Session(engine),
+        flush_ms: int = WRITE_BEHIND_FLUSH_MS,
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        max_depth: int = WRITE_BEHIND_MAX_DEPTH,
+    ):
+        """Initialize a stopped queue."""
+        self.session_factory = session_factory
+        self.flush_ms = flush_ms
+        self.max_batch = max_batch
+        self.max_depth = max_depth
+        self.on_commit: Optional[Callable[[ScoreRecord], None]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.failed_batches = 0
+        self.last_flush_latency_ms = 0.0
+        self.max_flush_latency_ms = 0.0
+        self._total_flush_latency_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether submissions are currently accepted."""
+        return self._task is not None
+
+    @property
+    def depth(self) -> int:
+        """Number of submissions waiting to be flushed."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self, on_commit: Optional[Callable[[ScoreRecord], None]] = None) -> None:
+        """Start the background flush task."""
+        if self.running:
+            return
+        self.on_commit = on_commit
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything queued before the stop and stop the background task.
+
+        New submissions are rejected first; submissions still blocked on a
+        full queue that land after the last flush fail with RuntimeError.
+        """
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(None)
+        await task
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        """Fail the submissions left in the queue once the flush task has ended."""
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(RuntimeError("Score write queue was stopped"))
+
+    async def submit(self, score_data: ScoreCreate) -> ScoreRecord:
+        """Queue a score and wait until its group has been committed."""
+        if not self.running:
+            raise RuntimeError("Score write queue is not running")
+        task = self._task
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((score_data, future, time.perf_counter()))
+        if task.done():
+            # Blocked on a full queue until after the last flush
+            self._fail_pending()
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch: List[PendingScore] = [first]
+            deadline = first[2] + self.flush_ms / 1000
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout > 0:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    def _write(self, items: List[ScoreCreate]) -> List[ScoreRecord]:
+        with self.session_factory() as session:
+            return save_scores(session, items)
+
+    async def _flush(self, batch: List[PendingScore]) -> None:
+        try:
+            scores = await asyncio.to_thread(self._write, [item for item, _, _ in batch])
+        except Exception as e:
+            logger.error(f"Error flushing {len(batch)} queued scores: {e}", exc_info=True)
+            self.failed_batches += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        latency_ms = (time.perf_counter() - batch[0][2]) * 1000
+        self.flushed_batches += 1
+        self.flushed_rows += len(scores)
+        self.last_flush_latency_ms = latency_ms
+        self.max_flush_latency_ms = max(self.max_flush_latency_ms, latency_ms)
+        self._total_flush_latency_ms += latency_ms
+        for (_, future, _), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(score)
+        if self.on_commit is not None:
+            for score in scores:
+                try:
+                    self.on_commit(score)
+                except Exception as e:
+                    logger.error(f"Error handling committed score {score.id}: {e}", exc_info=True)
+
+    def metrics(self) -> dict:
+        """Queue depth and flush latency counters."""
+        return {
+            "mode": "write_behind" if self.running else "direct",
+            "depth": self.depth,
+            "flush_ms": self.flush_ms,
+            "max_batch": self.max_batch,
+            "flushed_batches": self.flushed_batches,
+            "flushed_rows": self.flushed_rows,
+            "failed_batches": self.failed_batches,
+            "last_flush_latency_ms": round(self.last_flush_latency_ms, 3),
+            "max_flush_latency_ms": round(self.max_flush_latency_ms, 3),
+            "avg_flush_latency_ms": round(
+                self._total_flush_latency_ms / self.flushed_batches, 3
+            )
+            if self.flushed_batches
+            else 0.0,
+        }
+
+
+# Global score write queue instance
+score_queue = ScoreWriteQueue()
@@ -0,0 +1,4 @@
+"""Benchmarks for the memory game backend.
+
+Run from the backend directory, e.g. ``python -m benchmarks.bench_batch_insert``.
+"""
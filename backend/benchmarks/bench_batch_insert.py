@@ -0,0 +1,74 @@
+"""Compare POST /api/scores/batch with one POST /api/scores per score.
+
+Usage: python -m benchmarks.bench_batch_insert [--count 500] [--batch-size 100]
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.main import app, get_session
+
+
+def make_score(i: int) -> dict:
+    """Build a score payload."""
+    return {
+        "player_name": f"Player {i % 50}",
+        "score": i % 19,
+        "moves": 10 + i % 30,
+        "time": 30 + i % 200,
+        "grid_size": "4x4" if i % 2 else "6x6",
+        "theme": "numbers",
+    }
+
+
+def run(count: int, batch_size: int, use_batch: bool) -> float:
+    """Insert `count` scores into a fresh file database and return rows/second."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{Path(tmp) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        SQLModel.metadata.create_all(engine)
+
+        def get_session_override():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        client = TestClient(app)
+        payloads = [make_score(i) for i in range(count)]
+        start = time.perf_counter()
+        if use_batch:
+            for offset in range(0, count, batch_size):
+                client.post("/api/scores/batch", json=payloads[offset : offset + batch_size])
+        else:
+            for payload in payloads:
+                client.post("/api/scores", json=payload)
+        elapsed = time.perf_counter() - start
+        app.dependency_overrides.clear()
+        engine.dispose()
+        return count / elapsed
+
+
+def main() -> None:
+    """Run both paths and print throughput."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    single = run(args.count, args.batch_size, use_batch=False)
+    batch = run(args.count, args.batch_size, use_batch=True)
+    print(f"single-row: {single:10.0f} rows/s")
+    print(f"batch({args.batch_size}): {batch:10.0f} rows/s  ({batch / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Broadcast latency in a room with one slow client: sequential sends vs ConnectionManager.
+
+Usage: python -m benchmarks.bench_broadcast [--clients 8] [--slow-ms 3000] [--messages 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import List
+
+from app.websocket_manager import ConnectionManager
+
+
+class SimulatedClient:
+    """WebSocket stand-in taking `delay` seconds to accept each message."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.latencies: List[float] = []
+        self.sent_at = 0.0
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - self.sent_at)
+
+    async def send_json(self, data: dict) -> None:
+        await self.send_text("")
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+async def sequential_broadcast(clients: List[SimulatedClient], message: dict) -> None:
+    """The previous broadcast: one send after the other."""
+    for client in clients:
+        await client.send_json(message)
+
+
+async def run(clients: int, slow_ms: float, messages: int, concurrent: bool) -> List[float]:
+    """Delivery latencies (seconds) of the fast clients over `messages` broadcasts."""
+    fast = [SimulatedClient(0.005) for _ in range(clients)]
+    room = [SimulatedClient(slow_ms / 1000)] + fast
+    manager = ConnectionManager(send_timeout=0.25)
+    for client in room:
+        await manager.connect(client, "BENCH")
+    for i in range(messages):
+        start = time.perf_counter()
+        for client in room:
+            client.sent_at = start
+        if concurrent:
+            await manager.broadcast_to_room("BENCH", {"type": "flip", "card": i})
+        else:
+            await sequential_broadcast(room, {"type": "flip", "card": i})
+    return [latency for client in fast for latency in client.latencies]
+
+
+def report(name: str, latencies: List[float]) -> None:
+    """Print latency percentiles in milliseconds."""
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:<12} p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+        f"p99 {p99 * 1000:8.1f} ms   max {latencies[-1] * 1000:8.1f} ms"
+    )
+
+
+def main() -> None:
+    """Run both broadcasts and print the fast clients' delivery latencies."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8, help="fast clients in the room")
+    parser.add_argument("--slow-ms", type=float, default=3000, help="send time of the slow client")
+    parser.add_argument("--messages", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("app.websocket_manager").setLevel(logging.ERROR)
+
+    report("sequential", asyncio.run(run(args.clients, args.slow_ms, args.messages, concurrent=False)))
+    report("concurrent", asyncio.run(run(args.clients, args.slow_ms, args.messages, concurrent=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Peak RSS of exporting the scores table: streaming vs loading everything.
+
+Each export runs in a fresh child process that writes to /dev/null and
+reports how much its peak RSS grew during the export.
+
+Usage: python -m benchmarks.bench_export [--rows 2000000] [--format ndjson]
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+from app.database import build_engine
+from app.export import encode_csv, encode_ndjson, export_statement, iter_export
+from app.dimensions import score_params
+from app.models import Score
+
+
+def populate(path: Path, rows: int) -> None:
+    """Fill a SQLite file with `rows` scores."""
+    engine = build_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    start = datetime(2024, 1, 1)
+    with Session(engine) as session:
+        for offset in range(0, rows, 50_000):
+            session.execute(
+                insert(Score),
+                score_params(session, [
+                    {"player_name": f"Player {i % 5000}", "score": i % 19, "moves": 10 + i % 60,
+                     "time": 20 + i % 600, "grid_size": "4x4" if i % 2 else "6x6", "theme": "numbers",
+                     "created_at": start + timedelta(seconds=i)}
+                    for i in range(offset, min(offset + 50_000, rows))
+                ]),
+            )
+        session.commit()
+
+
+def export(path: Path, mode: str, export_format: str) -> None:
+    """Child process: run one export and print the peak RSS growth (MiB) and duration."""
+    engine = build_engine(f"sqlite:///{path}", read_only=True)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with open("/dev/null", "wb") as sink:
+        if mode == "stream":
+            for chunk in iter_export(engine, export_format, export_statement()):
+                sink.write(chunk)
+        else:
+            with Session(engine) as session:
+                rows = session.exec(export_statement()).all()
+            encode = encode_ndjson if export_format == "ndjson" else encode_csv
+            sink.write(encode(rows))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{(peak - before) / 1024:.1f} {elapsed:.2f}")
+
+
+def main() -> None:
+    """Populate a database once and measure both export modes."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        export(Path(args.child[0]), args.child[1], args.format)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "export.db"
+        populate(path, args.rows)
+        print(f"{args.rows} rows, {args.format}")
+        for mode in ("stream", "load_all"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_export", "--format", args.format,
+                 "--child", str(path), mode],
+                check=True, capture_output=True, text=True,
+            ).stdout.split()
+            print(f"{mode:>9}: peak RSS +{output[0]} MiB in {output[1]} s")
+
+
+if __name__ == "__main__":
+    main()
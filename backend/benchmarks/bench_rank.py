@@ -0,0 +1,74 @@
+"""Rank lookup latency as the scores table grows.
+
+Compares the in-memory order-statistic index with the SQL COUNT fallback
+(which walks the ranking index range) on a file SQLite database.
+
+Usage: python -m benchmarks.bench_rank [--sizes 10000 100000 1000000] [--probes 200]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+from app.database import build_engine
+from app.dimensions import score_params
+from app.models import Score
+from app.ranking import ScoreRanking, rank_from_sql
+
+
+def main() -> None:
+    """Grow the table step by step and time rank lookups at each size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--probes", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'rank.db'}")
+        SQLModel.metadata.create_all(engine)
+        rows = 0
+        print(f"{'rows':>10}  {'memory us':>10}  {'sql us':>10}")
+        for size in sorted(args.sizes):
+            with Session(engine) as session:
+                while rows < size:
+                    chunk = min(50_000, size - rows)
+                    session.execute(
+                        insert(Score),
+                        score_params(session, [
+                            {"player_name": f"P{rng.randint(0, 5000)}", "score": rng.randint(0, 18),
+                             "moves": rng.randint(8, 80), "time": rng.randint(10, 900),
+                             "grid_size": rng.choice(["4x4", "6x6"]), "theme": "numbers",
+                             "created_at": now}
+                            for _ in range(chunk)
+                        ]),
+                    )
+                    rows += chunk
+                session.commit()
+
+                ranking = ScoreRanking()
+                ranking.load(session)
+                probes = [
+                    (rng.choice(["4x4", "6x6"]), rng.randint(0, 18), rng.randint(10, 900), rng.randint(8, 80))
+                    for _ in range(args.probes)
+                ]
+                start = time.perf_counter()
+                for probe in probes:
+                    ranking.rank(*probe)
+                memory_us = (time.perf_counter() - start) / len(probes) * 1e6
+                start = time.perf_counter()
+                for probe in probes:
+                    rank_from_sql(session, *probe)
+                sql_us = (time.perf_counter() - start) / len(probes) * 1e6
+            print(f"{rows:>10}  {memory_us:>10.1f}  {sql_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
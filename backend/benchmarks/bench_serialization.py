@@ -0,0 +1,79 @@
+"""Per-row cost of encoding top score responses.
+
+"pydantic" reproduces the previous path: model_dump, TopScoreResponse,
+then FastAPI's response_model validation and JSON encoding. "direct" is
+the current path (top_score_row + dumps, orjson when installed).
+
+Usage: python -m benchmarks.bench_serialization [--rows 100] [--repeat 200]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app import serialization
+from app.models import ScoreRecord
+from app.schemas import TopScoreResponse
+from app.serialization import dumps, top_score_row
+
+
+def pydantic_path(scores: List[ScoreRecord]) -> bytes:
+    """Previous encoding: three pydantic passes and the stdlib encoder."""
+    result = []
+    for rank, score in enumerate(scores, start=1):
+        score_dict = score.model_dump()
+        score_dict["rank"] = rank
+        result.append(TopScoreResponse(**score_dict))
+    adapter = TypeAdapter(List[TopScoreResponse])
+    content = adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def direct_path(scores: List[ScoreRecord]) -> bytes:
+    """Current encoding of trusted rows."""
+    return dumps([top_score_row(score, rank) for rank, score in enumerate(scores, start=1)])
+
+
+def per_row_us(fn, scores: List[ScoreRecord], repeat: int) -> float:
+    """Average encoding time per row in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(scores)
+    return (time.perf_counter() - start) / (repeat * len(scores)) * 1e6
+
+
+def main() -> None:
+    """Time both paths on the same rows."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    scores = [
+        ScoreRecord(id=i, player_name=f"Player {i}", score=i % 19, moves=20 + i % 30,
+              time=30 + i % 200, grid_size="4x4", theme="numbers", created_at=now)
+        for i in range(1, args.rows + 1)
+    ]
+    assert json.loads(pydantic_path(scores)) == json.loads(direct_path(scores))
+
+    baseline = per_row_us(pydantic_path, scores, args.repeat)
+    print(f"pydantic            {baseline:8.2f} us/row")
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    direct = per_row_us(direct_path, scores, args.repeat)
+    print(f"direct ({encoder:6})     {direct:8.2f} us/row  ({baseline / direct:.1f}x)")
+    if serialization.orjson is not None:
+        orjson, serialization.orjson = serialization.orjson, None
+        try:
+            stdlib = per_row_us(direct_path, scores, args.repeat)
+        finally:
+            serialization.orjson = orjson
+        print(f"direct (json)       {stdlib:8.2f} us/row  ({baseline / stdlib:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Columnar snapshot vs SQL dump: file size, warm-start load and restore time.
+
+Usage: python -m benchmarks.bench_snapshot [--rows 500000]
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel
+
+from app.database import build_engine
+from app.ranking import ScoreRanking
+from app.snapshot import ScoreSnapshot, restore_snapshot, write_snapshot
+from app.stats import StatisticsAggregator
+from benchmarks.bench_export import populate
+
+
+def timed(fn) -> float:
+    """Run fn and return the elapsed seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Populate a database and compare both backup formats."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = tmp / "source.db"
+        populate(source, args.rows)
+        engine = build_engine(f"sqlite:///{source}")
+        snapshot_path = tmp / "scores.snap"
+        dump_path = tmp / "scores.sql"
+
+        with Session(engine) as session:
+            save_snapshot = timed(lambda: write_snapshot(session, snapshot_path))
+
+        def dump() -> None:
+            with sqlite3.connect(source) as connection, open(dump_path, "w") as out:
+                for line in connection.iterdump():
+                    if line.startswith(("INSERT INTO \"score\"", "CREATE TABLE score")):
+                        out.write(line + "\n")
+
+        save_dump = timed(dump)
+        print(f"{args.rows} rows")
+        print(f"{'':18}{'snapshot':>12}{'sql dump':>12}")
+        print(f"{'size MiB':18}{snapshot_path.stat().st_size / 2**20:>12.1f}{dump_path.stat().st_size / 2**20:>12.1f}")
+        print(f"{'save s':18}{save_snapshot:>12.2f}{save_dump:>12.2f}")
+
+        def warm_from_snapshot() -> None:
+            with ScoreSnapshot(snapshot_path) as snapshot:
+                StatisticsAggregator().rebuild(snapshot.statistics_rows())
+                ScoreRanking().rebuild(snapshot.ranking_rows())
+
+        def warm_from_database() -> None:
+            with Session(engine) as session:
+                StatisticsAggregator().load(session)
+                ScoreRanking().load(session)
+
+        print(f"{'open s':18}{timed(lambda: ScoreSnapshot(snapshot_path).close()):>12.4f}{'-':>12}")
+        print(f"{'warm start s':18}{timed(warm_from_snapshot):>12.2f}{timed(warm_from_database):>12.2f}  (sql = load from the database)")
+
+        restored = build_engine(f"sqlite:///{tmp / 'restored.db'}")
+        SQLModel.metadata.create_all(restored)
+        with Session(restored) as session:
+            restore = timed(lambda: restore_snapshot(session, snapshot_path))
+
+        def replay_dump() -> None:
+            with sqlite3.connect(tmp / "replayed.db") as connection:
+                connection.executescript(dump_path.read_text())
+
+        print(f"{'restore s':18}{restore:>12.2f}{timed(replay_dump):>12.2f}  (snapshot includes derived tables)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,19 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 
+from app.catalog_store import catalog_store
+from app.decks import deck_pool
+from app.http_client import upstream_client
 from app.main import app, get_session
+from app.prewarm import theme_prewarmer
 from app.database import create_db_and_tables
+from app.dimensions import clear_intern_caches
+from app.leaderboard import leaderboard
+from app.ranking import ranking
+from app.response_cache import response_cache
+from app.stats import statistics
+from app.theme_cache import theme_cache, theme_fetches
+from app.upstream_guard import upstream_guards
 
 
 @pytest.fixture(name="session")
@@ -18,6 +29,8 @@ def session_fixture():
         poolclass=StaticPool,
     )
     SQLModel.metadata.create_all(engine)
+    # Cached ids belong to the previous test's database
+    clear_intern_caches()
     with Session(engine) as session:
         yield session
     SQLModel.metadata.drop_all(engine)
@@ -30,8 +43,33 @@ def client_fixture(session: Session):
         return session
 
     app.dependency_overrides[get_session] = get_session_override
+    leaderboard.load(session)
+    statistics.load(session)
+    ranking.load(session)
+    response_cache.clear()
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
+    leaderboard.clear()
+    statistics.clear()
+    ranking.clear()
+    response_cache.clear()
 
 
+
+
+@pytest.fixture(autouse=True)
+async def theme_state():
+    """Reset theme caches, decks and provider breakers, and close the upstream client a test opened."""
+    theme_cache.clear()
+    theme_fetches.clear()
+    catalog_store.clear()
+    upstream_guards.clear()
+    yield
+    theme_cache.clear()
+    theme_fetches.clear()
+    catalog_store.clear()
+    deck_pool.clear()
+    theme_prewarmer.clear()
+    upstream_guards.clear()
+    await upstream_client.close()
@@ -0,0 +1,141 @@
+"""Tests for the async database path."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import database
+from app.database import build_async_engine, to_async_url
+from app.leaderboard import leaderboard
+from app.main import app, get_session
+from app.stats import statistics
+
+pytest.importorskip("aiosqlite")
+
+# Runs in a fresh interpreter: DATABASE_URL and DATABASE_ASYNC are read at import time
+ASYNC_APP_SCRIPT = """
+import json
+from fastapi.testclient import TestClient
+from app import database
+from app.main import app
+
+assert database.async_engine is not None and database.async_read_engine is not database.async_engine
+with TestClient(app) as client:
+    created = [
+        client.post("/api/scores", json={"player_name": f"P{score}", "score": score, "moves": 20,
+                                         "time": 100, "grid_size": "4x4", "theme": "numbers"}).json()
+        for score in (10, 12, 8)
+    ]
+    batch = client.post("/api/scores/batch", json=[{"player_name": "B", "score": 11, "moves": 20, "time": 100,
+                                                     "grid_size": "6x6", "theme": "numbers"}])
+    print(json.dumps({
+        "ranks": [score["global_rank"] for score in created],
+        "batch": batch.status_code,
+        "top": [row["score"] for row in client.get("/api/scores/top").json()],
+        "page": [row["score"] for row in client.get("/api/scores/leaderboard?grid_size=4x4").json()["items"]],
+        "rank": client.get(f"/api/scores/{created[2]['id']}/rank").json()["global_rank"],
+        "participations": client.get("/api/scores/statistics").json()["total_participations"],
+    }))
+"""
+
+
+def test_to_async_url():
+    """Test mapping sync URLs to async drivers."""
+    assert to_async_url("sqlite:///./memory_game.db") == "sqlite+aiosqlite:///./memory_game.db"
+    assert to_async_url("postgresql://u:p@db/memory") == "postgresql+asyncpg://u:p@db/memory"
+    assert to_async_url("postgresql+psycopg2://u:p@db/m") == "postgresql+asyncpg://u:p@db/m"
+    with pytest.raises(ValueError):
+        to_async_url("mysql://u:p@db/m")
+
+
+async def test_async_file_engine_is_pooled(tmp_path):
+    """Test that an async engine on a SQLite file gets a sized pool and the SQLite profile."""
+    url = f"sqlite:///{tmp_path / 'pooled.db'}"
+    writer = build_async_engine(url)
+    reader = build_async_engine(url, read_only=True)
+    assert writer.pool.size() == database.DB_POOL_SIZE
+    assert reader.pool.size() == database.DB_READ_POOL_SIZE
+    async with writer.connect() as connection:
+        assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+    async with reader.connect() as connection:
+        assert (await connection.execute(text("PRAGMA query_only"))).scalar() == 1
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.fixture(name="async_client")
+def async_client_fixture(tmp_path):
+    """Create a test client whose endpoints get an AsyncSession."""
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    SQLModel.metadata.create_all(create_engine(url))
+    async_engine = create_async_engine(to_async_url(url))
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_async_session_override
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_score_endpoints_with_async_session(async_client: TestClient):
+    """Test creating and reading scores through the async session path."""
+    for score in (10, 12, 8):
+        response = async_client.post(
+            "/api/scores",
+            json={"player_name": f"P{score}", "score": score, "moves": 20, "time": 100,
+                  "grid_size": "4x4", "theme": "numbers"},
+        )
+        assert response.status_code == 201
+
+    response = async_client.post(
+        "/api/scores/batch",
+        json=[{"player_name": "B", "score": 11, "moves": 20, "time": 100,
+               "grid_size": "6x6", "theme": "numbers"}],
+    )
+    assert response.status_code == 201
+
+    # Leaderboard and statistics are not warmed here, so these go to the database
+    assert not leaderboard.loaded and not statistics.loaded
+    top = async_client.get("/api/scores/top").json()
+    assert [row["score"] for row in top] == [12, 11, 10, 8]
+    page = async_client.get("/api/scores/leaderboard?grid_size=4x4&limit=2").json()
+    assert [row["score"] for row in page["items"]] == [12, 10]
+    assert page["next_cursor"] is not None
+    stats = async_client.get("/api/scores/statistics").json()
+    assert stats["total_participations"] == 4
+    assert stats["total_players"] == 4
+
+
+def test_app_with_async_database_on_sqlite_file(tmp_path: Path):
+    """Test the score endpoints end to end with DATABASE_ASYNC on a SQLite file."""
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+        DATABASE_ASYNC="true",
+        DECK_POOL_SIZE="0",
+        THEME_PREWARM_SECONDS="0",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", ASYNC_APP_SCRIPT],
+        cwd=Path(__file__).resolve().parent.parent, env=env,
+        check=True, capture_output=True, text=True, timeout=60,
+    )
+    assert json.loads(output.stdout.strip().splitlines()[-1]) == {
+        "ranks": [1, 1, 3],
+        "batch": 201,
+        "top": [12, 11, 10, 8],
+        "page": [12, 10, 8],
+        "rank": 4,
+        "participations": 4,
+    }
@@ -0,0 +1,161 @@
+"""Tests for theme catalog snapshots and the offline fallback.
+
+Upstream APIs are replaced by a transport that refuses every connection,
+so these tests never touch the network.
+"""
+
+import json
+import shutil
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.catalog_store import CatalogStore, catalog_store
+from app.http_client import upstream_client
+from app.theme_cache import theme_cache
+from app.themes import get_theme_data, refresh_catalogs, warm_theme_cache
+
+FIXTURES = Path(__file__).parent / "fixtures" / "catalogs"
+
+
+class OfflineUpstream:
+    """Transport failing every request like an unreachable host."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        raise httpx.ConnectError("offline", request=request)
+
+
+@pytest.fixture(name="offline")
+def offline_fixture(tmp_path: Path, monkeypatch) -> OfflineUpstream:
+    """Fixture snapshots loaded from a temporary copy, upstream unreachable."""
+    directory = tmp_path / "catalogs"
+    shutil.copytree(FIXTURES, directory)
+    monkeypatch.setattr(catalog_store, "directory", directory)
+    catalog_store.load()
+    upstream = OfflineUpstream()
+    upstream_client.start(transport=httpx.MockTransport(upstream))
+    return upstream
+
+
+def fixture_names(theme: str) -> set:
+    """Item names of a fixture snapshot."""
+    snapshot = json.loads((FIXTURES / f"{theme}.json").read_text(encoding="utf-8"))
+    return {item["name"] for item in snapshot["items"]}
+
+
+@pytest.mark.parametrize("theme", ["flags", "dogs", "pokemon", "movies"])
+async def test_served_from_snapshot_when_upstream_down(offline: OfflineUpstream, theme: str):
+    """Test that every theme falls back to its snapshot."""
+    items = await get_theme_data(theme, 8)
+
+    assert len(items) == 8
+    assert {item["name"] for item in items} <= fixture_names(theme)
+    assert len({item["id"] for item in items}) == 8
+    assert offline.requests > 0
+
+
+async def test_stale_snapshot_is_not_warmed(offline: OfflineUpstream):
+    """Test that old snapshots only serve as a fallback."""
+    assert warm_theme_cache() == 0
+    assert theme_cache.metrics()["entries"] == 0
+
+
+async def test_fresh_snapshot_warms_cache(tmp_path: Path, offline: OfflineUpstream):
+    """Test that a recent snapshot is served without any upstream request."""
+    store = CatalogStore(str(tmp_path / "fresh"))
+    store.replace("flags", [{"name": f"Country {i}", "image": f"https://flags.example/{i}.png"} for i in range(20)])
+    assert store.flush() == 1
+
+    catalog_store.clear()
+    catalog_store.directory = store.directory
+    assert catalog_store.load() == {"flags": 20}
+    assert warm_theme_cache() == 1
+
+    items = await get_theme_data("flags", 5)
+    assert len(items) == 5
+    assert offline.requests == 0
+
+
+async def test_fetched_catalog_is_persisted(tmp_path: Path, monkeypatch):
+    """Test that fetched catalogs and items are written on flush."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "restcountries.com":
+            return httpx.Response(200, json=[{"name": {"common": "Peru"}, "flags": {"png": "https://flags.example/pe.png"}}])
+        pokemon_id = int(request.url.path.rstrip("/").rsplit("/", 1)[-1])
+        return httpx.Response(200, json={"name": "mew", "sprites": {"front_default": f"https://sprites.example/{pokemon_id}.png"}})
+
+    monkeypatch.setattr(catalog_store, "directory", tmp_path)
+    upstream_client.start(transport=httpx.MockTransport(handler))
+    await get_theme_data("flags", 1)
+    await get_theme_data("pokemon", 3)
+    assert catalog_store.flush() == 2
+    assert catalog_store.flush() == 0
+
+    store = CatalogStore(str(tmp_path))
+    assert store.load() == {"flags": 1, "pokemon": 3}
+    assert store.get("flags") == [{"name": "Peru", "image": "https://flags.example/pe.png"}]
+    assert store.age("pokemon") < 60
+
+
+async def test_failed_refresh_keeps_previous_catalog(offline: OfflineUpstream):
+    """Test that a background refresh failure leaves the snapshot in place."""
+    await refresh_catalogs()
+    assert offline.requests == 2
+    assert {item["name"] for item in catalog_store.get("flags")} == fixture_names("flags")
+
+
+async def test_refresh_skips_catalogs_not_expiring(offline: OfflineUpstream):
+    """Test that recent catalogs are not fetched again."""
+    catalog_store.replace("flags", catalog_store.get("flags"))
+    catalog_store.replace("dogs", catalog_store.get("dogs"))
+    await refresh_catalogs(horizon=3600)
+    assert offline.requests == 1  # dogs expire within the hour
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path: Path):
+    """Test that an unreadable snapshot does not prevent loading the others."""
+    (tmp_path / "flags.json").write_text("{not json", encoding="utf-8")
+    shutil.copy(FIXTURES / "dogs.json", tmp_path / "dogs.json")
+
+    store = CatalogStore(str(tmp_path))
+    assert store.load() == {"dogs": 20}
+    assert store.get("flags") is None
+
+
+def test_merge_updates_items_by_id():
+    """Test that individually fetched items replace older versions."""
+    store = CatalogStore()
+    store.merge("pokemon", [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}])
+    updated_at = time.time()
+    store.merge("pokemon", [{"id": 2, "name": "B2"}, {"id": 3, "name": "C"}])
+
+    assert sorted(item["name"] for item in store.get("pokemon")) == ["A", "B2", "C"]
+    assert store.age("pokemon") <= time.time() - updated_at + 1
+    assert store.flush() == 0  # no directory: memory only
+
+
+async def test_items_warmed_by_their_own_age(tmp_path: Path, monkeypatch):
+    """Test that merging one item does not make older items of the theme look fresh."""
+    monkeypatch.setattr(catalog_store, "directory", tmp_path)
+    with patch("app.catalog_store.time.time", return_value=time.time() - 90000):
+        catalog_store.merge("movies", [{"id": 1, "name": "Old"}])
+    catalog_store.merge("movies", [{"id": 2, "name": "New"}])
+    assert catalog_store.flush() == 1
+
+    catalog_store.clear()
+    assert catalog_store.load() == {"movies": 2}
+    assert warm_theme_cache() == 1
+    assert theme_cache.lookup("movies", 1) is None
+    assert theme_cache.lookup("movies", 2) == ({"id": 2, "name": "New"}, False)
+
+    # Once every item is past its TTL, the theme is not warmed at all
+    theme_cache.clear()
+    with patch("app.catalog_store.time.time", return_value=time.time() + 87000):
+        assert warm_theme_cache() == 0
@@ -0,0 +1,63 @@
+"""Tests for the database engine profile."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel
+from starlette.requests import Request
+
+from app import database
+from app.database import build_engine, engine_options, is_sqlite_memory
+from app.models import Player
+
+
+def make_request(method: str) -> Request:
+    """Build a bare request with the given method."""
+    return Request({"type": "http", "method": method, "headers": [], "query_string": b""})
+
+
+def test_sqlite_pragmas_applied(tmp_path):
+    """Test that the writer and readers get the SQLite profile on connect."""
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    writer = build_engine(url)
+    reader = build_engine(url, read_only=True)
+    with writer.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA query_only")).scalar() == 0
+    with reader.connect() as connection:
+        assert connection.execute(text("PRAGMA query_only")).scalar() == 1
+        assert connection.execute(text("PRAGMA cache_size")).scalar() == -65536
+
+
+def test_read_engine_rejects_writes(tmp_path):
+    """Test that sessions on the read engine cannot write."""
+    url = f"sqlite:///{tmp_path / 'readonly.db'}"
+    writer = build_engine(url)
+    SQLModel.metadata.create_all(writer)
+    reader = build_engine(url, read_only=True)
+    with Session(reader) as session:
+        session.add(Player(name="X"))
+        with pytest.raises(OperationalError):
+            session.commit()
+
+
+def test_engine_options():
+    """Test pool sizing and in-memory detection."""
+    assert is_sqlite_memory("sqlite://")
+    assert is_sqlite_memory("sqlite:///:memory:")
+    assert not is_sqlite_memory("sqlite:///./memory_game.db")
+    assert "pool_size" not in engine_options("sqlite://", read_only=False)
+    options = engine_options("postgresql://u:p@db/m", read_only=True)
+    assert options["execution_options"] == {"postgresql_readonly": True}
+    assert options["pool_size"] == database.DB_READ_POOL_SIZE
+
+
+async def test_get_session_routes_reads_to_read_engine(monkeypatch):
+    """Test that GET requests get the read engine and writes get the writer."""
+    monkeypatch.setattr(database, "read_engine", build_engine("sqlite://"))
+    for method, expected in (("GET", database.read_engine), ("POST", database.engine)):
+        sessions = database.get_session(make_request(method))
+        session = await sessions.__anext__()
+        assert session.get_bind() is expected
+        await sessions.aclose()
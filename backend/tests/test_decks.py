@@ -0,0 +1,149 @@
+"""Tests for seeded decks, the deck pool and room decks."""
+
+import asyncio
+import random
+from collections import Counter
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.decks import DeckPool, build_deck, grid_positions
+from app.http_client import upstream_client
+from app.rooms import RoomManager, RoomStatus
+from app.theme_cache import theme_cache
+from app.themes import POPULAR_MOVIES
+
+
+@pytest.fixture(name="flags")
+def flags_fixture() -> list:
+    """A cached flags catalog, so decks never reach the network."""
+    catalog = [{"name": f"Country {i}", "image": f"https://flagcdn.com/w320/{i}.png"} for i in range(40)]
+    theme_cache.put("flags", None, catalog, ttl=3600)
+    return catalog
+
+
+async def jittery_upstream(request: httpx.Request) -> httpx.Response:
+    """Mock PokeAPI / TMDB answering after a random delay; posters of ids divisible by 3 are missing."""
+    await asyncio.sleep(random.uniform(0, 0.05))
+    name = request.url.path.rstrip("/").rsplit("/", 1)[-1]
+    if request.method == "HEAD":
+        movie = next(movie for movie in POPULAR_MOVIES if movie["poster_path"] == f"/{name}")
+        return httpx.Response(404 if movie["id"] % 3 == 0 else 200)
+    return httpx.Response(200, json={"name": f"p{name}", "sprites": {"front_default": f"https://sprites.example/{name}.png"}})
+
+
+def test_grid_positions():
+    """Test grid size parsing."""
+    assert grid_positions("4x4") == 16
+    assert grid_positions("6x6") == 36
+    assert grid_positions("5x4") == 20
+    for invalid in ("3x3", "4", "ax4", "1x2", "12x12"):
+        with pytest.raises(ValueError):
+            grid_positions(invalid)
+
+
+async def test_deck_is_paired_and_seeded(flags: list):
+    """Test that a seed always gives the same board."""
+    deck = await build_deck("flags", "6x6", seed=42)
+    again = await build_deck("flags", "6x6", seed=42)
+    other = await build_deck("flags", "6x6", seed=43)
+
+    assert deck == again
+    assert deck.layout != other.layout
+    assert len(deck.items) == 18
+    assert len(deck.layout) == 36
+    assert set(Counter(deck.layout).values()) == {2}
+    assert set(deck.layout) == {item["id"] for item in deck.items}
+
+    # Cold cache: upstream answers in any order, some posters are missing
+    upstream_client.start(transport=httpx.MockTransport(jittery_upstream))
+    for theme in ("movies", "pokemon"):
+        theme_cache.clear()
+        cold = await build_deck(theme, "4x4", seed=42)
+        warm = await build_deck(theme, "4x4", seed=42)
+        theme_cache.clear()
+        recold = await build_deck(theme, "4x4", seed=42)
+        assert cold == warm == recold
+        assert len(cold.items) == 8
+
+
+async def test_numbers_deck_needs_no_theme_data():
+    """Test the numbers theme."""
+    deck = await build_deck("numbers", "4x4", seed=7)
+    assert sorted(deck.layout) == sorted(list(range(1, 9)) * 2)
+    assert deck.items[0] == {"id": 1, "name": "1"}
+
+
+async def test_pool_serves_ready_decks(flags: list):
+    """Test that pooled decks are taken without building, others built on demand."""
+    pool = DeckPool(keys=[("flags", "4x4"), ("numbers", "4x4")], size=2)
+    assert await pool.fill() == 4
+    assert await pool.fill() == 0
+
+    with patch("app.decks.get_theme_data", new_callable=AsyncMock) as get_theme_data:
+        first = await pool.take("flags", "4x4")
+        second = await pool.take("flags", "4x4")
+        get_theme_data.assert_not_awaited()
+    assert first.seed != second.seed
+    assert pool.metrics()["ready"] == {"flags:4x4": 0, "numbers:4x4": 2}
+
+    # Not pooled: built on the spot
+    deck = await pool.take("flags", "6x6")
+    assert len(deck.layout) == 36
+    assert (pool.metrics()["hits"], pool.metrics()["misses"]) == (2, 1)
+
+
+async def test_pool_refills_after_take(flags: list):
+    """Test that the background task replaces taken decks."""
+    pool = DeckPool(keys=[("flags", "4x4")], size=1)
+    await pool.start()
+    try:
+        while not pool.metrics()["ready"]["flags:4x4"]:
+            await asyncio.sleep(0.01)
+        await pool.take("flags", "4x4")
+        for _ in range(100):
+            if pool.metrics()["ready"]["flags:4x4"]:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.metrics()["ready"]["flags:4x4"] == 1
+    finally:
+        await pool.stop()
+
+
+async def test_pool_survives_upstream_failure():
+    """Test that a failing theme leaves its pool empty without raising."""
+    upstream_client.start(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    pool = DeckPool(keys=[("flags", "4x4"), ("numbers", "4x4")], size=1)
+
+    assert await pool.fill() == 1
+    assert pool.metrics()["failures"] == 1
+
+
+async def test_room_members_share_the_deck(flags: list):
+    """Test that a room holds one deck for all its players."""
+    rooms = RoomManager()
+    code = rooms.create_room("host", "Alice", {"theme": "flags"})
+    rooms.join_room(code, "guest", "Bob")
+    deck = await build_deck("flags", "4x4", seed=1)
+
+    assert rooms.deal_deck(code, deck)
+    assert rooms.get_player_room("guest").deck is rooms.get_player_room("host").deck is deck
+    rooms.update_room_status(code, RoomStatus.PLAYING)
+    assert not rooms.deal_deck(code, deck)
+    assert not rooms.deal_deck("NOPE", deck)
+
+
+def test_get_deck_endpoint(client: TestClient, flags: list):
+    """Test the deck endpoint with and without a seed."""
+    response = client.get("/api/decks/flags?grid_size=4x4&seed=5")
+    assert response.status_code == 200
+    deck = response.json()
+    assert deck["seed"] == 5
+    assert len(deck["layout"]) == 16
+    assert client.get("/api/decks/flags?grid_size=4x4&seed=5").json() == deck
+
+    assert len(client.get("/api/decks/numbers?grid_size=6x6").json()["layout"]) == 36
+    assert client.get("/api/decks/flags?grid_size=3x3").status_code == 400
+    assert client.get("/api/decks/unknown").status_code == 400
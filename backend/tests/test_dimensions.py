@@ -0,0 +1,103 @@
+"""Tests for the player, grid size and theme lookup tables."""
+
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.crud import insert_records
+from app.dimensions import InternTable, get_record, players, themes
+from app.migrations import migrate_score_dimensions
+from app.models import Player, Score, ScoreRecord, Theme
+from app.stats import compute_statistics_from_sql
+
+
+def make_score(name: str, theme: str = "numbers") -> ScoreRecord:
+    """Build an unsaved score."""
+    return ScoreRecord(player_name=name, score=10, moves=20, time=60,
+                       grid_size="4x4", theme=theme, created_at=datetime(2024, 5, 16))
+
+
+def test_names_are_stored_once(session: Session):
+    """Test that repeated names share one lookup row."""
+    insert_records(session, [make_score("Alice"), make_score("Alice"), make_score("Bob", "emojis")])
+    session.commit()
+
+    assert session.exec(select(Player.name).order_by(Player.name)).all() == ["Alice", "Bob"]
+    assert set(session.exec(select(Theme.name)).all()) == {"numbers", "emojis"}
+    assert len(set(session.exec(select(Score.player_id)).all())) == 2
+    assert compute_statistics_from_sql(session)["total_players"] == 2
+
+
+def test_ids_cached_after_commit_only(session: Session):
+    """Test that ids created by a rolled back transaction are not cached."""
+    insert_records(session, [make_score("Alice", "animals")])
+    assert players.cached("Alice") is None
+    session.rollback()
+    assert players.cached("Alice") is None
+    assert session.exec(select(Player)).all() == []
+
+    insert_records(session, [make_score("Alice", "animals")])
+    session.commit()
+    alice = session.exec(select(Player).where(Player.name == "Alice")).one()
+    assert players.cached("Alice") == alice.id
+    assert themes.cached("animals") is not None
+
+
+def test_intern_cache_is_bounded():
+    """Test that the player cache evicts the least recently used names."""
+    table = InternTable(Player, max_size=2)
+    table.store({"a": 1, "b": 2})
+    assert table.cached("a") == 1
+    table.store({"c": 3})
+    assert table.cached("b") is None
+    assert table.cached("a") == 1
+    assert table.cached("c") == 3
+
+
+def test_get_record_returns_names(session: Session):
+    """Test that a saved score is read back with its names."""
+    record = make_score("Alice", "flags")
+    insert_records(session, [record])
+    session.commit()
+
+    saved = get_record(session, record.id)
+    assert (saved.player_name, saved.grid_size, saved.theme) == ("Alice", "4x4", "flags")
+    assert get_record(session, record.id + 1) is None
+
+
+def test_migrate_legacy_score_table(tmp_path):
+    """Test that inline names are moved to lookup tables with ids kept."""
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript(
+        """
+        CREATE TABLE score (
+            id INTEGER PRIMARY KEY, player_name VARCHAR(100), score INTEGER, moves INTEGER,
+            time INTEGER, grid_size VARCHAR(10), theme VARCHAR(20), created_at DATETIME
+        );
+        CREATE INDEX ix_score_ranking ON score (score, time, moves);
+        CREATE TABLE compactedplayer (player_name VARCHAR(100) PRIMARY KEY);
+        INSERT INTO score VALUES (3, 'Alice', 12, 30, 90, '4x4', 'numbers', '2024-05-16 10:00:00.000000');
+        INSERT INTO score VALUES (7, 'Bob', 8, 40, 120, '6x6', 'flags', '2024-05-16 11:00:00.000000');
+        INSERT INTO score VALUES (9, 'Alice', 15, 25, 70, '4x4', 'flags', '2024-05-16 12:00:00.000000');
+        INSERT INTO compactedplayer VALUES ('Carol');
+        """
+    )
+    legacy.close()
+    engine = create_engine(f"sqlite:///{path}")
+
+    assert migrate_score_dimensions(engine) is True
+    assert migrate_score_dimensions(engine) is False
+    SQLModel.metadata.create_all(engine)
+
+    tables = inspect(engine).get_table_names()
+    assert "score_legacy" not in tables and "compactedplayer" not in tables
+    with Session(engine) as session:
+        assert set(session.exec(select(Player.name)).all()) == {"Alice", "Bob", "Carol"}
+        bob = get_record(session, 7)
+        assert (bob.player_name, bob.score, bob.grid_size, bob.theme) == ("Bob", 8, "6x6", "flags")
+        assert session.exec(select(Score.id).order_by(Score.id)).all() == [3, 7, 9]
+        assert compute_statistics_from_sql(session)["total_players"] == 3
+    engine.dispose()
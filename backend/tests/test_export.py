@@ -0,0 +1,59 @@
+"""Tests for the streaming scores export."""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.export import export_statement, iter_export
+from app.crud import insert_records
+from app.models import ScoreRecord
+
+
+def add_scores(session: Session) -> None:
+    """Insert scores spread over grids, themes and days."""
+    insert_records(session, [
+        ScoreRecord(player_name=f"P{i}", score=i, moves=20, time=60 + i,
+                    grid_size="4x4" if i % 2 else "6x6", theme="numbers" if i % 3 else "animals",
+                    created_at=datetime(2024, 1, 1 + i))
+        for i in range(12)
+    ])
+    session.commit()
+
+
+def test_export_ndjson(client: TestClient, session: Session):
+    """Test NDJSON export with filters."""
+    add_scores(session)
+    response = client.get("/api/scores/export?format=ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["player_name"] for row in rows] == [f"P{i}" for i in range(12)]
+    assert rows[0]["created_at"] == "2024-01-01T00:00:00"
+
+    response = client.get(
+        "/api/scores/export?grid_size=4x4&theme=numbers&since=2024-01-02T00:00:00&until=2024-01-10T00:00:00"
+    )
+    assert [json.loads(line)["player_name"] for line in response.text.splitlines()] == ["P1", "P5", "P7"]
+
+
+def test_export_csv(client: TestClient, session: Session):
+    """Test CSV export."""
+    add_scores(session)
+    response = client.get("/api/scores/export?format=csv&theme=animals")
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["player_name"] for row in rows] == ["P0", "P3", "P6", "P9"]
+    assert rows[1]["score"] == "3"
+
+    assert client.get("/api/scores/export?format=xml").status_code == 422
+
+
+def test_export_streams_in_chunks(session: Session):
+    """Test that rows are yielded one chunk at a time."""
+    add_scores(session)
+    chunks = list(iter_export(session.get_bind(), "ndjson", export_statement(), chunk_size=5))
+    assert [chunk.count(b"\n") for chunk in chunks] == [5, 5, 2]
@@ -0,0 +1,85 @@
+"""Tests for score histograms and percentiles."""
+
+import warnings
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.histograms import bucket_for, ensure_histograms, load_histogram, rebuild_histograms
+from app.crud import insert_records
+from app.models import ScoreHistogram, ScoreRecord
+
+
+def post_scores(client: TestClient, times):
+    """Create one 4x4 score per time value."""
+    for i, time in enumerate(times):
+        client.post(
+            "/api/scores",
+            json={"player_name": f"P{i}", "score": 8, "moves": 20 + i, "time": time,
+                  "grid_size": "4x4", "theme": "numbers"},
+        )
+
+
+def test_histograms_updated_on_insert(client: TestClient, session: Session):
+    """Test that single and batch inserts update the histogram table."""
+    post_scores(client, [12, 14, 31])
+    client.post(
+        "/api/scores/batch",
+        json=[{"player_name": "B", "score": 8, "moves": 20, "time": 13,
+               "grid_size": "4x4", "theme": "flags"}],
+    )
+
+    histogram = load_histogram(session, "time", "4x4")
+    assert histogram == {bucket_for("time", 12): 3, bucket_for("time", 31): 1}
+    assert load_histogram(session, "time", "4x4", "flags") == {bucket_for("time", 13): 1}
+
+
+def test_percentile_endpoint(client: TestClient):
+    """Test that faster times beat a larger share of games."""
+    post_scores(client, [30, 60, 90, 120])
+
+    with warnings.catch_warnings():
+        # Fields must be serialized as MetricPercentile, not as plain dicts
+        warnings.simplefilter("error")
+        response = client.get("/api/scores/percentiles?grid_size=4x4&theme=numbers&time=45&moves=20")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 4
+    assert data["time"]["percentile"] == 75.0  # beats 60, 90 and 120
+    assert data["time"]["bucket_start"] == 45
+    assert data["moves"]["percentile"] == 87.5  # beats 3, ties with 1
+    assert data["score"] is None
+
+
+def test_distribution_endpoint(client: TestClient):
+    """Test the distribution of a metric."""
+    post_scores(client, [30, 31, 60])
+
+    data = client.get("/api/scores/distribution?grid_size=4x4&metric=time").json()
+    assert data["total"] == 3
+    assert data["buckets"] == [{"start": 30, "end": 35, "count": 2}, {"start": 60, "end": 65, "count": 1}]
+
+    assert client.get("/api/scores/distribution?grid_size=4x4&metric=bogus").status_code == 422
+
+
+def test_rebuild_histograms(session: Session):
+    """Test rebuilding the histograms from the scores table in chunks."""
+    insert_records(session, [
+        ScoreRecord(player_name="P", score=i % 3, moves=10, time=i, grid_size="6x6", theme="dogs")
+        for i in range(25)
+    ])
+    session.add(ScoreHistogram(grid_size="6x6", theme="dogs", metric="score", bucket=99, count=7))
+    session.commit()
+
+    assert rebuild_histograms(session, chunk_size=4) == 25
+    assert load_histogram(session, "score", "6x6") == {0: 9, 1: 8, 2: 8}
+    assert sum(row.count for row in session.exec(select(ScoreHistogram))) == 75
+
+
+def test_ensure_histograms_builds_missing_table(session: Session):
+    """Test that databases without histograms get them built once."""
+    insert_records(session, [ScoreRecord(player_name="P", score=1, moves=10, time=5, grid_size="4x4", theme="numbers")])
+    session.commit()
+
+    ensure_histograms(session)
+    assert load_histogram(session, "score", "4x4") == {1: 1}
@@ -0,0 +1,64 @@
+"""Tests for the shared upstream HTTP client."""
+
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.http_client import UpstreamClient, upstream_client
+from app.themes import get_theme_data
+
+
+async def test_client_is_shared_until_closed():
+    """Test that every caller gets the same client until close."""
+    client = UpstreamClient()
+    first = client.start()
+    assert client.get() is first
+    assert client.start() is first
+    assert client.metrics()["connections"] == {"open": 0, "idle": 0, "active": 0}
+
+    await client.close()
+    assert not client.running
+    assert first.is_closed
+    assert client.get() is not first
+    await client.close()
+
+
+async def test_metrics_count_requests_in_flight():
+    """Test that a request is in flight until its body is closed."""
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await release.wait()
+        return httpx.Response(200, json=[])
+
+    client = UpstreamClient()
+    http = client.start(transport=httpx.MockTransport(handler))
+    pending = [asyncio.create_task(http.get("https://upstream.example/")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert client.metrics()["in_flight"] == 3
+
+    release.set()
+    await asyncio.gather(*pending)
+    metrics = client.metrics()
+    assert (metrics["requests"], metrics["in_flight"], metrics["peak_in_flight"]) == (3, 0, 3)
+    await client.close()
+
+
+async def test_theme_providers_use_shared_client():
+    """Test that theme loads go through the application client."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        flags = [{"name": {"common": f"Country {i}"}, "flags": {"png": f"https://flags.example/{i}.png"}}
+                 for i in range(30)]
+        return httpx.Response(200, json=flags)
+
+    upstream_client.start(transport=httpx.MockTransport(handler))
+    items = await get_theme_data("flags", 5)
+
+    assert len(items) == 5
+    assert upstream_client.metrics()["requests"] == 1
+
+
+def test_metrics_expose_upstream_pool(client: TestClient):
+    """Test that pool usage is part of /api/metrics."""
+    assert "upstream_http" in client.get("/api/metrics").json()
@@ -0,0 +1,194 @@
+"""Tests for the theme image proxy and its content-addressed cache."""
+
+from unittest.mock import AsyncMock, patch
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.http_client import upstream_client
+from app.image_proxy import ImageCache, ImageProxyError, RangeNotSatisfiable, parse_range
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(56))
+
+
+class ImageUpstream:
+    """Mock CDN: /same/* all return PNG, other paths return their own bytes."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if request.url.path.endswith(".html"):
+            return httpx.Response(200, text="<html></html>", headers={"content-type": "text/html"})
+        if request.url.path.startswith("/missing"):
+            return httpx.Response(404)
+        if request.url.path.startswith("/redirect/"):
+            # /redirect/<location> answers a redirect to that URL (relative or absolute)
+            location = request.url.path[len("/redirect/"):].replace("~", "/")
+            return httpx.Response(302, headers={"location": location})
+        body = PNG if request.url.path.startswith("/same/") else request.url.path.encode() * 10
+        return httpx.Response(200, content=body, headers={"content-type": "image/png"})
+
+
+@pytest.fixture(name="cache")
+def cache_fixture(tmp_path, monkeypatch) -> ImageCache:
+    """Empty image cache in a temporary directory."""
+    cache = ImageCache(str(tmp_path / "images"), max_bytes=10_000)
+    monkeypatch.setattr("app.main.image_cache", cache)
+    return cache
+
+
+@pytest.fixture(name="upstream")
+def upstream_fixture() -> ImageUpstream:
+    """Route the shared HTTP client to the mock CDN."""
+    upstream = ImageUpstream()
+    upstream_client.start(transport=httpx.MockTransport(upstream))
+    return upstream
+
+
+def image_url(path: str) -> str:
+    """Allowed image URL on the mock CDN."""
+    return f"https://images.dog.ceo{path}"
+
+
+def test_parse_range():
+    """Test single byte range parsing."""
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    assert parse_range("bytes=9-3", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+
+
+def test_image_fetched_once(client: TestClient, cache: ImageCache, upstream: ImageUpstream):
+    """Test that the second request is served from the disk cache."""
+    first = client.get("/api/images", params={"url": image_url("/same/a.png")})
+    second = client.get("/api/images", params={"url": image_url("/same/a.png")})
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content == PNG
+    assert first.headers["content-type"] == "image/png"
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == "public, max-age=86400"
+    assert upstream.requests == 1
+    assert cache.metrics()["hits"] == 1
+
+
+def test_not_modified_and_ranges(client: TestClient, cache: ImageCache, upstream: ImageUpstream):
+    """Test conditional and partial requests."""
+    url = image_url("/same/a.png")
+    etag = client.get("/api/images", params={"url": url}).headers["etag"]
+
+    assert client.get("/api/images", params={"url": url}, headers={"If-None-Match": etag}).status_code == 304
+
+    partial = client.get("/api/images", params={"url": url}, headers={"Range": "bytes=2-5"})
+    assert partial.status_code == 206
+    assert partial.content == PNG[2:6]
+    assert partial.headers["content-range"] == f"bytes 2-5/{len(PNG)}"
+
+    suffix = client.get("/api/images", params={"url": url}, headers={"Range": "bytes=-4"})
+    assert suffix.content == PNG[-4:]
+
+    outside = client.get("/api/images", params={"url": url}, headers={"Range": f"bytes={len(PNG)}-"})
+    assert outside.status_code == 416
+    assert outside.headers["content-range"] == f"bytes */{len(PNG)}"
+
+    # A changed representation ignores the range
+    stale = client.get("/api/images", params={"url": url}, headers={"Range": "bytes=2-5", "If-Range": '"old"'})
+    assert stale.status_code == 200
+    assert stale.content == PNG
+
+
+def test_rejected_urls(client: TestClient, cache: ImageCache, upstream: ImageUpstream):
+    """Test that only allowed HTTPS hosts serving images are proxied."""
+    for url in ("https://example.com/a.png", "http://images.dog.ceo/a.png", "file:///etc/passwd"):
+        assert client.get("/api/images", params={"url": url}).status_code == 400
+    assert upstream.requests == 0
+
+    assert client.get("/api/images", params={"url": image_url("/page.html")}).status_code == 502
+    assert client.get("/api/images", params={"url": image_url("/missing.png")}).status_code == 502
+    assert cache.metrics()["images"] == 0
+
+
+async def test_redirects_stay_on_allowed_hosts(cache: ImageCache, upstream: ImageUpstream):
+    """Test that redirects are checked before being followed, and limited."""
+    image = await cache.fetch(image_url("/redirect/~same~a.png"))
+    assert image.path.read_bytes() == PNG
+    assert upstream.requests == 2
+
+    upstream.requests = 0
+    with pytest.raises(ImageProxyError, match="not allowed"):
+        await cache.fetch(image_url("/redirect/http:~~169.254.169.254~latest~meta-data"))
+    # The internal address was never requested
+    assert upstream.requests == 1
+
+    loop = "/redirect/~redirect~~redirect~~redirect~~redirect~~same~b.png"
+    with pytest.raises(ImageProxyError, match="Too many redirects"):
+        await cache.fetch(image_url(loop))
+
+
+async def test_identical_images_stored_once(cache: ImageCache, upstream: ImageUpstream):
+    """Test that URLs with the same content share one file."""
+    first = await cache.fetch(image_url("/same/a.png"))
+    second = await cache.fetch(image_url("/same/b.png"))
+
+    assert first.path == second.path
+    assert cache.metrics()["images"] == 1
+    assert cache.metrics()["urls"] == 2
+    assert cache.metrics()["bytes"] == len(PNG)
+
+
+async def test_least_recently_used_evicted(cache: ImageCache, upstream: ImageUpstream):
+    """Test that the size budget evicts the least recently used image."""
+    cache.max_bytes = 300
+    first = await cache.fetch(image_url("/first.png"))   # 110 bytes
+    await cache.fetch(image_url("/second.png"))          # 120 bytes
+    assert cache.lookup(image_url("/first.png")) is not None
+    await cache.fetch(image_url("/third.png"))           # 110 bytes
+
+    assert cache.lookup(image_url("/second.png")) is None
+    assert cache.lookup(image_url("/first.png")) is not None
+    assert first.path.exists()
+    assert cache.metrics()["evictions"] == 1
+    assert cache.metrics()["bytes"] <= 300
+
+
+async def test_cache_reloaded_from_disk(cache: ImageCache, upstream: ImageUpstream):
+    """Test that the index survives a restart and orphan files are removed."""
+    image = await cache.fetch(image_url("/same/a.png"))
+    orphan = cache.object_path("ab" * 32)
+    orphan.parent.mkdir(parents=True, exist_ok=True)
+    orphan.write_bytes(b"partial")
+
+    reloaded = ImageCache(str(cache.directory))
+    assert reloaded.load() == 1
+    assert reloaded.lookup(image_url("/same/a.png")).digest == image.digest
+    assert not orphan.exists()
+
+
+@patch("app.main.get_theme_data", new_callable=AsyncMock)
+def test_theme_images_rewritten(mock_get_theme_data: AsyncMock, client: TestClient):
+    """Test that proxy_images points allowed image URLs at the proxy."""
+    items = [
+        {"id": 1, "name": "Beagle", "image": image_url("/breeds/beagle/1.jpg")},
+        {"id": 2, "name": "Elsewhere", "image": "https://example.com/2.jpg"},
+        {"id": 3, "name": "Apple", "emoji": "🍎"},
+    ]
+    mock_get_theme_data.return_value = items
+
+    data = client.get("/api/themes/dogs?proxy_images=true").json()["data"]
+    proxied = urlsplit(data[0]["image"])
+    assert (proxied.scheme, proxied.netloc, proxied.path) == ("http", "testserver", "/api/images")
+    assert parse_qs(proxied.query)["url"] == [items[0]["image"]]
+    assert data[1:] == items[1:]
+    # The provider's items are left untouched
+    assert items[0]["image"] == image_url("/breeds/beagle/1.jpg")
+
+    assert client.get("/api/themes/dogs").json()["data"] == items
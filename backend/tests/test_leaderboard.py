@@ -0,0 +1,122 @@
+"""Tests for the in-memory leaderboard."""
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.leaderboard import Leaderboard, leaderboard
+from app.crud import insert_records
+from app.models import ScoreRecord
+
+
+def make_score(score_id: int, score: int, time: int, moves: int) -> ScoreRecord:
+    """Build a saved-looking score record."""
+    return ScoreRecord(
+        id=score_id,
+        player_name=f"Player {score_id}",
+        score=score,
+        moves=moves,
+        time=time,
+        grid_size="4x4",
+        theme="numbers",
+    )
+
+
+def test_offer_keeps_only_top_k():
+    """Test that the leaderboard keeps the best K entries in order."""
+    board = Leaderboard(size=2)
+    board.rebuild([])
+    assert board.offer(make_score(1, 8, 100, 20))
+    assert board.offer(make_score(2, 10, 120, 20))
+    assert board.offer(make_score(3, 10, 90, 20))
+    assert not board.offer(make_score(4, 5, 10, 10))
+
+    top = board.top(2)
+    assert [entry["id"] for entry in top] == [3, 2]
+
+
+def test_top_returns_none_when_not_held_in_memory():
+    """Test that callers fall back to SQL when the leaderboard cannot answer."""
+    board = Leaderboard(size=5)
+    assert board.top(3) is None
+    board.rebuild([])
+    assert board.top(6) is None
+    assert board.top(5) == []
+
+
+def test_create_score_updates_leaderboard(client: TestClient, session: Session):
+    """Test that new scores are served from memory and match the SQL order."""
+    scores = [
+        {"player_name": "A", "score": 10, "moves": 15, "time": 100, "grid_size": "4x4", "theme": "numbers"},
+        {"player_name": "B", "score": 10, "moves": 12, "time": 100, "grid_size": "4x4", "theme": "numbers"},
+        {"player_name": "C", "score": 12, "moves": 18, "time": 90, "grid_size": "6x6", "theme": "pokemon"},
+    ]
+    for score in scores:
+        client.post("/api/scores", json=score)
+
+    assert [entry["player_name"] for entry in leaderboard.top(3)] == ["C", "B", "A"]
+    assert leaderboard.check_consistency(session) == []
+
+    response = client.get("/api/scores/top?limit=3")
+    assert [row["player_name"] for row in response.json()] == ["C", "B", "A"]
+    assert [row["rank"] for row in response.json()] == [1, 2, 3]
+
+
+def test_check_consistency_reports_drift(client: TestClient, session: Session):
+    """Test that rows written behind the leaderboard's back are detected."""
+    insert_records(session, [ScoreRecord(player_name="X", score=20, moves=1, time=1, grid_size="4x4", theme="numbers")])
+    session.commit()
+
+    assert leaderboard.check_consistency(session) != []
+    leaderboard.load(session)
+    assert leaderboard.check_consistency(session) == []
+
+
+def test_leaderboard_pages_follow_sql_order(client: TestClient):
+    """Test that walking cursor pages yields the full ordering with continuous ranks."""
+    for i in range(7):
+        client.post(
+            "/api/scores",
+            json={"player_name": f"P{i}", "score": i % 3, "moves": 10, "time": 50 + i % 2,
+                  "grid_size": "4x4", "theme": "numbers"},
+        )
+    full = client.get("/api/scores/top?limit=7").json()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/scores/leaderboard", params=params).json()
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [row["id"] for row in seen] == [row["id"] for row in full]
+    assert [row["rank"] for row in seen] == list(range(1, 8))
+
+
+def test_leaderboard_filters_by_grid_and_theme(client: TestClient):
+    """Test filtering the leaderboard by grid size and theme."""
+    combos = [("4x4", "numbers"), ("6x6", "numbers"), ("4x4", "flags"), ("6x6", "flags")]
+    for grid_size, theme in combos:
+        client.post(
+            "/api/scores",
+            json={"player_name": "P", "score": 5, "moves": 10, "time": 50,
+                  "grid_size": grid_size, "theme": theme},
+        )
+
+    page = client.get("/api/scores/leaderboard?grid_size=6x6").json()
+    assert {row["theme"] for row in page["items"]} == {"numbers", "flags"}
+    assert {row["grid_size"] for row in page["items"]} == {"6x6"}
+
+    page = client.get("/api/scores/leaderboard?grid_size=4x4&theme=flags").json()
+    assert len(page["items"]) == 1
+    assert page["next_cursor"] is None
+
+
+def test_leaderboard_invalid_cursor(client: TestClient):
+    """Test that a malformed cursor is rejected."""
+    response = client.get("/api/scores/leaderboard?cursor=not-a-cursor")
+    assert response.status_code == 400
@@ -2,12 +2,12 @@
 
 import pytest
 from datetime import datetime
-from app.models import Score
+from app.models import Score, ScoreRecord
 
 
 def test_score_model_creation():
     """Test creating a Score model instance."""
-    score = Score(
+    score = ScoreRecord(
         player_name="Test Player",
         score=8,
         moves=20,
@@ -25,10 +25,19 @@ def test_score_model_creation():
     assert isinstance(score.created_at, datetime) or score.created_at is None
 
 
+def test_score_table_references_lookup_tables():
+    """Test that the scores table stores ids instead of names."""
+    score = Score(player_id=1, score=8, moves=20, time=120, grid_size_id=2, theme_id=3)
+    assert (score.player_id, score.grid_size_id, score.theme_id) == (1, 2, 3)
+    assert not hasattr(score, "player_name")
+    foreign_keys = {key.parent.name: key.target_fullname for key in Score.__table__.foreign_keys}
+    assert foreign_keys == {"player_id": "player.id", "grid_size_id": "gridsize.id", "theme_id": "theme.id"}
+
+
 def test_score_model_validation():
     """Test Score model field validation."""
     # Valid score
-    score = Score(
+    score = ScoreRecord(
         player_name="Test",
         score=0,  # Minimum valid
         moves=0,
@@ -40,5 +49,3 @@ def test_score_model_validation():
 
     # Test that negative values would be rejected by Pydantic
     # (This is handled at the schema level, not model level)
-
-
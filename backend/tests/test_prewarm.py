@@ -0,0 +1,84 @@
+"""Tests for the play-frequency driven theme prewarmer."""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.crud import save_scores
+from app.decks import deck_pool
+from app.http_client import upstream_client
+from app.models import Score
+from app.prewarm import ThemePrewarmer, play_frequency
+from app.schemas import ScoreCreate
+from app.theme_cache import theme_cache
+
+
+def play(session: Session, counts: dict) -> None:
+    """Save `count` scores per (theme, grid size)."""
+    save_scores(session, [
+        ScoreCreate(player_name="Ann", score=10, moves=20, time=30, grid_size=grid_size, theme=theme)
+        for (theme, grid_size), count in counts.items()
+        for _ in range(count)
+    ])
+
+
+def test_play_frequency(session: Session, client: TestClient):
+    """Test that pairs are counted from recent scores, most played first."""
+    play(session, {("flags", "4x4"): 2, ("pokemon", "6x6"): 3, ("dogs", "4x4"): 4})
+    session.exec(update(Score).where(Score.id > 5).values(created_at=datetime.utcnow() - timedelta(days=30)))
+    session.commit()
+
+    assert play_frequency(session) == [("dogs", "4x4", 4), ("pokemon", "6x6", 3), ("flags", "4x4", 2)]
+    since = datetime.utcnow() - timedelta(days=7)
+    assert play_frequency(session, since) == [("pokemon", "6x6", 3), ("flags", "4x4", 2)]
+    assert client.get("/api/metrics").json()["theme_prewarm"]["runs"] == 0
+
+
+def pokemon_upstream(requests: list) -> httpx.MockTransport:
+    """Mock PokeAPI recording the requested ids."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        pokemon_id = int(request.url.path.rstrip("/").rsplit("/", 1)[-1])
+        requests.append(pokemon_id)
+        return httpx.Response(200, json={"name": f"p{pokemon_id}", "sprites": {"front_default": f"https://sprites.example/{pokemon_id}.png"}})
+
+    return httpx.MockTransport(handler)
+
+
+async def test_popular_pairs_prewarmed_within_budget(session: Session):
+    """Test that decks of the most played pairs are pooled, then items prefetched with the rest of the budget."""
+    requests = []
+    upstream_client.start(transport=pokemon_upstream(requests))
+    theme_cache.put("flags", None, [{"name": f"C{i}", "image": f"https://flags.example/{i}.png"} for i in range(40)], ttl=3600)
+    # Unknown themes and grids without pairs are ignored
+    play(session, {("pokemon", "6x6"): 3, ("flags", "5x4"): 2, ("ghosts", "4x4"): 4, ("numbers", "3x3"): 5})
+
+    prewarmer = ThemePrewarmer(budget=30)
+    with patch.object(deck_pool, "size", 1):
+        result = await prewarmer.run_once(session)
+
+    # One 6x6 Pokemon deck (18 requests), the flags deck from cache, 12 Pokemon prefetched
+    assert result == {"decks": 2, "prefetched": 12, "requests": 30}
+    assert len(requests) == len(set(requests)) == 30
+    assert [(p["theme"], p["grid_size"]) for p in prewarmer.metrics()["popular"]] == [("pokemon", "6x6"), ("flags", "5x4")]
+    ready = deck_pool.metrics()["ready"]
+    assert ready["pokemon:6x6"] == ready["flags:5x4"] == 1
+
+
+async def test_budget_stops_prewarming(session: Session):
+    """Test that pairs past the request budget wait for the next run."""
+    requests = []
+    upstream_client.start(transport=pokemon_upstream(requests))
+    play(session, {("pokemon", "6x6"): 3, ("pokemon", "4x4"): 2})
+
+    prewarmer = ThemePrewarmer(budget=10)
+    with patch.object(deck_pool, "size", 1):
+        result = await prewarmer.run_once(session)
+
+    # The budget is checked between pairs: the first deck may exceed it
+    assert result == {"decks": 1, "prefetched": 0, "requests": 18}
+    ready = deck_pool.metrics()["ready"]
+    assert ready["pokemon:6x6"] == 1 and ready["pokemon:4x4"] == 0
@@ -0,0 +1,97 @@
+"""Tests for score rank lookups."""
+
+import random
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.ranking import FenwickTree, RankIndex, rank_from_sql, ranking
+
+
+def test_fenwick_tree_compresses_values():
+    """Test prefix counts over sparse, huge values and buffered inserts."""
+    tree = FenwickTree()
+    for value in (0, 1, 1, 5, 300, 10**15):
+        tree.add(value)
+    assert tree.count_at_most(-1) == 0
+    assert tree.count_at_most(0) == 1
+    assert tree.count_at_most(1) == 3
+    assert tree.count_at_most(299) == 4
+    assert tree.count_at_most(10**12) == 5
+    assert tree.count_at_most(10**15) == 6
+    assert tree.total == 6
+
+    rng = random.Random(3)
+    values = [rng.randrange(10**9) for _ in range(2000)]
+    for value in values:
+        tree.add(value, 2)
+    # Memory follows the distinct values, not their magnitude
+    assert len(tree._tree) <= len(set(values)) + 7
+    for probe in values[:50]:
+        expected = 2 * sum(1 for other in values if other <= probe) + sum(1 for other in (0, 1, 1, 5, 300) if other <= probe)
+        assert tree.count_at_most(probe) == expected
+
+
+def test_rank_index_matches_brute_force():
+    """Test count_better against a direct count."""
+    rng = random.Random(7)
+    results = [(rng.randint(0, 10), rng.randint(0, 50), rng.randint(0, 20)) for _ in range(500)]
+    index = RankIndex()
+    for result in results:
+        index.add(*result)
+
+    def key(result):
+        score, time, moves = result
+        return (-score, time, moves)
+
+    for probe in results[:50] + [(11, 0, 0), (0, 99, 99)]:
+        expected = sum(1 for other in results if key(other) < key(probe))
+        assert index.count_better(*probe) == expected
+
+
+def test_create_score_returns_ranks(client: TestClient):
+    """Test that created scores report their global and per-grid rank."""
+    payloads = [
+        ("A", 10, 100, "4x4"),
+        ("B", 12, 90, "6x6"),
+        ("C", 10, 80, "4x4"),
+    ]
+    responses = []
+    for name, score, time, grid_size in payloads:
+        responses.append(
+            client.post(
+                "/api/scores",
+                json={"player_name": name, "score": score, "moves": 20, "time": time,
+                      "grid_size": grid_size, "theme": "numbers"},
+            ).json()
+        )
+
+    assert responses[2]["global_rank"] == 2  # behind B
+    assert responses[2]["grid_rank"] == 1  # best on 4x4
+
+    data = client.get(f"/api/scores/{responses[0]['id']}/rank").json()
+    assert data == {
+        "id": responses[0]["id"],
+        "grid_size": "4x4",
+        "global_rank": 3,
+        "global_total": 3,
+        "grid_rank": 2,
+        "grid_total": 2,
+    }
+
+
+def test_rank_sql_fallback_matches_index(client: TestClient, session: Session):
+    """Test that the SQL fallback agrees with the in-memory index."""
+    for i in range(20):
+        client.post(
+            "/api/scores",
+            json={"player_name": "P", "score": i % 4, "moves": i % 3, "time": i % 5,
+                  "grid_size": "4x4" if i % 2 else "6x6", "theme": "numbers"},
+        )
+    for probe in [(2, 3, 1), (0, 0, 0), (3, 4, 2)]:
+        assert ranking.rank("4x4", *probe) == rank_from_sql(session, "4x4", *probe)
+
+
+def test_rank_unknown_score(client: TestClient):
+    """Test the rank of a missing score."""
+    assert client.get("/api/scores/999/rank").status_code == 404
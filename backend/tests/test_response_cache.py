@@ -0,0 +1,56 @@
+"""Tests for the versioned response cache."""
+
+from fastapi.testclient import TestClient
+
+from app.response_cache import ResponseCache, etag_matches
+
+SCORE = {"player_name": "A", "score": 10, "moves": 20, "time": 60, "grid_size": "4x4", "theme": "numbers"}
+
+
+def test_etag_matches():
+    """Test If-None-Match parsing."""
+    assert etag_matches('"1-ab"', '"1-ab"')
+    assert etag_matches('"0-cd", W/"1-ab"', '"1-ab"')
+    assert etag_matches("*", '"1-ab"')
+    assert not etag_matches('"1-cd"', '"1-ab"')
+    assert not etag_matches(None, '"1-ab"')
+
+
+def test_stale_body_is_not_stored():
+    """Test that a body built before a bump is served but not cached."""
+    cache = ResponseCache()
+    version = cache.version
+    cache.bump()
+    entry = cache.put("key", b"[]", version)
+    assert entry.body == b"[]"
+    assert cache.get("key") is None
+
+    cache.put("key", b"[1]", cache.version)
+    assert cache.get("key").body == b"[1]"
+    cache.bump()
+    assert cache.get("key") is None
+
+
+def test_conditional_get(client: TestClient):
+    """Test ETags, 304 answers and invalidation on new scores."""
+    client.post("/api/scores", json=SCORE)
+
+    for path in ("/api/scores/top", "/api/scores/statistics"):
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        cached = client.get(path, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+    top_etag = client.get("/api/scores/top").headers["etag"]
+    client.post("/api/scores", json={**SCORE, "player_name": "B", "score": 12})
+    fresh = client.get("/api/scores/top", headers={"If-None-Match": top_etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != top_etag
+    assert [row["player_name"] for row in fresh.json()] == ["B", "A"]
+
+    metrics = client.get("/api/metrics").json()["response_cache"]
+    assert metrics["hits"] >= 3
@@ -0,0 +1,196 @@
+"""Tests for period leaderboards and score retention."""
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.crud import insert_records, save_scores
+from app.leaderboard import leaderboard, load_top_scores
+from app.models import CompactedScore, LeaderboardRollup, Score, ScoreRecord
+from app.ranking import rank_from_sql, ranking
+from app.rollups import compact_scores, period_start, rebuild_rollups, record_rollups, top_rollup
+from app.schemas import ScoreCreate
+from app.stats import compute_statistics_from_sql, statistics
+
+
+def make_score(name: str, score: int, time: int, created_at: datetime, grid_size: str = "4x4") -> ScoreRecord:
+    """Build an unsaved score."""
+    return ScoreRecord(player_name=name, score=score, moves=20, time=time,
+                 grid_size=grid_size, theme="numbers", created_at=created_at)
+
+
+def add_scores(session: Session, scores) -> None:
+    """Insert scores and record them in the rollups."""
+    insert_records(session, scores)
+    record_rollups(session, scores)
+    session.commit()
+
+
+def test_period_start():
+    """Test that weeks start on Monday."""
+    moment = datetime(2024, 5, 16, 13, 0)  # Thursday
+    assert period_start("daily", moment).isoformat() == "2024-05-16"
+    assert period_start("weekly", moment).isoformat() == "2024-05-13"
+    assert period_start("alltime", moment).isoformat() == "1970-01-01"
+
+
+def test_rollups_keep_best_per_period(session: Session):
+    """Test that each period keeps only its best rows."""
+    today = datetime(2024, 5, 16, 12, 0)
+    yesterday = today - timedelta(days=1)
+    add_scores(session, [
+        make_score("A", 10, 50, yesterday),
+        make_score("B", 12, 60, today),
+        make_score("C", 8, 40, today),
+        make_score("D", 11, 30, today),
+    ])
+
+    daily = top_rollup(session, "daily", 10, moment=today)
+    assert [row.player_name for row in daily] == ["B", "D", "C"]
+    weekly = top_rollup(session, "weekly", 10, moment=today)
+    assert [row.player_name for row in weekly] == ["B", "D", "A", "C"]
+    assert [row.player_name for row in top_rollup(session, "daily", 10, moment=yesterday)] == ["A"]
+
+
+def test_rollups_trim_to_size(session: Session):
+    """Test that a full period replaces its worst row only with a better score."""
+    now = datetime(2024, 5, 16, 12, 0)
+    scores = [make_score(name, score, 60, now) for name, score in (("A", 5), ("B", 7), ("C", 1), ("D", 9))]
+    for score in scores:
+        insert_records(session, [score])
+        record_rollups(session, [score], size=2)
+    session.commit()
+
+    for period in ("daily", "weekly", "alltime"):
+        assert [row.player_name for row in top_rollup(session, period, 10, moment=now)] == ["D", "B"]
+
+
+def test_rollups_batch_uses_constant_queries(session: Session):
+    """Test that a batch reads and writes the rollups in a fixed number of statements."""
+    now = datetime(2024, 5, 16, 12, 0)
+    first = [make_score(f"A{i}", i, 60, now) for i in range(5)]
+    insert_records(session, first)
+    record_rollups(session, first, size=5)
+    batch = [make_score(f"B{i}", (i * 37) % 50, 60 + i, now) for i in range(200)]
+    insert_records(session, batch)
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        record_rollups(session, batch, size=5)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    session.commit()
+
+    assert len(statements) == 3  # select, delete, insert
+    best = sorted(first + batch, key=lambda score: (-score.score, score.time, score.moves, score.id))[:5]
+    for period in ("daily", "weekly", "alltime"):
+        assert [row.score_id for row in top_rollup(session, period, 10, moment=now)] == [score.id for score in best]
+
+
+def test_rebuild_rollups_matches_incremental(session: Session):
+    """Test that a rebuild gives the same rollups as incremental updates."""
+    now = datetime(2024, 5, 16, 12, 0)
+    add_scores(session, [make_score(f"P{i}", i % 7, 100 - i, now - timedelta(days=i % 9)) for i in range(40)])
+
+    def snapshot():
+        rows = session.exec(select(LeaderboardRollup)).all()
+        return sorted((row.period, row.period_start, row.score_id) for row in rows)
+
+    before = snapshot()
+    rebuild_rollups(session)
+    assert snapshot() == before
+
+
+def test_top_scores_period(client: TestClient):
+    """Test the period parameter of the top scores endpoint."""
+    for name, score in (("A", 10), ("B", 12)):
+        client.post(
+            "/api/scores",
+            json={"player_name": name, "score": score, "moves": 20, "time": 60,
+                  "grid_size": "4x4", "theme": "numbers"},
+        )
+
+    for period in ("daily", "weekly", "alltime"):
+        response = client.get(f"/api/scores/top?period={period}")
+        assert response.status_code == 200
+        assert [row["player_name"] for row in response.json()] == ["B", "A"]
+        assert response.json()[0]["rank"] == 1
+
+    assert client.get("/api/scores/top?period=monthly").status_code == 422
+
+
+def test_compaction_preserves_aggregates(session: Session):
+    """Test that compacted scores still count in stats, ranks and the leaderboard."""
+    now = datetime.utcnow()
+    old = now - timedelta(days=40)
+    add_scores(session, [
+        make_score("Old", 15, 30, old),
+        make_score("Old", 9, 70, old),
+        make_score("Older", 9, 70, old, grid_size="6x6"),
+    ])
+    save_scores(session, [
+        ScoreCreate(player_name="New", score=10, moves=20, time=50, grid_size="4x4", theme="numbers"),
+    ])
+    expected_stats = compute_statistics_from_sql(session)
+    expected_top = [score.player_name for score in load_top_scores(session, 10)]
+    expected_rank = rank_from_sql(session, "4x4", 9, 70, 20)
+
+    assert compact_scores(session, retention_days=30, now=now) == 3
+    assert len(session.exec(select(Score)).all()) == 1
+    assert sum(row.count for row in session.exec(select(CompactedScore))) == 3
+
+    assert compute_statistics_from_sql(session) == expected_stats
+    assert [score.player_name for score in load_top_scores(session, 10)] == expected_top
+    assert rank_from_sql(session, "4x4", 9, 70, 20) == expected_rank
+
+    try:
+        statistics.load(session)
+        ranking.load(session)
+        leaderboard.load(session)
+        assert statistics.diff_against_sql(session) == {}
+        assert ranking.rank("4x4", 9, 70, 20) == expected_rank
+        assert [entry["player_name"] for entry in leaderboard.top(10)] == expected_top
+    finally:
+        statistics.clear()
+        ranking.clear()
+        leaderboard.clear()
+
+
+def test_leaderboard_pages_include_compacted_scores(client: TestClient, session: Session):
+    """Test that paging the leaderboard after compaction matches the all-time top scores."""
+    now = datetime.utcnow()
+    old = now - timedelta(days=40)
+    add_scores(session, [
+        make_score("Old", 15, 30, old),
+        make_score("Old", 12, 40, old, grid_size="6x6"),
+        make_score("Older", 9, 70, old),
+        make_score("Oldest", 9, 70, old, grid_size="6x6"),
+    ])
+    add_scores(session, [make_score("New", 10, 50, now), make_score("Newer", 9, 60, now, grid_size="6x6")])
+    assert compact_scores(session, retention_days=30, now=now) == 4
+
+    def all_pages(**params):
+        ids, cursor = [], None
+        while True:
+            page = client.get("/api/scores/leaderboard", params={"limit": 2, **params, **({"cursor": cursor} if cursor else {})}).json()
+            ids += [item["id"] for item in page["items"]]
+            ranks = [item["rank"] for item in page["items"]]
+            assert ranks == list(range(len(ids) - len(ranks) + 1, len(ids) + 1))
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+
+    top = [score.id for score in load_top_scores(session, 10)]
+    assert len(top) == 6
+    assert all_pages() == top
+    expected_6x6 = [score.id for score in load_top_scores(session, 10) if score.grid_size == "6x6"]
+    assert all_pages(grid_size="6x6") == expected_6x6
+    assert len(expected_6x6) == 3
@@ -33,6 +33,15 @@ def test_score_create_invalid_negative():
         )
 
 
+@pytest.mark.parametrize("field", ["score", "moves", "time"])
+def test_score_create_invalid_too_large(field):
+    """Test ScoreCreate validation rejects values past the upper bounds."""
+    values = dict(player_name="Test", score=8, moves=20, time=120, grid_size="4x4", theme="numbers")
+    values[field] = 10**9
+    with pytest.raises(ValidationError):
+        ScoreCreate(**values)
+
+
 def test_score_create_missing_field():
     """Test ScoreCreate validation requires all fields."""
     with pytest.raises(ValidationError):
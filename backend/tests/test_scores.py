@@ -1,5 +1,7 @@
 """Tests for score endpoints."""
 
+from unittest.mock import patch
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -136,3 +138,39 @@ def test_get_statistics(client: TestClient):
 
 
 
+
+
+def test_create_scores_batch(client: TestClient):
+    """Test batch creation reports invalid items without aborting the batch."""
+    batch = [
+        {"player_name": "Player 1", "score": 10, "moves": 15, "time": 100, "grid_size": "4x4", "theme": "numbers"},
+        {"player_name": "Player 2", "score": -1, "moves": 15, "time": 100, "grid_size": "4x4", "theme": "numbers"},
+        {"player_name": "Player 3", "score": 12, "moves": 18, "time": 90, "grid_size": "6x6", "theme": "flags"},
+    ]
+    response = client.post("/api/scores/batch", json=batch)
+    assert response.status_code == 201
+    data = response.json()
+    assert len(data["ids"]) == 3
+    assert data["ids"][0] is not None
+    assert data["ids"][1] is None
+    assert data["ids"][2] is not None
+    assert [error["index"] for error in data["errors"]] == [1]
+
+    # Items that are not objects are reported the same way
+    response = client.post("/api/scores/batch", json=[5, None, "score", batch[0]])
+    assert response.status_code == 201
+    data = response.json()
+    assert data["ids"][:3] == [None, None, None] and data["ids"][3] is not None
+    assert [error["index"] for error in data["errors"]] == [0, 1, 2]
+    assert data["errors"][0]["errors"][0]["type"] == "model_type"
+
+    top = client.get("/api/scores/top").json()
+    assert [row["player_name"] for row in top] == ["Player 3", "Player 1", "Player 1"]
+    assert client.get("/api/scores/statistics").json()["total_participations"] == 3
+
+
+def test_create_scores_batch_too_large(client: TestClient):
+    """Test that oversized batches are rejected."""
+    with patch("app.main.SCORE_BATCH_MAX_SIZE", 1):
+        response = client.post("/api/scores/batch", json=[{}, {}])
+    assert response.status_code == 413
@@ -0,0 +1,44 @@
+"""Tests for the direct JSON encoding of score responses."""
+
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import serialization
+from app.models import ScoreRecord
+from app.schemas import TopScoreResponse
+from app.serialization import dumps, top_score_row
+
+
+def make_score() -> ScoreRecord:
+    """Build a score record."""
+    return ScoreRecord(id=3, player_name="Zoé", score=8, moves=20, time=100, grid_size="4x4",
+                 theme="numbers", created_at=datetime(2024, 1, 2, 3, 4, 5, 678))
+
+
+def test_matches_pydantic_encoding():
+    """Test that rows encode like TopScoreResponse, with and without orjson."""
+    score = make_score()
+    expected = json.loads(TopScoreResponse(**score.model_dump(), rank=1).model_dump_json())
+    row = top_score_row(score, 1)
+    assert row == top_score_row(score.model_dump(), 1)
+
+    assert json.loads(dumps([row])) == [expected]
+    with patch.object(serialization, "orjson", None):
+        assert json.loads(dumps([row])) == [expected]
+
+
+def test_score_endpoints_shape(client: TestClient):
+    """Test that the fast path keeps the documented response shapes."""
+    client.post(
+        "/api/scores",
+        json={"player_name": "A", "score": 10, "moves": 20, "time": 60, "grid_size": "4x4", "theme": "numbers"},
+    )
+
+    top = client.get("/api/scores/top").json()
+    assert set(top[0]) == set(TopScoreResponse.model_fields)
+    page = client.get("/api/scores/leaderboard?grid_size=4x4").json()
+    assert page["items"] == top and page["next_cursor"] is None
+    assert client.get("/api/scores/statistics").json()["average_score"] == 10.0
@@ -0,0 +1,103 @@
+"""Tests for columnar score snapshots."""
+
+import struct
+from collections import Counter
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from app.crud import insert_records
+from app.dimensions import select_records
+from app.histograms import load_histogram
+from app.models import Score, ScoreRecord
+from app.ranking import ranking
+from app.snapshot import ScoreSnapshot, restore_snapshot, warm_start, write_snapshot
+from app.stats import statistics
+
+
+def add_scores(session: Session, count: int, start: int = 0) -> None:
+    """Insert scores with repeated names and a non-ASCII one."""
+    insert_records(session, [
+        ScoreRecord(player_name="Zoé" if i % 3 == 0 else f"P{i % 4}", score=i % 9, moves=10 + i,
+                    time=30 + i, grid_size="4x4" if i % 2 else "6x6", theme="numbers",
+                    created_at=datetime(2024, 3, 1, 12, 0, i, 250))
+        for i in range(start, start + count)
+    ])
+    session.commit()
+
+
+def score_rows(session: Session):
+    """All scores as comparable dicts."""
+    return [row._asdict() for row in session.exec(select_records().order_by("id"))]
+
+
+def test_snapshot_round_trip(session: Session, tmp_path):
+    """Test that a snapshot maps back to the same rows and restores them."""
+    add_scores(session, 20)
+    path = tmp_path / "scores.snap"
+    assert write_snapshot(session, path, chunk_size=7) == 20
+
+    with ScoreSnapshot(path) as snapshot:
+        assert len(snapshot) == 20
+        assert snapshot.max_id == 20
+        rows = score_rows(session)
+        distinct = {row[column] for row in rows for column in ("player_name", "grid_size", "theme")}
+        assert sorted(snapshot.strings) == sorted(distinct)
+        assert list(snapshot.columns["score"]) == [i % 9 for i in range(20)]
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as restored:
+        assert restore_snapshot(restored, path, chunk_size=7) == 20
+        assert score_rows(restored) == score_rows(session)
+        assert load_histogram(restored, "score", "4x4") == dict(Counter(i % 9 for i in range(1, 20, 2)))
+        with pytest.raises(ValueError):
+            restore_snapshot(restored, path)
+
+
+def test_snapshot_keeps_64_bit_values(session: Session, tmp_path):
+    """Test that values past int32 (accepted by the database) are backed up and restored."""
+    insert_records(session, [ScoreRecord(player_name="Big", score=3_000_000_000, moves=2**40, time=2**33,
+                                         grid_size="4x4", theme="numbers")])
+    session.commit()
+    path = tmp_path / "scores.snap"
+    assert write_snapshot(session, path) == 1
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as restored:
+        restore_snapshot(restored, path)
+        assert score_rows(restored) == score_rows(session)
+
+
+def test_warm_start(session: Session, tmp_path):
+    """Test that aggregates warmed from a snapshot match a database load."""
+    add_scores(session, 30)
+    path = tmp_path / "scores.snap"
+    write_snapshot(session, path)
+    add_scores(session, 5, start=30)
+
+    try:
+        statistics.load(session)
+        ranking.load(session)
+        expected = (statistics.snapshot(), ranking.rank("4x4", 4, 40, 20))
+        statistics.clear()
+        ranking.clear()
+
+        assert warm_start(session, path)
+        assert (statistics.snapshot(), ranking.rank("4x4", 4, 40, 20)) == expected
+
+        session.execute(delete(Score).where(Score.id == 3))
+        session.commit()
+        assert not warm_start(session, path)
+
+        # A snapshot of an older format is ignored at startup, not fatal
+        old = tmp_path / "old.snap"
+        old.write_bytes(path.read_bytes()[:8] + struct.pack("<I", 1) + path.read_bytes()[12:])
+        assert not warm_start(session, old)
+    finally:
+        statistics.clear()
+        ranking.clear()
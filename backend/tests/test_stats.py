@@ -0,0 +1,63 @@
+"""Tests for the incremental statistics aggregator."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.crud import insert_records
+from app.models import ScoreRecord
+from app.stats import HyperLogLog, StatisticsAggregator, statistics
+
+
+def test_hyperloglog_estimate_is_close():
+    """Test that the HyperLogLog estimate stays within its error bound."""
+    sketch = HyperLogLog(precision=12)
+    for i in range(20000):
+        sketch.add(f"player-{i}")
+        sketch.add(f"player-{i}")
+    assert sketch.count() == pytest.approx(20000, rel=3 * sketch.relative_error)
+
+
+def test_hyperloglog_small_cardinality():
+    """Test that small cardinalities are counted almost exactly."""
+    sketch = HyperLogLog()
+    for name in ["a", "b", "c", "a"]:
+        sketch.add(name)
+    assert sketch.count() == 3
+
+
+def test_aggregator_rebuild_and_add():
+    """Test running sums, minimums and distinct players."""
+    aggregator = StatisticsAggregator(distinct_mode="exact")
+    aggregator.rebuild([(10, 100, 15, "A"), (8, 120, 20, "B")])
+    aggregator.add(ScoreRecord(player_name="A", score=12, moves=12, time=80, grid_size="4x4", theme="numbers"))
+
+    snapshot = aggregator.snapshot()
+    assert snapshot["total_participations"] == 3
+    assert snapshot["average_score"] == 10.0
+    assert snapshot["best_time"] == 80
+    assert snapshot["best_moves"] == 12
+    assert snapshot["total_players"] == 2
+
+
+def test_statistics_endpoint_served_from_memory(client: TestClient, session: Session):
+    """Test that created scores update the aggregator without drift."""
+    scores = [
+        {"player_name": "Player 1", "score": 10, "moves": 15, "time": 100, "grid_size": "4x4", "theme": "numbers"},
+        {"player_name": "Player 2", "score": 7, "moves": 21, "time": 130, "grid_size": "6x6", "theme": "flags"},
+    ]
+    for score in scores:
+        client.post("/api/scores", json=score)
+
+    assert statistics.diff_against_sql(session) == {}
+    response = client.get("/api/scores/statistics/drift")
+    assert response.json() == {"drift": {}}
+
+
+def test_statistics_drift_detected(client: TestClient, session: Session):
+    """Test that rows inserted outside the API show up as drift."""
+    insert_records(session, [ScoreRecord(player_name="Ghost", score=1, moves=1, time=1, grid_size="4x4", theme="numbers")])
+    session.commit()
+
+    drift = client.get("/api/scores/statistics/drift").json()["drift"]
+    assert drift["total_participations"] == {"memory": 0, "sql": 1}
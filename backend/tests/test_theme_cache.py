@@ -0,0 +1,119 @@
+"""Tests for the theme upstream cache."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.theme_cache import ThemeCache, theme_cache
+from app.themes import get_theme_data
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    """Test that an entry is a hit until its TTL elapses."""
+    clock = FakeClock()
+    cache = ThemeCache(max_entries=10, clock=clock, stale_seconds=0)
+    cache.put("flags", None, ["fr"], ttl=60)
+
+    clock.now = 59
+    assert cache.get("flags") == ["fr"]
+    clock.now = 60
+    assert cache.get("flags") is None
+    assert cache.metrics()["themes"]["flags"] == {"hits": 1, "stale": 0, "misses": 1}
+    assert cache.metrics()["entries"] == 0
+
+
+def test_expired_entries_stay_stale_for_a_while():
+    """Test that an expired entry is flagged stale until the stale window ends."""
+    clock = FakeClock()
+    cache = ThemeCache(max_entries=10, clock=clock, stale_seconds=30)
+    cache.put("flags", None, ["fr"], ttl=60)
+
+    assert cache.lookup("flags") == (["fr"], False)
+    clock.now = 60
+    assert cache.lookup("flags") == (["fr"], True)
+    assert cache.get("flags") is None
+    clock.now = 90
+    assert cache.lookup("flags") is None
+    assert cache.metrics()["themes"]["flags"] == {"hits": 1, "stale": 2, "misses": 1}
+
+    # Already past its TTL when stored, still within the stale window
+    cache.put("dogs", None, ["beagle"], ttl=-10)
+    assert cache.lookup("dogs") == (["beagle"], True)
+    cache.put("fruits", None, ["🍎"], ttl=-30)
+    assert cache.lookup("fruits") is None
+
+
+def test_least_recently_used_is_evicted():
+    """Test that the LRU entry goes first when the cache is full."""
+    cache = ThemeCache(max_entries=2)
+    cache.put("pokemon", 1, "a", ttl=60)
+    cache.put("pokemon", 2, "b", ttl=60)
+    cache.get("pokemon", 1)
+    cache.put("pokemon", 3, "c", ttl=60)
+
+    assert cache.get("pokemon", 2) is None
+    assert cache.get("pokemon", 1) == "a"
+    assert cache.get("pokemon", 3) == "c"
+    assert cache.metrics()["evictions"] == 1
+
+
+def country(i: int) -> dict:
+    """A catalog flag item."""
+    return {"name": f"Country {i}", "image": f"https://flags.example/{i}.png"}
+
+
+async def test_flags_catalog_fetched_once():
+    """Test that repeated requests sample the cached catalog."""
+    catalog = [country(i) for i in range(40)]
+    fetch = AsyncMock(return_value=catalog)
+    with patch.dict("app.themes.CATALOG_FETCHERS", flags=fetch):
+        first = await get_theme_data("flags", 18)
+        second = await get_theme_data("flags", 18)
+
+    assert fetch.await_count == 1
+    assert len(first) == len(second) == 18
+    assert [item["id"] for item in first] == list(range(1, 19))
+    assert {item["name"] for item in second} <= {item["name"] for item in catalog}
+    # The cached catalog is not modified by sampling
+    assert "id" not in catalog[0]
+    assert theme_cache.metrics()["themes"]["flags"] == {"hits": 1, "stale": 0, "misses": 1}
+
+
+async def test_pokemon_items_cached_individually():
+    """Test that only Pokemon missing from the cache are fetched."""
+    async def fetch(client, pokemon_id):
+        return {"id": pokemon_id, "name": f"P{pokemon_id}", "image": f"https://sprites.example/{pokemon_id}.png"}
+
+    with patch("app.themes.fetch_pokemon", new=AsyncMock(side_effect=fetch)) as mock:
+        first = await get_theme_data("pokemon", 151)
+        second = await get_theme_data("pokemon", 10)
+
+    assert len(first) == 151 and len(second) == 10
+    assert mock.await_count == 151
+    assert theme_cache.metrics()["themes"]["pokemon"] == {"hits": 10, "stale": 0, "misses": 151}
+
+
+async def test_failed_fetch_is_not_cached():
+    """Test that an upstream error leaves nothing in the cache."""
+    with patch.dict("app.themes.CATALOG_FETCHERS", flags=AsyncMock(side_effect=RuntimeError("down"))):
+        with pytest.raises(Exception):
+            await get_theme_data("flags", 5)
+    assert theme_cache.metrics()["entries"] == 0
+
+
+def test_metrics_include_theme_cache(client: TestClient):
+    """Test that the theme cache counters are exposed."""
+    theme_cache.get("dogs")
+    response = client.get("/api/metrics")
+    assert response.json()["theme_cache"]["themes"]["dogs"] == {"hits": 0, "stale": 0, "misses": 1}
@@ -0,0 +1,158 @@
+"""Latency tests of concurrent theme fetches against a delayed mock upstream."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+
+from app.http_client import upstream_client
+from app.theme_cache import theme_cache, theme_fetches
+from app.themes import get_movies_theme, get_pokemon_theme, get_theme_data
+
+
+class DelayedUpstream:
+    """Mock PokeAPI / TMDB answering each request after `delay(request)` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay(request))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        if request.method == "HEAD":
+            return httpx.Response(200)
+        return httpx.Response(200, json={
+            "name": f"pokemon-{pokemon_id(request)}",
+            "sprites": {"front_default": f"https://sprites.example/{pokemon_id(request)}.png"},
+        })
+
+    def serve(self) -> None:
+        """Route the shared upstream client to this mock."""
+        upstream_client.start(transport=httpx.MockTransport(self))
+
+
+def pokemon_id(request: httpx.Request) -> int:
+    """Pokemon id requested from the mock PokeAPI."""
+    return int(request.url.path.rstrip("/").rsplit("/", 1)[-1])
+
+
+async def test_pokemon_fetched_concurrently():
+    """Test that 18 fetches of 100 ms take about ceil(18 / 8) round trips."""
+    upstream = DelayedUpstream(lambda request: 0.1)
+    upstream.serve()
+    with patch("app.themes.THEME_FETCH_CONCURRENCY", 8):
+        start = time.perf_counter()
+        items = await get_pokemon_theme(18)
+        elapsed = time.perf_counter() - start
+
+    assert len(items) == 18
+    assert upstream.max_in_flight == 8
+    # Sequential fetching would take 1.8 s
+    assert elapsed < 0.8
+
+
+async def test_deadline_returns_items_received_in_time():
+    """Test that stragglers past the deadline are dropped and cancelled."""
+    upstream = DelayedUpstream(lambda request: 10 if pokemon_id(request) % 3 == 0 else 0.01)
+    upstream.serve()
+    with patch("app.themes.THEME_FETCH_CONCURRENCY", 151), \
+            patch("app.themes.THEME_FETCH_DEADLINE_SECONDS", 0.3):
+        start = time.perf_counter()
+        items = await get_pokemon_theme(151)
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 2
+    assert len(items) == 151 - 151 // 3
+    assert all(item["id"] % 3 for item in items)
+    assert upstream.cancelled == 151 // 3
+    assert upstream.in_flight == 0
+
+
+async def test_movies_return_once_enough_posters_validated():
+    """Test that slow poster checks are cancelled once `limit` posters are valid."""
+    movies = [{"id": i, "name": f"Movie {i}", "poster_path": f"/{i}.jpg"} for i in range(10)]
+    # Odd movies answer after 10 s
+    upstream = DelayedUpstream(lambda request: 10 if int(request.url.path.rsplit("/", 1)[-1][:-4]) % 2 else 0.01)
+    upstream.serve()
+    with patch("app.themes.POPULAR_MOVIES", movies), \
+            patch("app.themes.THEME_FETCH_CONCURRENCY", 10):
+        start = time.perf_counter()
+        items = await get_movies_theme(5)
+        elapsed = time.perf_counter() - start
+
+    assert sorted(item["id"] for item in items) == [0, 2, 4, 6, 8]
+    assert elapsed < 1
+    assert upstream.cancelled == 5
+    assert upstream.in_flight == 0
+
+
+async def test_concurrent_misses_share_one_fetch():
+    """Test that simultaneous requests for the same Pokemon reach upstream once."""
+    upstream = DelayedUpstream(lambda request: 0.1)
+    upstream.serve()
+    with patch("app.themes.THEME_FETCH_CONCURRENCY", 151):
+        results = await asyncio.gather(*(get_pokemon_theme(151) for _ in range(20)))
+
+    assert all(len(items) == 151 for items in results)
+    assert upstream.requests == 151
+    assert theme_fetches.metrics()["in_flight"] == 0
+
+
+async def test_stale_catalog_served_while_revalidated():
+    """Test that an expired catalog is answered at once and refreshed in the background once."""
+    refreshed = asyncio.Event()
+
+    async def fetch(client):
+        await asyncio.sleep(0.1)
+        refreshed.set()
+        return [{"name": f"New {i}", "image": f"https://flags.example/{i}.png"} for i in range(20)]
+
+    theme_cache.put("flags", None, [{"name": f"Old {i}", "image": f"https://flags.example/{i}.png"} for i in range(20)], ttl=-1)
+    with patch.dict("app.themes.CATALOG_FETCHERS", flags=fetch):
+        start = time.perf_counter()
+        results = await asyncio.gather(*(get_theme_data("flags", 5) for _ in range(10)))
+        elapsed = time.perf_counter() - start
+        assert all(item["name"].startswith("Old") for items in results for item in items)
+        assert elapsed < 0.05
+        assert theme_fetches.metrics()["calls"] == 1
+
+        await asyncio.wait_for(refreshed.wait(), timeout=1)
+        while theme_fetches.in_flight(("flags", None)):
+            await asyncio.sleep(0.01)
+        items = await get_theme_data("flags", 5)
+
+    assert all(item["name"].startswith("New") for item in items)
+    assert theme_cache.metrics()["themes"]["flags"]["stale"] == 10
+
+
+async def test_shared_fetch_cancelled_with_its_last_waiter():
+    """Test that the upstream request is only cancelled once every waiter gave up."""
+    upstream = DelayedUpstream(lambda request: 10)
+    upstream.serve()
+    with patch("app.themes.THEME_FETCH_CONCURRENCY", 151):
+        waiters = [asyncio.create_task(get_pokemon_theme(151)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        assert upstream.in_flight == 151
+
+        waiters[0].cancel()
+        await asyncio.sleep(0.05)
+        assert upstream.in_flight == 151
+
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.05)
+    assert upstream.in_flight == 0
+    assert upstream.cancelled == 151
@@ -0,0 +1,153 @@
+"""Tests for upstream circuit breakers, hedged requests and theme deadlines."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.catalog_store import catalog_store
+from app.http_client import upstream_client
+from app.themes import get_theme_data, get_theme_data_within
+from app.upstream_guard import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyHistogram,
+    UpstreamGuard,
+    upstream_guards,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_and_probes():
+    """Test closed -> open after N failures -> half-open probe -> closed or open again."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failures=3, reset_seconds=30, clock=clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # A single probe at a time
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.metrics() == {"state": "closed", "consecutive_failures": 0, "opened": 2, "rejected": 2}
+
+
+def test_latency_quantiles():
+    """Test that quantiles are interpolated within their bucket."""
+    histogram = LatencyHistogram()
+    for ms in [5] * 90 + [200] * 10:
+        histogram.observe(ms)
+
+    assert histogram.quantile(0.5) == pytest.approx(50 / 9)
+    assert histogram.quantile(0.95) == pytest.approx(175)
+    assert histogram.metrics()["buckets"]["10"] == 90
+    assert histogram.metrics()["buckets"]["250"] == 10
+
+
+async def test_slow_request_is_hedged():
+    """Test that a second request wins over a straggler, which is cancelled."""
+    calls = []
+
+    async def request():
+        calls.append(time.perf_counter())
+        try:
+            await asyncio.sleep(10 if len(calls) == 1 else 0.01)
+        except asyncio.CancelledError:
+            calls.append("cancelled")
+            raise
+        return "ok"
+
+    guard = UpstreamGuard("test")
+    with patch("app.upstream_guard.UPSTREAM_HEDGE_DEFAULT_MS", 50):
+        start = time.perf_counter()
+        assert await guard.call(request) == "ok"
+
+    assert time.perf_counter() - start < 0.5
+    assert calls[-1] == "cancelled"
+    assert guard.metrics()["hedges"] == guard.metrics()["hedge_wins"] == 1
+
+
+async def test_dead_provider_is_not_retried():
+    """Test that an open circuit answers from the snapshot without calling upstream."""
+    requests = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal requests
+        requests += 1
+        raise httpx.ConnectError("offline", request=request)
+
+    upstream_client.start(transport=httpx.MockTransport(handler))
+    with patch.object(upstream_guards.get("flags").breaker, "failures", 3):
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await get_theme_data("flags", 5)
+        catalog_store.replace("flags", [{"name": f"Country {i}", "image": f"https://flags.example/{i}.png"} for i in range(10)])
+        items = await get_theme_data("flags", 5)
+
+    assert len(items) == 5
+    assert requests == 3
+    assert upstream_guards.metrics()["flags"]["breaker"]["state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        await upstream_guards.get("flags").call(lambda: None)
+
+
+async def test_deadline_serves_last_known_items():
+    """Test that a slow theme is answered by its deadline from the snapshot, then cached."""
+    async def slow(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.3)
+        return httpx.Response(200, json=[{"name": {"common": "Peru"}, "flags": {"png": "https://flags.example/pe.png"}}])
+
+    upstream_client.start(transport=httpx.MockTransport(slow))
+    catalog_store.replace("flags", [{"name": f"Country {i}", "image": f"https://flags.example/{i}.png"} for i in range(10)])
+    start = time.perf_counter()
+    items, source = await get_theme_data_within("flags", 5, deadline=0.05)
+
+    assert time.perf_counter() - start < 0.2
+    assert source == "snapshot" and len(items) == 5
+    # The upstream load went on in the background
+    await asyncio.sleep(0.4)
+    items, source = await get_theme_data_within("flags", 5, deadline=0.05)
+    assert source == "upstream"
+    assert [item["name"] for item in items] == ["Peru"]
+
+
+def test_theme_endpoint_falls_back_to_fruits(client: TestClient):
+    """Test that an unknown-so-far theme with a failing upstream is answered with emojis."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503)
+
+    upstream_client.start(transport=httpx.MockTransport(handler))
+    response = client.get("/api/themes/dogs", params={"limit": 8, "deadline_ms": 500})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["source"] == "fruits"
+    assert len(body["data"]) == 8 and all("emoji" in item for item in body["data"])
+    assert client.get("/api/themes/dogs", params={"deadline_ms": 0}).status_code == 422
+
+    providers = client.get("/api/metrics").json()["upstream_providers"]
+    assert providers["dogs"]["errors"] == 1
+    assert providers["dogs"]["breaker"]["consecutive_failures"] == 1
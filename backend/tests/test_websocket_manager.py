@@ -0,0 +1,93 @@
+"""Broadcast latency tests of the WebSocket manager with slow and dead clients."""
+
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+from app.websocket_manager import WS_CLOSE_SLOW_CLIENT, ConnectionManager
+
+
+class FakeWebSocket:
+    """Client receiving each message after `delay` seconds, or failing when `dead`."""
+
+    def __init__(self, delay: float = 0.0, dead: bool = False):
+        self.delay = delay
+        self.dead = dead
+        self.received: List[dict] = []
+        self.received_at: List[float] = []
+        self.close_code: Optional[int] = None
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        if self.dead:
+            raise RuntimeError("Cannot call send once a close message has been sent")
+        await asyncio.sleep(self.delay)
+        self.received.append(json.loads(text))
+        self.received_at.append(time.perf_counter())
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+
+
+async def room_with(manager: ConnectionManager, clients: List[FakeWebSocket], room_code: str = "ABC123") -> None:
+    """Connect every client to a room."""
+    for client in clients:
+        await manager.connect(client, room_code)
+
+
+async def test_slow_client_does_not_delay_the_room():
+    """Test delivery latency in a room of 20 clients where one takes 10 s per message."""
+    manager = ConnectionManager(send_timeout=0.2, max_send_timeouts=2)
+    fast = [FakeWebSocket(delay=0.01) for _ in range(20)]
+    slow = FakeWebSocket(delay=10)
+    await room_with(manager, fast + [slow])
+
+    start = time.perf_counter()
+    await manager.broadcast_to_room("ABC123", {"type": "flip", "card": 3})
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(client.received_at[0] - start for client in fast)
+    # Sequential sends would deliver the last message after 10.2 s
+    assert latencies[-1] < 0.1
+    assert elapsed < 0.5
+    assert all(client.received == [{"type": "flip", "card": 3}] for client in fast)
+    # A first timeout is tolerated, the second one evicts
+    assert slow in manager.active_connections["ABC123"]
+
+    await manager.broadcast_to_room("ABC123", {"type": "flip", "card": 4})
+    assert slow not in manager.active_connections["ABC123"]
+    assert slow.close_code == WS_CLOSE_SLOW_CLIENT
+    assert manager.metrics() == {
+        "rooms": 1, "connections": 20, "send_timeouts": 2, "send_errors": 0, "evictions": 1,
+    }
+
+
+async def test_dead_client_evicted_at_once():
+    """Test that a failing send removes the client immediately."""
+    manager = ConnectionManager(send_timeout=0.2)
+    alive, dead = FakeWebSocket(), FakeWebSocket(dead=True)
+    await room_with(manager, [alive, dead])
+
+    await manager.broadcast_to_room("ABC123", {"type": "start"})
+
+    assert manager.active_connections["ABC123"] == {alive}
+    assert alive.received == [{"type": "start"}]
+    assert manager.metrics()["send_errors"] == 1
+
+
+async def test_timeouts_must_be_consecutive():
+    """Test that a successful send forgives an earlier timeout."""
+    manager = ConnectionManager(send_timeout=0.05, max_send_timeouts=2)
+    flaky = FakeWebSocket(delay=1)
+    await room_with(manager, [flaky])
+
+    for delay in (1, 0, 1, 0):
+        flaky.delay = delay
+        await manager.broadcast_to_room("ABC123", {"type": "ping"})
+
+    assert manager.active_connections["ABC123"] == {flaky}
+    assert len(flaky.received) == 2
+    assert manager.metrics()["evictions"] == 0
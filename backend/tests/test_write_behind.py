@@ -0,0 +1,107 @@
+"""Tests for the write-behind score queue."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, func, select
+
+from app.models import Score
+from app.schemas import ScoreCreate
+from app.write_behind import ScoreWriteQueue
+
+
+def make_score(i: int) -> ScoreCreate:
+    """Build a score submission."""
+    return ScoreCreate(
+        player_name=f"Player {i}", score=i, moves=10, time=60, grid_size="4x4", theme="numbers"
+    )
+
+
+@pytest.fixture(name="queue")
+def queue_fixture(session: Session):
+    """Create a write queue bound to the test database."""
+    engine = session.get_bind()
+    return ScoreWriteQueue(session_factory=lambda: Session(engine), flush_ms=20, max_batch=5)
+
+
+async def test_submissions_are_group_committed(queue: ScoreWriteQueue, session: Session):
+    """Test that concurrent submissions share commits and get their ids back."""
+    committed = []
+    await queue.start(on_commit=committed.append)
+    scores = await asyncio.gather(*(queue.submit(make_score(i)) for i in range(12)))
+    await queue.stop()
+
+    assert [score.score for score in scores] == list(range(12))
+    assert len({score.id for score in scores}) == 12
+    assert len(committed) == 12
+    assert queue.flushed_rows == 12
+    assert queue.flushed_batches == 3  # max_batch=5 -> 5 + 5 + 2
+    assert session.exec(select(func.count(Score.id))).one() == 12
+
+
+async def test_stop_flushes_pending_submissions(queue: ScoreWriteQueue, session: Session):
+    """Test that stopping the queue commits what is still queued."""
+    queue.flush_ms = 10_000
+    await queue.start()
+    pending = asyncio.create_task(queue.submit(make_score(1)))
+    await asyncio.sleep(0.01)
+    await queue.stop()
+
+    assert (await pending).id is not None
+    assert not queue.running
+    assert session.exec(select(func.count(Score.id))).one() == 1
+
+
+async def test_failing_on_commit_keeps_the_queue_running(queue: ScoreWriteQueue):
+    """Test that an on_commit error neither loses submissions nor stops the flush task."""
+    def on_commit(score):
+        raise ValueError("leaderboard unavailable")
+
+    await queue.start(on_commit=on_commit)
+    scores = await asyncio.wait_for(asyncio.gather(*(queue.submit(make_score(i)) for i in range(3))), 1)
+    later = await asyncio.wait_for(queue.submit(make_score(3)), 1)
+    await queue.stop()
+
+    assert [score.score for score in scores] == [0, 1, 2]
+    assert later.id is not None
+    assert queue.flushed_rows == 4
+
+
+async def test_stop_settles_blocked_submissions(queue: ScoreWriteQueue, session: Session):
+    """Test that submitters blocked on a full queue are committed or failed, never left waiting."""
+    stopping = []
+
+    def on_commit(score):
+        # Stop while the next submitter is woken but has not queued its score yet
+        if not stopping:
+            stopping.append(asyncio.ensure_future(queue.stop()))
+
+    queue.max_depth = queue.max_batch = 1
+    await queue.start(on_commit=on_commit)
+    submissions = [asyncio.create_task(queue.submit(make_score(i))) for i in range(6)]
+
+    done, pending = await asyncio.wait(submissions, timeout=1)
+    await stopping[0]
+    assert not pending
+    saved = [task.result() for task in done if task.exception() is None]
+    assert all(isinstance(task.exception(), RuntimeError) for task in done if task.exception() is not None)
+    assert 0 < len(saved) < 6
+    assert session.exec(select(func.count(Score.id))).one() == len(saved)
+    with pytest.raises(RuntimeError):
+        await queue.submit(make_score(7))
+
+
+async def test_submit_requires_running_queue(queue: ScoreWriteQueue):
+    """Test that submitting to a stopped queue fails."""
+    with pytest.raises(RuntimeError):
+        await queue.submit(make_score(1))
+
+
+def test_metrics_endpoint(client: TestClient):
+    """Test that queue metrics are exposed."""
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    metrics = response.json()["write_queue"]
+    assert metrics["mode"] == "direct"
+    assert metrics["depth"] == 0